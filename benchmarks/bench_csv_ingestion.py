@@ -0,0 +1,105 @@
+"""
+Benchmark de la lectura de las exportaciones CSV: todas las columnas vs. esquema.
+
+Uso:
+    python -m benchmarks.bench_csv_ingestion
+    python -m benchmarks.bench_csv_ingestion --copies 1 10 40
+
+Para cada exportación local (LOCAL_FILES) se arma un CSV con sus filas repetidas
+`copies` veces y se mide, cada lectura en un proceso nuevo para que el pico de
+memoria no se contamine entre mediciones:
+    - 'completo': pd.read_csv con todas las columnas (lectura anterior)
+    - 'esquema': read_csv_with_schema (columnas y tipos de CSV_SCHEMAS, motor pyarrow)
+Se reportan el tiempo de parseo, el pico de RSS durante la lectura por encima del
+RSS del proceso ya inicializado (Linux: /proc/self) y la memoria del DataFrame resultante.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from config.settings import LOCAL_FILES
+
+DEFAULT_COPIES = [1, 10]
+
+# Código que corre en el proceso hijo: importa todo, mide el RSS base y luego la lectura
+_CHILD = """
+import json, sys, time
+import pandas as pd
+import pyarrow.csv  # noqa: F401  (mismo estado inicial para ambos modos)
+from data_processing.data_loader import read_csv_with_schema
+
+def status_kb(field):
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field))
+
+mode, path, schema = sys.argv[1:4]
+# Reinicia el pico de RSS (VmHWM) para no contar el de las importaciones
+with open('/proc/self/clear_refs', 'w') as clear_refs:
+    clear_refs.write('5')
+base_kb = status_kb('VmRSS:')
+start = time.perf_counter()
+if mode == 'completo':
+    df = pd.read_csv(path, sep=';', low_memory=False)
+else:
+    df = read_csv_with_schema(path, schema)
+elapsed = time.perf_counter() - start
+peak_kb = status_kb('VmHWM:')
+print(json.dumps({'s': elapsed, 'rss_mb': (peak_kb - base_kb) / 1024,
+                  'frame_mb': df.memory_usage(deep=True).sum() / 1e6, 'shape': list(df.shape)}))
+"""
+
+
+def _replicated_csv(source: str, copies: int, directory: str) -> str:
+    """CSV con las filas de `source` repetidas `copies` veces."""
+    if copies == 1:
+        return source
+    path = os.path.join(directory, f"x{copies}-{os.path.basename(source)}")
+    df = pd.read_csv(source, sep=';', low_memory=False)
+    pd.concat([df] * copies, ignore_index=True).to_csv(path, sep=';', index=False)
+    return path
+
+
+def _measure(mode: str, path: str, schema: str) -> dict:
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', _CHILD, mode, path, schema],
+                            capture_output=True, text=True, check=True, cwd=repo_root)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(copies_list):
+    """Mide ambas lecturas para cada exportación y cada factor de réplica."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='serviplagas-bench-') as directory:
+        for schema, source in LOCAL_FILES.items():
+            for copies in copies_list:
+                path = _replicated_csv(source, copies, directory)
+                full = _measure('completo', path, schema)
+                pruned = _measure('esquema', path, schema)
+                results.append({'dataset': schema, 'copias': copies, 'completo': full, 'esquema': pruned})
+                print(f"   {schema:<12} x{copies:<4} {full['shape'][0]:>9,} filas | "
+                      f"completo: {full['s']:.2f}s, RSS +{full['rss_mb']:.0f} MB, frame {full['frame_mb']:.0f} MB "
+                      f"({full['shape'][1]} col) | "
+                      f"esquema: {pruned['s']:.2f}s, RSS +{pruned['rss_mb']:.0f} MB, frame {pruned['frame_mb']:.0f} MB "
+                      f"({pruned['shape'][1]} col)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de lectura de CSV con esquema")
+    parser.add_argument('--copies', type=int, nargs='+', default=DEFAULT_COPIES,
+                        help="Veces que se repiten las filas de cada exportación")
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK lectura de CSV")
+    print("=" * 60)
+    run_benchmark(args.copies)
+
+
+if __name__ == "__main__":
+    main()
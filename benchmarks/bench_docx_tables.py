@@ -0,0 +1,101 @@
+"""
+Benchmark de la escritura de tablas de Word: XML en bloque vs. celda por celda.
+
+Uso:
+    python -m benchmarks.bench_docx_tables
+    python -m benchmarks.bench_docx_tables --sizes 100 1000 5000 20000 --legacy-max-rows 5000
+
+La versión celda por celda reproduce el llenado anterior de `_add_table_to_doc`
+(`table.add_row().cells` y `cell.text` dentro de `iterrows()`). Para cada tamaño
+se comprueba que ambas tablas tengan exactamente el mismo texto y se reporta el
+tiempo por fila, que en la escritura en bloque debe mantenerse casi constante.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+from reports.docx_tables import add_dataframe_table
+
+DEFAULT_SIZES = [100, 1_000, 5_000, 20_000]
+
+
+def make_table(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Tabla sintética con la forma de las tablas mensuales de los reportes."""
+    rng = np.random.default_rng(seed)
+    months = pd.period_range('2000-01', periods=n_rows, freq='M').strftime('%b %Y')
+    table = pd.DataFrame({'Mes': months})
+    for col in ['Consumido', 'Instalación', 'Sin novedad', 'Presencia de roedores',
+                'Desaparecida', 'Estación dañada', 'Estación bloqueada']:
+        table[col] = rng.integers(0, 50, n_rows)
+    return table
+
+
+def add_table_cell_by_cell(doc, table_data: pd.DataFrame):
+    """Llenado anterior: una llamada de python-docx por celda."""
+    table = doc.add_table(rows=1, cols=len(table_data.columns))
+    table.style = 'Table Grid'
+    header_cells = table.rows[0].cells
+    for i, column_name in enumerate(table_data.columns):
+        header_cells[i].text = str(column_name)
+    for _, row in table_data.iterrows():
+        row_cells = table.add_row().cells
+        for i, value in enumerate(row):
+            row_cells[i].text = str(value)
+    return table
+
+
+def _table_text(table):
+    return [[cell.text for cell in row.cells] for row in table.rows]
+
+
+def _timed(func, table_data):
+    doc = Document()
+    start = time.perf_counter()
+    table = func(doc, table_data)
+    return table, time.perf_counter() - start
+
+
+def run_benchmark(sizes, legacy_max_rows: int = 5_000, seed: int = 0):
+    """Mide ambas escrituras para cada tamaño y verifica que el contenido sea idéntico."""
+    results = []
+    for n_rows in sizes:
+        table_data = make_table(n_rows, seed)
+        bulk, t_bulk = _timed(lambda doc, data: add_dataframe_table(doc, data, style='Table Grid'), table_data)
+
+        row = {'filas': n_rows, 'bloque_s': t_bulk, 'bloque_us_por_fila': t_bulk / n_rows * 1e6,
+               'celda_s': None, 'aceleracion': None}
+        if n_rows <= legacy_max_rows:
+            legacy, t_legacy = _timed(add_table_cell_by_cell, table_data)
+            assert _table_text(bulk) == _table_text(legacy), "Las tablas no coinciden"
+            row['celda_s'] = t_legacy
+            row['aceleracion'] = t_legacy / t_bulk
+        results.append(row)
+
+        legacy_txt = f"{row['celda_s']:.3f}s" if row['celda_s'] is not None else "omitido"
+        speedup_txt = f"{row['aceleracion']:.1f}x" if row['aceleracion'] is not None else "-"
+        print(f"   {n_rows:>8,} filas | bloque: {t_bulk:.3f}s ({row['bloque_us_por_fila']:.0f} µs/fila) | "
+              f"celda por celda: {legacy_txt} | aceleración: {speedup_txt}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escritura de tablas de Word")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Cantidades de filas a medir")
+    parser.add_argument('--legacy-max-rows', type=int, default=5_000,
+                        help="Tamaño máximo para ejecutar la versión celda por celda (es lenta)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK tablas de Word")
+    print("=" * 60)
+    run_benchmark(args.sizes, args.legacy_max_rows, args.seed)
+    print("✅ Tablas idénticas en todos los tamaños comparados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark de las gráficas por facetas: backend 'seaborn' vs. 'matplotlib'.
+
+Uso:
+    python -m benchmarks.bench_facet_backends
+    python -m benchmarks.bench_facet_backends --months 12 36 --repeat 3 --dpi 300
+
+Para las cuatro gráficas de barras + línea por métrica (especies de plagas, estado
+de estaciones de roedores, estado de lámparas y capturas por especie) se arma una
+tabla mensual sintética y se mide, con cada backend (CHART_CONFIG['facet_backend']):
+    - 'facetas': solo la grilla de paneles (bar_line_facets)
+    - 'gráfica': la función de dibujo completa (formato de ejes, títulos, tight_layout)
+    - 'gráfica+PNG': la gráfica codificada como PNG a `--dpi`, como en los reportes
+y se compara la imagen de ambos backends: con pocos meses es idéntica píxel a píxel;
+con más meses seaborn llega a tight_layout desde otra posición de los ejes (FacetGrid
+ya lo aplicó al construirse) y el margen puede moverse uno o dos píxeles.
+
+Se mide también el 'piso' de la gráfica: la misma grilla de paneles vacíos, con sus
+etiquetas de meses rotadas, títulos y tight_layout, sin barras ni líneas. Es lo que
+cualquier dibujo con matplotlib que conserve la imagen tiene que pagar (crear cada
+Axes y cada tick con su etiqueta, y medir los textos en tight_layout), así que la
+aceleración de la gráfica completa no puede superar seaborn / piso. Con 1 CPU el piso
+queda entre un cuarto y un quinto del tiempo de seaborn (máximo posible ~3.7-5.4x,
+menor con 36 meses): la meta de 5x de la gráfica completa no se alcanza (se mide
+~3-4.7x) sin cambiar la imagen, p. ej. quitando etiquetas de meses o el tight_layout.
+Con la codificación PNG (la misma para ambos backends) la aceleración baja a ~1.5-1.8x.
+"""
+
+import argparse
+import io
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from config.settings import CHART_CONFIG
+from data_processing.monthly_aggregates import (
+    LAMPARAS_ESPECIE_COLUMNS,
+    LAMPARAS_ESTADO_COLUMNS,
+    PREVENTIVOS_PLAGA_COLUMNS,
+    ROEDORES_ESTADO_COLUMNS
+)
+from visualisations.Lamparas import _draw_capturas_especies_por_mes, _draw_estado_lamparas_por_mes
+from visualisations.Preventivos import _draw_plagas_timeseries_facet
+from visualisations.Roedores import _draw_roedores_station_status_plot
+from visualisations.facet_renderer import bar_line_facets
+
+DEFAULT_MONTHS = [12, 36]
+
+# (gráfica, función de dibujo, columnas de la tabla, variable de las facetas, borde de las barras)
+CHARTS = [
+    ('plagas por especie', _draw_plagas_timeseries_facet, PREVENTIVOS_PLAGA_COLUMNS, 'Plaga', None),
+    ('estado estaciones', _draw_roedores_station_status_plot, ROEDORES_ESTADO_COLUMNS, 'Estado', None),
+    ('estado lámparas', _draw_estado_lamparas_por_mes, LAMPARAS_ESTADO_COLUMNS, 'Estado', 'black'),
+    ('capturas especies', _draw_capturas_especies_por_mes, LAMPARAS_ESPECIE_COLUMNS, 'Especie', 'black'),
+]
+
+
+def make_chart_table(n_months: int, columns, seed: int = 0) -> pd.DataFrame:
+    """Tabla mensual sintética con la forma de las de chart_tables ('Mes' categórico ordenado)."""
+    rng = np.random.default_rng(seed)
+    months = pd.period_range('2020-01', periods=n_months, freq='M').strftime('%b %Y')
+    table = pd.DataFrame({'Mes': pd.Categorical(months, categories=months, ordered=True)})
+    for column in columns:
+        table[column] = rng.integers(0, 60, n_months)
+    return table
+
+
+def _draw_axes_floor(table: pd.DataFrame, var_name: str):
+    """Piso de una gráfica por facetas: paneles, ticks, títulos y tight_layout, sin datos."""
+    columns = [column for column in table.columns if column != 'Mes']
+    nrow = max(1, int(np.ceil(len(columns) / 3)))
+    fig = plt.figure(figsize=(3 * 3.5, nrow * 3.5))
+    positions = np.arange(len(table), dtype=float)
+    labels = [str(month) for month in table['Mes']]
+    for i, column in enumerate(columns):
+        ax = fig.add_subplot(nrow, 3, i + 1)
+        ax.set_xticks(positions, labels)
+        ax.set_yticks(range(0, 61, 10))
+        ax.tick_params(axis='x', rotation=45, labelsize=6)
+        ax.set_title(f"{var_name} = {column}")
+    fig.suptitle(var_name, fontsize=14)
+    fig.tight_layout()
+    return fig
+
+
+def _timed(func, repeat: int) -> float:
+    func()  # Calentamiento (importaciones, caché de fuentes)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def _png(fig, dpi: int) -> bytes:
+    """Codifica la figura como PNG a `dpi` (como el perfil 'final', con bbox ajustado) y la cierra."""
+    try:
+        with io.BytesIO() as image_stream:
+            fig.savefig(image_stream, format='png', bbox_inches='tight', dpi=dpi)
+            return image_stream.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _decode(png: bytes) -> np.ndarray:
+    return mpimg.imread(io.BytesIO(png))
+
+
+def _image_match(a: np.ndarray, b: np.ndarray) -> str:
+    """Describe qué tanto coinciden dos imágenes decodificadas."""
+    if a.shape != b.shape:
+        return f"tamaño {a.shape[1]}x{a.shape[0]} vs {b.shape[1]}x{b.shape[0]}"
+    equal = np.all(a == b, axis=-1).mean()
+    return "idéntica" if equal == 1 else f"{equal:.1%} píxeles iguales"
+
+
+def run_benchmark(months, repeat: int = 1, dpi: int = 300, seed: int = 0):
+    """Mide ambos backends para cada gráfica y tamaño, y compara las imágenes resultantes."""
+    original = CHART_CONFIG.get('facet_backend', 'matplotlib')
+    results = []
+    try:
+        for n_months in months:
+            for name, draw, columns, var_name, edgecolor in CHARTS:
+                table = make_chart_table(n_months, columns, seed)
+                row = {'gráfica': name, 'meses': n_months}
+                images = {}
+                for backend in ('seaborn', 'matplotlib'):
+                    CHART_CONFIG['facet_backend'] = backend
+                    row[f'{backend}_facetas_s'] = _timed(
+                        lambda: plt.close(bar_line_facets(table, var_name, edgecolor).fig), repeat)
+                    row[f'{backend}_grafica_s'] = _timed(lambda: plt.close(draw(table)), repeat)
+                    row[f'{backend}_png_s'] = _timed(lambda: _png(draw(table), dpi), repeat)
+                    images[backend] = _decode(_png(draw(table), 100))
+
+                row['piso_s'] = _timed(lambda: plt.close(_draw_axes_floor(table, var_name)), repeat)
+                row['imagen'] = _image_match(images['seaborn'], images['matplotlib'])
+                for stage in ('facetas', 'grafica', 'png'):
+                    row[f'aceleracion_{stage}'] = row[f'seaborn_{stage}_s'] / row[f'matplotlib_{stage}_s']
+                results.append(row)
+                print(f"   {name:<19} {n_months:>3} meses | "
+                      f"facetas {row['seaborn_facetas_s']:.3f}s → {row['matplotlib_facetas_s']:.3f}s "
+                      f"({row['aceleracion_facetas']:.1f}x) | "
+                      f"gráfica {row['seaborn_grafica_s']:.3f}s → {row['matplotlib_grafica_s']:.3f}s "
+                      f"({row['aceleracion_grafica']:.1f}x, piso {row['piso_s']:.3f}s: "
+                      f"máx. {row['seaborn_grafica_s'] / row['piso_s']:.1f}x) | "
+                      f"+PNG {dpi} dpi {row['seaborn_png_s']:.3f}s → {row['matplotlib_png_s']:.3f}s "
+                      f"({row['aceleracion_png']:.1f}x) | imagen {row['imagen']}")
+    finally:
+        CHART_CONFIG['facet_backend'] = original
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los backends de gráficas por facetas")
+    parser.add_argument('--months', type=int, nargs='+', default=DEFAULT_MONTHS,
+                        help="Cantidades de meses (filas de la tabla) a medir")
+    parser.add_argument('--repeat', type=int, default=1, help="Repeticiones por medición")
+    parser.add_argument('--dpi', type=int, default=300, help="Resolución del PNG (los reportes usan 300)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK gráficas por facetas (seaborn → matplotlib)")
+    print("=" * 60)
+    results = run_benchmark(args.months, args.repeat, args.dpi, args.seed)
+    speedups = [row['aceleracion_grafica'] for row in results]
+    ceilings = [row['seaborn_grafica_s'] / row['piso_s'] for row in results]
+    print(f"   gráfica completa: {min(speedups):.1f}-{max(speedups):.1f}x "
+          f"(máximo posible con matplotlib: {min(ceilings):.1f}-{max(ceilings):.1f}x; meta: 5x)")
+    print("✅ Benchmark completado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Benchmark de la descarga de exportaciones contra un servidor KoBo local de prueba.
+
+Uso:
+    python -m benchmarks.bench_http_fetch
+    python -m benchmarks.bench_http_fetch --copies 20 --latency 0.05
+
+Levanta en 127.0.0.1 un servidor HTTP/1.1 con keep-alive que publica las tres
+exportaciones locales (LOCAL_FILES, filas repetidas `--copies` veces) con ETag y
+Last-Modified, comprime con gzip si se le pide y responde 304 a las peticiones
+condicionales vigentes. Cada respuesta tarda `--latency` segundos más. Se mide la
+carga de las tres URLs (sin caché columnar):
+    - 'pd.read_csv': la URL directo a pandas (la carga anterior)
+    - 'primera descarga': load_data sin copia local (200, gzip)
+    - 'sin cambios': load_data con copia vigente (304)
+    - 'exportación modificada': load_data tras cambiar una exportación en el servidor
+y se comprueba que los frames son iguales a los de pandas, que las copias locales
+tienen el contenido publicado, que los 304 no traen cuerpo y que las descargas
+reutilizan una sola conexión. Por último, con un token de KoBo de prueba, que una
+redirección dentro del mismo servidor conserva el encabezado Authorization y una
+redirección a otro servidor no lo envía.
+"""
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from config.settings import API_KEYS, HTTP_FETCH_CONFIG, LOCAL_FILES
+from data_processing.data_loader import load_data
+from data_processing.http_fetch import KeepAliveSession, fetch_export, get_session
+
+
+def start_stub_server(exports: dict, latency: float, redirects: dict = None):
+    """
+    Servidor de prueba en un hilo; `exports` (ruta -> bytes) se puede modificar mientras corre.
+
+    `redirects` (ruta -> Location) responde esas rutas con un 302.
+    """
+    lock = threading.Lock()
+    redirects = redirects or {}
+    stats = {'connections': 0, 'requests': 0, 'not_modified': 0, 'bytes_sent': 0, 'authorized': 0}
+    versions = {}
+
+    def _version(path: str) -> tuple:
+        body = exports[path]
+        with lock:
+            if path not in versions or versions[path][0] != body:
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                versions[path] = (body, etag, formatdate(time.time(), usegmt=True), gzip.compress(body, 1))
+            return versions[path][1:]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def do_GET(self):
+            time.sleep(latency)
+            with lock:
+                stats['requests'] += 1
+                stats['authorized'] += 'Authorization' in self.headers
+            if self.path in redirects:
+                self.send_response(302)
+                self.send_header('Location', redirects[self.path])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.path not in exports:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            etag, last_modified, compressed = _version(self.path)
+            if self.headers.get('If-None-Match') == etag:
+                with lock:
+                    stats['not_modified'] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            body = compressed if use_gzip else exports[self.path]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with lock:
+                stats['bytes_sent'] += len(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def _replicated_csv(source: str, copies: int) -> bytes:
+    """Contenido del CSV con sus filas repetidas `copies` veces."""
+    with open(source, 'rb') as file:
+        header, _, rows = file.read().partition(b'\n')
+    rows = rows if rows.endswith(b'\n') else rows + b'\n'
+    return header + b'\n' + rows * copies
+
+
+def check_redirect_authorization(exports: dict):
+    """Authorization se conserva en redirecciones al mismo servidor y no viaja a otro servidor."""
+    path, body = next(iter(exports.items()))
+    other, other_stats = start_stub_server({path: body}, 0)
+    other_url = f"http://127.0.0.1:{other.server_address[1]}{path}"
+    server, stats = start_stub_server({path: body}, 0, {'/mismo-host': path, '/otro-host': other_url})
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    original_key, original_directory = API_KEYS.get('kobo'), HTTP_FETCH_CONFIG['directory']
+    directory = tempfile.TemporaryDirectory(prefix='serviplagas-http-')
+    API_KEYS['kobo'] = 'token-de-prueba'
+    HTTP_FETCH_CONFIG['directory'] = directory.name
+    session = KeepAliveSession()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            same_host = fetch_export(f"{base_url}/mismo-host", session)
+        assert stats['authorized'] == 2, "La redirección al mismo servidor debe conservar Authorization"
+        with contextlib.redirect_stdout(io.StringIO()):
+            other_host = fetch_export(f"{base_url}/otro-host", session)
+        assert stats['authorized'] == 3, "La primera petición debe llevar Authorization"
+        assert other_stats['requests'] == 1 and other_stats['authorized'] == 0, \
+            "Authorization no debe enviarse a otro servidor"
+        for copy_path in (same_host, other_host):
+            with open(copy_path, 'rb') as file:
+                assert file.read() == body, "Copia local distinta tras la redirección"
+    finally:
+        session.close()
+        server.shutdown()
+        other.shutdown()
+        API_KEYS['kobo'] = original_key
+        HTTP_FETCH_CONFIG['directory'] = original_directory
+        directory.cleanup()
+    print("   redirecciones: Authorization se conserva en el mismo servidor y no viaja a otro")
+
+
+def run_benchmark(copies: int, latency: float):
+    """Mide la carga directa con pandas y las descargas con y sin cambios en el servidor."""
+    exports = {f"/{name}/data.csv": _replicated_csv(path, copies) for name, path in LOCAL_FILES.items()}
+    server, server_stats = start_stub_server(exports, latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = {path: f"{base_url}{path}" for path in exports}
+
+    original_directory = HTTP_FETCH_CONFIG['directory']
+    directory = tempfile.TemporaryDirectory(prefix='serviplagas-http-')
+    HTTP_FETCH_CONFIG['directory'] = directory.name
+    session = get_session()
+    results, expected = {}, {}
+
+    def _measure(mode: str, run):
+        before = dict(server_stats)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            frames = {path: run(url) for path, url in urls.items()}
+        elapsed = time.perf_counter() - start
+        for path, df in frames.items():
+            if mode == 'pd.read_csv' or path not in expected:
+                expected[path] = df
+            pd.testing.assert_frame_equal(df, expected[path])
+        delta = {key: server_stats[key] - before[key] for key in server_stats}
+        results[mode] = {'s': elapsed, **delta}
+        print(f"   {mode:<24} {elapsed:6.2f}s | conexiones: {delta['connections']:>2} | "
+              f"peticiones: {delta['requests']:>2} | 304: {delta['not_modified']:>2} | "
+              f"enviados: {delta['bytes_sent'] / 1e6:7.2f} MB")
+
+    def _check_copies():
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_paths = {path: fetch_export(url) for path, url in urls.items()}
+        for path, copy_path in copy_paths.items():
+            with open(copy_path, 'rb') as file:
+                assert file.read() == exports[path], f"Copia local distinta de {path}"
+
+    try:
+        _measure('pd.read_csv', lambda url: pd.read_csv(url, sep=';', low_memory=False))
+        _measure('primera descarga', lambda url: load_data(url, use_cache=False))
+        _measure('sin cambios', lambda url: load_data(url, use_cache=False))
+        assert results['sin cambios']['not_modified'] == len(urls), "Se esperaba un 304 por exportación"
+        assert results['sin cambios']['bytes_sent'] == 0, "Un 304 no debe traer cuerpo"
+
+        changed = next(iter(exports))
+        exports[changed] = exports[changed] + exports[changed].partition(b'\n')[2]
+        expected[changed] = pd.read_csv(io.BytesIO(exports[changed]), sep=';', low_memory=False)
+        _measure('exportación modificada', lambda url: load_data(url, use_cache=False))
+        assert results['exportación modificada']['not_modified'] == len(urls) - 1, "Solo debe descargarse la modificada"
+        _check_copies()
+
+        fetch_connections = sum(results[mode]['connections'] for mode in results if mode != 'pd.read_csv')
+        assert fetch_connections == 1, f"La sesión abrió {fetch_connections} conexiones"
+    finally:
+        session.close()
+        server.shutdown()
+        HTTP_FETCH_CONFIG['directory'] = original_directory
+        directory.cleanup()
+
+    print(f"   sesión: {session.stats['requests']} peticiones, {session.stats['connections']} conexión(es), "
+          f"{session.stats['reused']} reutilizadas")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la descarga condicional de exportaciones")
+    parser.add_argument('--copies', type=int, default=10, help="Veces que se repiten las filas de cada exportación")
+    parser.add_argument('--latency', type=float, default=0.02, help="Segundos extra por respuesta del servidor")
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK descarga de exportaciones (servidor local)")
+    print("=" * 60)
+    run_benchmark(args.copies, args.latency)
+    check_redirect_authorization({f"/{name}/data.csv": _replicated_csv(path, 1) for name, path in LOCAL_FILES.items()})
+    print("✅ Copias locales, respuestas 304, reutilización de conexiones y redirecciones verificadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Prueba de la sincronización incremental contra un servidor KoBo local de prueba.
+
+Uso:
+    python -m benchmarks.bench_kobo_sync
+    python -m benchmarks.bench_kobo_sync --stored 0.5 --page-size 50
+
+Toma la exportación local de roedores (LOCAL_FILES['roedores']): las primeras filas
+(`--stored`) forman el CSV local y las demás se publican en 127.0.0.1 como envíos
+nuevos de la API de datos de KoBo, con nombres de campo y códigos de opción de un
+formulario de prueba (grupos, select_one, select_multiple, geopoint) que se publica
+en /api/v2/assets/<uid>/. El servidor aplica el filtro `query` sobre `_id` y pagina
+con `start` / `limit` / `next`. Se mide la sincronización y se comprueba que:
+    - las filas añadidas tienen las mismas columnas y valores que la exportación CSV
+    - las filas ya guardadas no se reescriben (el archivo solo crece)
+    - `_index` continúa la numeración del CSV
+    - una segunda sincronización no pide envíos ya guardados ni toca el archivo
+    - sin CSV local, el archivo nuevo tiene todas las columnas que define el formulario
+      (también las de preguntas que ningún envío respondió) y los mismos valores
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from config.settings import LOCAL_FILES, SYNC_CONFIG
+from data_processing.kobo_sync import EXPORT_META_COLUMNS, sync_kobo_export
+
+ASSET = '/api/v2/assets/aPrueba/'
+
+# Preguntas del formulario de prueba: (etiqueta de la exportación, tipo, grupo)
+FORM_QUESTIONS = [
+    ('Fecha', 'date', 'datos'),
+    ('Técnicos', 'select_multiple', 'datos'),
+    ('Sede', 'select_one', 'datos'),
+    ('Número de estación Medellín', 'integer', 'estacion'),
+    ('Número de estación Rionegro', 'integer', 'estacion'),
+    ('Estado de la estación', 'select_multiple', 'estacion'),
+    ('Localización', 'geopoint', 'estacion'),
+    ('Cantidad de Talon', 'integer', 'plaguicida'),  # ningún envío la responde
+    ('Cual otro plaguicida aplicó?', 'text', 'plaguicida'),
+    ('OBSERVACIONES', 'text', None),
+]
+
+META_FIELDS = ['_id', '_uuid', '_submission_time', '_status', '_submitted_by', '__version__']
+
+
+def _code(label: str) -> str:
+    """Nombre de campo / código de opción al estilo de KoBo ('Número de estación' -> 'numero_de_estacion')."""
+    text = unicodedata.normalize('NFKD', label).encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(text.lower().replace('-', ' ').split())
+
+
+def _read_records(path: str) -> tuple:
+    """(cabecera, filas como dict) de un CSV de KoBo, sin convertir tipos."""
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file, delimiter=';')
+        header = next(reader)
+        return header, [dict(zip(header, values)) for values in reader]
+
+
+def build_form(header: list) -> tuple:
+    """Definición del formulario de prueba y sus preguntas: etiqueta -> (xpath, tipo, {etiqueta: código})."""
+    survey, choices, questions = [{'name': 'start', 'type': 'start'}, {'name': 'end', 'type': 'end'}], [], {}
+    open_group = None
+    for label, kind, group in FORM_QUESTIONS:
+        if group != open_group:
+            if open_group:
+                survey.append({'type': 'end_group'})
+            if group:
+                survey.append({'type': 'begin_group', 'name': group, 'label': [group.title()]})
+            open_group = group
+        xpath = f"{group}/{_code(label)}" if group else _code(label)
+        row = {'type': kind, 'name': _code(label), '$xpath': xpath, 'label': [label]}
+        options = {}
+        if kind.startswith('select'):
+            prefix = f"{label}/"
+            options = {column[len(prefix):]: _code(column[len(prefix):]) for column in header if column.startswith(prefix)}
+            if kind == 'select_one':
+                options = {'Medellín': 'medellin', 'Rionegro': 'rionegro'}
+            row['select_from_list_name'] = _code(label)
+            choices.extend({'list_name': _code(label), 'name': code, 'label': [option]}
+                           for option, code in options.items())
+        survey.append(row)
+        questions[label] = (xpath, kind, options)
+    if open_group:
+        survey.append({'type': 'end_group'})
+    return {'content': {'survey': survey, 'choices': choices}}, questions
+
+
+def to_submission(record: dict, questions: dict) -> dict:
+    """Envío de la API de datos (nombres de campo y códigos) equivalente a una fila de la exportación."""
+    submission = {'_id': int(record['_id']), '_tags': [], '_notes': [], '_validation_status': {}}
+    submission.update({field: record[field] for field in META_FIELDS if field != '_id'})
+    submission.update({'start': record['start'], 'end': record['end']})
+    for label, (xpath, kind, options) in questions.items():
+        if kind == 'select_multiple':
+            value = ' '.join(code for option, code in options.items() if record.get(f"{label}/{option}") == '1')
+        elif kind == 'select_one':
+            value = options.get(record[label], record[label])
+        else:
+            value = record[label]
+        if value:
+            # KoBo no incluye las preguntas sin responder
+            submission[xpath] = value
+    return submission
+
+
+def start_stub_server(form: dict, submissions: list):
+    """Servidor de prueba en un hilo con la definición del formulario y la API de datos paginada."""
+    lock = threading.Lock()
+    stats = {'requests': 0, 'form_requests': 0, 'sent': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with lock:
+                stats['requests'] += 1
+            if url.path == ASSET:
+                with lock:
+                    stats['form_requests'] += 1
+                payload = form
+            elif url.path == f"{ASSET}data/":
+                payload = self._page(params)
+            else:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _page(self, params: dict) -> dict:
+            selected = submissions
+            if 'query' in params:
+                after = json.loads(params['query'])['_id']['$gt']
+                selected = [item for item in submissions if item['_id'] > after]
+            start, limit = int(params.get('start', 0)), int(params.get('limit', 100))
+            page = selected[start:start + limit]
+            with lock:
+                stats['sent'] += len(page)
+            next_url = None
+            if start + limit < len(selected):
+                host = f"http://{self.headers['Host']}"
+                next_url = f"{host}{ASSET}data/?{urlencode({**params, 'start': start + limit})}"
+            return {'count': len(selected), 'next': next_url, 'results': page}
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def _expected_value(record: dict, column: str, questions: dict) -> str:
+    """Valor que la sincronización debe escribir en `column` para la fila original `record`."""
+    if column in questions and questions[column][1] == 'select_multiple':
+        # El orden de las etiquetas elegidas puede variar: se comparan como conjunto
+        return ' '.join(sorted(record[column].split()))
+    for label, (_, kind, _) in questions.items():
+        if kind == 'select_multiple' and column.startswith(f"{label}/"):
+            # Una opción agregada al formulario después del envío sale vacía en la exportación
+            return (record[column] or '0') if record[label] else ''
+    return record[column]
+
+
+def _form_columns(header: list, questions: dict) -> list:
+    """Columnas de la exportación con valores del formulario de prueba (preguntas, derivadas y metadatos)."""
+    return [column for column in header
+            if column in questions or column in META_FIELDS or column in ('start', 'end', '_index')
+            or any(column.startswith(f"{label}/") or column.startswith(f"_{label}_") for label in questions)]
+
+
+def _check_rows(expected: list, synced: list, compared: list, questions: dict):
+    """Compara, columna por columna, las filas sincronizadas con las de la exportación."""
+    for original, row in zip(expected, synced):
+        for column in compared:
+            want = _expected_value(original, column, questions)
+            got = _expected_value(row, column, questions) if column in questions else row[column]
+            assert got == want, f"_id {original['_id']}, columna '{column}': {got!r} != {want!r}"
+
+
+@contextlib.contextmanager
+def _stub_sync(form: dict, submissions: list, page_size: int):
+    """Servidor de prueba y SYNC_CONFIG temporal: (url de datos, estadísticas, directorio)."""
+    server, stats = start_stub_server(form, submissions)
+    original_config = dict(SYNC_CONFIG)
+    directory = tempfile.TemporaryDirectory(prefix='serviplagas-sync-')
+    SYNC_CONFIG.update({'page_size': page_size, 'state_directory': os.path.join(directory.name, '.sync')})
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}{ASSET}data/", stats, directory.name
+    finally:
+        server.shutdown()
+        SYNC_CONFIG.clear()
+        SYNC_CONFIG.update(original_config)
+        directory.cleanup()
+
+
+def run_check(stored_fraction: float, page_size: int):
+    """Sincroniza un CSV parcial contra el servidor de prueba y verifica el resultado."""
+    header, records = _read_records(LOCAL_FILES['roedores'])
+    form, questions = build_form(header)
+    stored = records[:int(len(records) * stored_fraction)]
+    new_records = records[len(stored):]
+    submissions = [to_submission(record, questions) for record in new_records]
+    # Un envío repetido (ya guardado) no debe añadirse de nuevo
+    submissions.insert(0, to_submission(stored[-1], questions))
+
+    with _stub_sync(form, submissions, page_size) as (sync_url, stats, directory):
+        local_path = os.path.join(directory, 'Roedores.csv')
+        with open(local_path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file, delimiter=';', quoting=csv.QUOTE_ALL, lineterminator='\r\n')
+            writer.writerow(header)
+            writer.writerows([record[column] for column in header] for record in stored)
+        with open(local_path, 'rb') as file:
+            stored_bytes = file.read()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = sync_kobo_export(local_path, sync_url)
+        elapsed = time.perf_counter() - start
+        pages = stats['requests'] - stats['form_requests']
+        print(f"   {len(stored):>5} guardados + {added:>5} nuevos | {elapsed:6.2f}s | "
+              f"{pages} páginas de {page_size} | formulario: {stats['form_requests']} petición")
+
+        assert added == len(new_records), f"Se esperaban {len(new_records)} envíos nuevos, se añadieron {added}"
+        with open(local_path, 'rb') as file:
+            assert file.read().startswith(stored_bytes), "Las filas guardadas se reescribieron"
+
+        synced_header, synced = _read_records(local_path)
+        assert synced_header == header, "La cabecera del CSV cambió"
+        assert len(synced) == len(records), f"Filas: {len(synced)} != {len(records)}"
+        compared = _form_columns(header, questions)
+        _check_rows(new_records, synced[len(stored):], compared, questions)
+        for row in synced[len(stored):]:
+            for column in set(header) - set(compared):
+                assert row[column] == '', f"Columna fuera del formulario con valor: '{column}'"
+        print(f"   {len(compared)} columnas del formulario iguales a la exportación; "
+              f"{len(set(header) - set(compared))} columnas fuera del formulario vacías")
+
+        before = dict(stats)
+        with open(local_path, 'rb') as file:
+            synced_bytes = file.read()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert sync_kobo_export(local_path, sync_url) == 0, "La segunda sincronización añadió envíos"
+        with open(local_path, 'rb') as file:
+            assert file.read() == synced_bytes, "La segunda sincronización modificó el CSV"
+        assert stats['sent'] == before['sent'], "La segunda sincronización pidió envíos ya guardados"
+
+
+def run_cold_start_check(page_size: int):
+    """Sincroniza sin CSV local y verifica que la cabecera sale del formulario, no de los envíos."""
+    header, records = _read_records(LOCAL_FILES['roedores'])
+    form, questions = build_form(header)
+    submissions = [to_submission(record, questions) for record in records]
+    answered = {key for submission in submissions for key in submission}
+    unanswered = [xpath for xpath, _, _ in questions.values() if xpath not in answered]
+
+    with _stub_sync(form, submissions, page_size) as (sync_url, stats, directory):
+        local_path = os.path.join(directory, 'Roedores.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = sync_kobo_export(local_path, sync_url)
+        assert added == len(records), f"Se esperaban {len(records)} envíos, se añadieron {added}"
+        assert unanswered, "El formulario de prueba debe tener preguntas sin responder"
+
+        synced_header, synced = _read_records(local_path)
+        compared = _form_columns(header, questions)
+        expected = set(compared) | set(EXPORT_META_COLUMNS)
+        assert set(synced_header) == expected, (
+            f"Columnas faltantes: {sorted(expected - set(synced_header))}; "
+            f"sobrantes: {sorted(set(synced_header) - expected)}")
+        assert synced_header[-len(EXPORT_META_COLUMNS):] == EXPORT_META_COLUMNS, "Metadatos fuera de orden"
+        _check_rows(records, synced, compared, questions)
+        print(f"   sin CSV local: {added} envíos, {len(synced_header)} columnas del formulario "
+              f"({len(unanswered)} preguntas sin responder en ningún envío)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de la sincronización incremental con KoBo")
+    parser.add_argument('--stored', type=float, default=0.8, help="Fracción de filas que ya están en el CSV local")
+    parser.add_argument('--page-size', type=int, default=100, help="Envíos por página de la API de datos")
+    args = parser.parse_args()
+
+    print("⏱️  PRUEBA sincronización incremental (servidor KoBo local)")
+    print("=" * 60)
+    run_check(args.stored, args.page_size)
+    run_cold_start_check(args.page_size)
+    print("✅ Envíos traducidos a las columnas de la exportación y añadidos sin reescribir el CSV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark del análisis concurrente de prompts contra un servidor LLM local de prueba.
+
+Uso:
+    python -m benchmarks.bench_llm_async
+    python -m benchmarks.bench_llm_async --latency 0.5 --error-rate 0.2 --concurrency 8
+
+Levanta en 127.0.0.1 un servidor HTTP compatible con la API de chat de OpenAI que
+responde tras `--latency` segundos y devuelve 429/503 con probabilidad `--error-rate`.
+Con los prompts de un reporte (9 tablas, 3 secciones y el general, como los de
+ReportDataManager) se mide:
+    - 'secuencial': una petición a la vez (como analyze_table)
+    - 'concurrente': AsyncLLMClient con el límite de concurrencia y ritmo indicados
+    - 'caché fría' / 'caché caliente': concurrente con una caché de respuestas
+      temporal, la primera vez vacía y la segunda con todas las respuestas
+y se comprueba que cada resumen recibió como contexto los análisis de los que depende.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_integration.async_client import AsyncLLMClient, run_prompt_analysis
+from llm_integration.response_cache import LLMResponseCache
+
+REPORT_TABLES = {
+    'preventivos': ['order_area', 'plagas_species', 'total_trend'],
+    'roedores': ['station_status', 'elimination_trend'],
+    'lamparas': ['status_monthly', 'status_legend', 'captures_species', 'captures_trend']
+}
+
+
+def make_prompts() -> dict:
+    """Prompts con la estructura de ReportDataManager.get_all_prompts()."""
+    table_prompts = [
+        {'id': f"{section}_{table}", 'section': section, 'table_name': table,
+         'prompt': f"ID={section}_{table}\nAnaliza la tabla {table}.",
+         'title': f"{section.upper()} - {table.replace('_', ' ').title()}"}
+        for section, tables in REPORT_TABLES.items() for table in tables
+    ]
+    section_prompts = {
+        section: {'section': section, 'prompt': f"ID=section_{section}\nResume la sección.",
+                  'title': f"RESUMEN SECCIÓN - {section.upper()}"}
+        for section in REPORT_TABLES
+    }
+    general_prompt = {'prompt': "ID=general\nResume el reporte.", 'title': "RESUMEN GENERAL DEL REPORTE"}
+    return {'table_prompts': table_prompts, 'section_prompts': section_prompts,
+            'general_prompt': general_prompt}
+
+
+def start_mock_server(latency: float, error_rate: float, seed: int = 0):
+    """Servidor de prueba en un hilo; responde 'respuesta:<ID>' a cada prompt."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = body['messages'][-1]['content']
+            with lock:
+                fail = rng.random() < error_rate
+                received.append(prompt)
+            time.sleep(latency)
+            if fail:
+                self.send_response(rng.choice([429, 503]))
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            prompt_id = prompt.split('\n', 1)[0].removeprefix('ID=')
+            payload = json.dumps({'choices': [{'message': {'content': f"respuesta:{prompt_id}"}}]})
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(payload.encode('utf-8'))
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # El cliente abandonó la petición por tiempo agotado
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def check_dependencies(analyses: dict, received: list):
+    """Cada resumen debe incluir las respuestas de las tablas/secciones de las que depende."""
+    for prompt_id, text in analyses.items():
+        assert text == f"respuesta:{prompt_id}", f"Respuesta inesperada para {prompt_id}: {text[:60]}"
+    final_prompts = {prompt.split('\n', 1)[0]: prompt for prompt in received}
+    for section, tables in REPORT_TABLES.items():
+        section_prompt = final_prompts[f"ID=section_{section}"]
+        for table in tables:
+            assert f"respuesta:{section}_{table}" in section_prompt, f"Falta contexto en section_{section}"
+    for section in REPORT_TABLES:
+        assert f"respuesta:section_{section}" in final_prompts['ID=general'], "Falta contexto en general"
+
+
+def run_benchmark(latency: float, error_rate: float, concurrency: int, rate: float, seed: int = 0):
+    """Mide el análisis secuencial y el concurrente de los prompts de un reporte."""
+    prompts = make_prompts()
+    base = {'enabled': True, 'provider': 'local', 'model': 'mock', 'max_retries': 5,
+            'backoff_seconds': 0.05, 'timeout_seconds': max(5 * latency, 2)}
+    concurrent = {'max_concurrency': concurrency, 'requests_per_second': rate, 'burst': concurrency}
+    modes = {
+        'secuencial': ({'max_concurrency': 1, 'requests_per_second': 0}, False),
+        'concurrente': (concurrent, False),
+        'caché fría': (concurrent, True),
+        'caché caliente': (concurrent, True)
+    }
+    results = {}
+    cache_dir = tempfile.TemporaryDirectory(prefix='serviplagas-llm-cache-')
+    cache = LLMResponseCache(path=os.path.join(cache_dir.name, 'responses.sqlite'))
+    for mode, (limits, use_cache) in modes.items():
+        server, received = start_mock_server(latency, error_rate, seed)
+        client = AsyncLLMClient({**base, **limits,
+                                 'base_url': f"http://127.0.0.1:{server.server_address[1]}/v1"})
+        client.response_cache = cache if use_cache else None
+        try:
+            start = time.perf_counter()
+            analyses = run_prompt_analysis(prompts, client)
+            elapsed = time.perf_counter() - start
+        finally:
+            client.close()
+            server.shutdown()
+        if client.stats['cached'] == 0:
+            check_dependencies(analyses, received)
+        results[mode] = {'s': elapsed, **client.stats}
+        print(f"   {mode:<15} {elapsed:6.2f}s | peticiones: {client.stats['requests']:>3} | "
+              f"en caché: {client.stats['cached']:>3} | reintentos: {client.stats['retries']:>3} | "
+              f"fallidas: {client.stats['failures']}")
+    cache_dir.cleanup()
+    print(f"   aceleración: {results['secuencial']['s'] / results['concurrente']['s']:.1f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente LLM asíncrono")
+    parser.add_argument('--latency', type=float, default=0.3, help="Segundos por respuesta del servidor")
+    parser.add_argument('--error-rate', type=float, default=0.1, help="Probabilidad de 429/503")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=20.0, help="Peticiones por segundo (token bucket)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK cliente LLM asíncrono (servidor local)")
+    print("=" * 60)
+    run_benchmark(args.latency, args.error_rate, args.concurrency, args.rate, args.seed)
+    print("✅ Todas las respuestas y dependencias verificadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Benchmark de extremo a extremo del pipeline de reportes, etapa por etapa.
+
+Uso:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --scale 10 --repeat 3
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline_<commit>.json
+
+Con exportaciones sintéticas de Preventivos, Roedores y Lámparas (benchmarks.synthetic)
+a `--scale` veces el tamaño de las reales, se mide por separado:
+    - load_data/<dataset>: lectura del CSV con su esquema (sin caché columnar)
+    - transform/<dataset>: transform_*_df
+    - cubes: build_monthly_cubes
+    - chart/<función>/table y chart/<función>/draw: la tabla de cada función de
+      visualisations y su dibujo + codificación con el perfil `--render-profile`
+    - prompts: los prompts de tablas, secciones y resumen general de una sede
+    - docx/<reporte>: el armado de cada documento, con las imágenes ya en la caché
+      de gráficas (su dibujo se mide en chart/*)
+
+Cada etapa se repite `--repeat` veces; el resultado (mínimo, media y cada corrida,
+más el commit y las versiones) se guarda como JSON en benchmarks/results/ para
+comparar commits con `--compare`, que marca las etapas más lentas que la base
+por encima de `--tolerance` (y de `--min-delta` segundos, para no marcar el ruido
+de las etapas de milisegundos).
+
+Todo corre en un directorio temporal (los generadores escriben en 'outputs/'),
+con enlaces a 'config' y 'Logo' del repositorio.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from statistics import mean
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import pandas as pd
+
+from benchmarks.synthetic import make_lamparas_raw, make_preventivos_raw, make_roedores_raw
+from config.settings import RENDER_CACHE_CONFIG, SEDES
+from data_processing.data_cleaner import transform_lamparas_df, transform_preventivos_df, transform_roedores_df
+from data_processing.data_loader import load_data
+from data_processing.monthly_aggregates import build_monthly_cubes
+from data_processing.sede_partitions import build_sede_partitions
+from reports.hospital_san_vicente_generator import generate_hospital_san_vicente_report
+from reports.report_builder import ReportDataManager, generate_enhanced_report
+from visualisations.Lamparas import (
+    plot_capturas_especies_por_mes,
+    plot_estado_lamparas_con_leyenda,
+    plot_estado_lamparas_por_mes,
+    plot_tendencia_total_capturas
+)
+from visualisations.Preventivos import (
+    generate_order_area_plot,
+    generate_plagas_timeseries_facet,
+    generate_total_plagas_trend_plot
+)
+from visualisations.Roedores import generate_roedores_station_status_plot, plot_tendencia_eliminacion_mensual
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# Filas de las exportaciones reales (escala 1)
+BASE_ROWS = {'preventivos': 4_300, 'roedores': 3_000, 'lamparas': 900}
+
+DATASETS = [
+    ('preventivos', make_preventivos_raw, transform_preventivos_df),
+    ('roedores', make_roedores_raw, transform_roedores_df),
+    ('lamparas', make_lamparas_raw, transform_lamparas_df),
+]
+
+# (sección, tabla del prompt, función de la gráfica), en el orden del reporte estándar
+CHARTS = [
+    ('preventivos', 'order_area', generate_order_area_plot),
+    ('preventivos', 'plagas_species', generate_plagas_timeseries_facet),
+    ('preventivos', 'total_trend', generate_total_plagas_trend_plot),
+    ('roedores', 'station_status', generate_roedores_station_status_plot),
+    ('roedores', 'elimination_trend', plot_tendencia_eliminacion_mensual),
+    ('lamparas', 'status_monthly', plot_estado_lamparas_por_mes),
+    ('lamparas', 'status_legend', plot_estado_lamparas_con_leyenda),
+    ('lamparas', 'captures_species', plot_capturas_especies_por_mes),
+    ('lamparas', 'captures_trend', plot_tendencia_total_capturas),
+]
+
+
+def _measure(func, repeat: int):
+    """Ejecuta `func` `repeat` veces (sin su salida de consola); devuelve los tiempos y el último resultado."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            runs.append(time.perf_counter() - start)
+    return {'min_s': min(runs), 'mean_s': mean(runs), 'runs_s': runs}, result
+
+
+def _chart_table(plot_func, df, cube, sede, lazy=True):
+    if plot_func is plot_estado_lamparas_con_leyenda:
+        return plot_func(df, lazy=lazy)
+    return plot_func(df, cube=cube, sede=sede, lazy=lazy)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+@contextlib.contextmanager
+def _workdir():
+    """Directorio temporal de trabajo con 'outputs/' y enlaces a 'config' y 'Logo'."""
+    previous = os.getcwd()
+    cache_config = dict(RENDER_CACHE_CONFIG)
+    with tempfile.TemporaryDirectory(prefix='serviplagas-bench-') as workdir:
+        os.makedirs(os.path.join(workdir, 'outputs'))
+        for name in ('config', 'Logo'):
+            if os.path.exists(os.path.join(REPO_ROOT, name)):
+                os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+        # Caché de gráficas propia: docx/* se mide con las imágenes ya dibujadas en chart/*
+        RENDER_CACHE_CONFIG.update(enabled=True, directory=os.path.join(workdir, 'figures'))
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+            RENDER_CACHE_CONFIG.clear()
+            RENDER_CACHE_CONFIG.update(cache_config)
+
+
+def run_benchmark(scale: float = 1.0, repeat: int = 3, render_profile: str = 'final', seed: int = 0):
+    """Mide cada etapa del pipeline; devuelve {'meta': ..., 'results': {etapa: tiempos}}."""
+    results = {}
+
+    def record(stage, func, times=repeat):
+        stats, result = _measure(func, times)
+        results[stage] = stats
+        print(f"   {stage:<58} {stats['min_s']:>8.3f}s (media {stats['mean_s']:.3f}s)")
+        return result
+
+    with _workdir() as workdir:
+        # Carga y transformación
+        frames = {}
+        for name, make_raw, transform in DATASETS:
+            n_rows = max(1, int(BASE_ROWS[name] * scale))
+            path = os.path.join(workdir, f"{name}.csv")
+            make_raw(n_rows, seed=seed).to_csv(path, sep=';', index=False)
+            raw = record(f"load_data/{name}", lambda: load_data(path, use_cache=False, schema=name))
+            frames[name] = record(f"transform/{name}", lambda: transform(raw))
+
+        partitions = build_sede_partitions(frames['preventivos'], frames['roedores'], frames['lamparas'])
+        cubes = record('cubes', lambda: build_monthly_cubes(frames['preventivos'], frames['roedores'],
+                                                              frames['lamparas']))
+
+        # Gráficas: tabla (sin dibujar) y dibujo + codificación, con la primera sede
+        sede = SEDES[0]
+        _, warmup = _chart_table(generate_total_plagas_trend_plot, partitions['preventivos'].get(sede),
+                                 cubes['preventivos'], sede)
+        warmup.to_image(render_profile)  # Importa matplotlib y carga las fuentes
+
+        tables = []
+        for section, table_name, plot_func in CHARTS:
+            df, cube = partitions[section].get(sede), cubes[section]
+            stage = f"chart/{plot_func.__name__}"
+            table, handle = record(f"{stage}/table", lambda: _chart_table(plot_func, df, cube, sede))
+            record(f"{stage}/draw", lambda: handle.to_image(render_profile))
+            tables.append((section, table_name, table))
+
+        # Prompts de una sede (tablas, secciones y resumen general)
+        def generate_prompts():
+            manager = ReportDataManager()
+            for section, table_name, table in tables:
+                manager.generate_table_prompt(section, table_name, table, sede)
+            for section in ('preventivos', 'roedores', 'lamparas'):
+                manager.generate_section_summary_prompt(section, sede)
+            return manager.generate_general_summary_prompt(sede)
+        record('prompts', generate_prompts)
+
+        # Armado de los documentos: una corrida previa deja las imágenes en la caché
+        reports = {
+            'docx/hospital': lambda: generate_hospital_san_vicente_report(
+                frames['preventivos'], frames['roedores'], frames['lamparas'], sede, cubes=cubes,
+                partitions=partitions, render_profile=render_profile),
+            'docx/estandar': lambda: generate_enhanced_report(
+                frames['preventivos'], frames['roedores'], frames['lamparas'], sede=sede, cubes=cubes,
+                partitions=partitions, render_profile=render_profile),
+        }
+        for stage, generate in reports.items():
+            _measure(generate, 1)
+            record(stage, generate)
+
+    meta = {
+        'commit': _git_commit(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'escala': scale,
+        'filas': {name: max(1, int(rows * scale)) for name, rows in BASE_ROWS.items()},
+        'repeticiones': repeat,
+        'perfil': render_profile,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def save_results(report: dict, path: str = None) -> str:
+    """Guarda el resultado como JSON (por defecto benchmarks/results/pipeline_<commit>.json)."""
+    if path is None:
+        path = os.path.join(RESULTS_DIR, f"pipeline_{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float = 0.10, min_delta: float = 0.01) -> list:
+    """
+    Compara los mínimos de cada etapa contra una corrida base.
+
+    Returns:
+        list: Etapas con regresión, (etapa, tiempo base, tiempo actual)
+    """
+    base_meta, meta = baseline['meta'], current['meta']
+    print(f"\n📊 Comparación {base_meta['commit']} → {meta['commit']}")
+    if base_meta.get('escala') != meta.get('escala') or base_meta.get('perfil') != meta.get('perfil'):
+        print("⚠️  Las corridas usan distinta escala o perfil: los tiempos no son comparables")
+
+    regressions = []
+    for stage, stats in current['results'].items():
+        base = baseline['results'].get(stage)
+        if base is None:
+            print(f"   {stage:<58} {stats['min_s']:>8.3f}s (nueva)")
+            continue
+        ratio = stats['min_s'] / base['min_s'] if base['min_s'] > 0 else float('inf')
+        mark = ''
+        if ratio > 1 + tolerance and stats['min_s'] - base['min_s'] > min_delta:
+            mark = ' ⚠️'
+            regressions.append((stage, base['min_s'], stats['min_s']))
+        print(f"   {stage:<58} {base['min_s']:>8.3f}s → {stats['min_s']:.3f}s ({ratio:.2f}x){mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo del pipeline de reportes")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Tamaño de los datos sintéticos respecto de las exportaciones reales")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por etapa")
+    parser.add_argument('--render-profile', default='final', help="Perfil de codificación de las gráficas")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Ruta del JSON de resultados (por defecto benchmarks/results/)")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Lentitud relativa a partir de la cual una etapa se marca como regresión")
+    parser.add_argument('--min-delta', type=float, default=0.01,
+                        help="Diferencia mínima en segundos para marcar una regresión")
+    args = parser.parse_args()
+
+    print(f"⏱️  BENCHMARK pipeline de reportes (escala {args.scale:g}, {args.repeat} repeticiones)")
+    print("=" * 60)
+    report = run_benchmark(args.scale, args.repeat, args.render_profile, args.seed)
+    path = save_results(report, args.output)
+    print(f"💾 Resultados guardados en: {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_results(report, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"❌ {len(regressions)} etapas más lentas que la base (> {args.tolerance:.0%})")
+            sys.exit(1)
+        print("✅ Sin regresiones respecto de la base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de los totales por rango de meses: filtrar filas vs. sumas acumuladas.
+
+Uso:
+    python -m benchmarks.bench_range_totals
+    python -m benchmarks.bench_range_totals --copies 50 --ranges 500
+
+Para cada exportación local (LOCAL_FILES), con sus filas repetidas `copies` veces,
+se piden `ranges` totales de rangos de meses al azar (trimestres, ciclos, años
+hasta la fecha...) por sede y se mide:
+    - 'filas': filtrar las filas del rango y de la sede y sumar (lo que haría cada reporte)
+    - 'sumas acumuladas': MonthlyAggregateCube.range_totals (armar las sumas + una resta por rango)
+El cubo se arma una vez y se comparte (como en main.py); su tiempo se muestra aparte.
+Se comprueba que ambos modos dan los mismos totales.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.settings import API_URLS, LOCAL_FILES, SEDES
+from data_processing.data_cleaner import transform_lamparas_df, transform_preventivos_df, transform_roedores_df
+from data_processing.data_loader import load_data_with_fallback
+from data_processing.monthly_aggregates import CUBE_INPUTS, build_monthly_cube
+from data_processing.report_periods import shift_month
+
+TRANSFORMS = {
+    'preventivos': transform_preventivos_df,
+    'roedores': transform_roedores_df,
+    'lamparas': transform_lamparas_df,
+}
+
+
+def _random_ranges(first: int, last: int, count: int, seed: int = 0) -> list:
+    """Rangos (desde, hasta, sede) al azar dentro de los meses con datos."""
+    rng = random.Random(seed)
+    months = [first]
+    while months[-1] < last:
+        months.append(shift_month(months[-1], 1))
+    ranges = []
+    for _ in range(count):
+        start = rng.choice(months)
+        end = shift_month(start, rng.choice([0, 2, 5, 11]))
+        ranges.append((start, end, rng.choice(SEDES)))
+    return ranges
+
+
+def run_benchmark(copies: int, count: int):
+    """Mide ambos modos para cada exportación."""
+    for name, transform in TRANSFORMS.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = load_data_with_fallback(LOCAL_FILES[name], API_URLS[name], transform=transform, schema=name)
+        df = pd.concat([df] * copies, ignore_index=True)
+        frame, sums, distinct = CUBE_INPUTS[name](df)
+        metrics = list(sums)
+        keys = frame['Mes_key'].dropna()
+        ranges = _random_ranges(int(keys.min()), int(keys.max()), count)
+
+        start = time.perf_counter()
+        expected = []
+        for first, last, sede in ranges:
+            rows = frame[frame['Mes_key'].between(first, last).fillna(False).to_numpy(dtype=bool)
+                         & (frame['Sede'] == sede).fillna(False).to_numpy(dtype=bool)]
+            expected.append(rows[[sums[metric] for metric in metrics]].sum().to_numpy(dtype=np.int64))
+        rows_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cube = build_monthly_cube(frame, sums, distinct)
+        cube_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        totals = [cube.range_totals(metrics, first, last, sede).to_numpy() for first, last, sede in ranges]
+        prefix_s = time.perf_counter() - start
+
+        for got, want in zip(totals, expected):
+            assert (got == want).all(), f"Totales distintos en {name}"
+        print(f"   {name:<12} {len(df):>9,} filas | filas: {rows_s:6.2f}s | "
+              f"sumas acumuladas: {prefix_s:6.3f}s (+ cubo {cube_s:.2f}s, compartido) | "
+              f"{rows_s / max(prefix_s, 1e-9):,.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de totales por rango de meses")
+    parser.add_argument('--copies', type=int, default=20, help="Veces que se repiten las filas de cada exportación")
+    parser.add_argument('--ranges', type=int, default=200, help="Cantidad de rangos (desde, hasta, sede) a totalizar")
+    args = parser.parse_args()
+
+    print(f"⏱️  BENCHMARK totales por rango ({args.ranges} rangos, filas x{args.copies})")
+    print("=" * 60)
+    run_benchmark(args.copies, args.ranges)
+    print("✅ Los totales por sumas acumuladas coinciden con los de las filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de la carga por bloques: carga completa vs. streaming.
+
+Uso:
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --copies 10 40 --chunksize 50000
+
+Para cada exportación local (LOCAL_FILES) se arma un CSV con sus filas repetidas
+`copies` veces y se mide lectura + transformación + cubo mensual, cada modo en un
+proceso nuevo (como bench_csv_ingestion):
+    - 'completo': load_data + transform_*_df + build_monthly_cube (carga actual)
+    - 'bloques': stream_transform, frame transformado + cubo
+    - 'solo cubo': stream_transform con keep_frame=False
+Se reportan el tiempo y el pico de RSS por encima del proceso ya inicializado
+(Linux: /proc/self).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from config.settings import LOCAL_FILES, STREAMING_CONFIG
+
+DEFAULT_COPIES = [10, 40]
+
+# Código que corre en el proceso hijo: importa todo, mide el RSS base y luego la carga
+_CHILD = """
+import contextlib, io, json, sys, time
+import pandas as pd
+from data_processing import data_cleaner
+from data_processing.data_loader import load_data
+from data_processing.monthly_aggregates import CUBE_INPUTS, build_monthly_cube
+from data_processing.streaming import stream_transform
+
+def status_kb(field):
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field))
+
+mode, path, schema, chunksize = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+transform = getattr(data_cleaner, f"transform_{schema}_df")
+# Reinicia el pico de RSS (VmHWM) para no contar el de las importaciones
+with open('/proc/self/clear_refs', 'w') as clear_refs:
+    clear_refs.write('5')
+base_kb = status_kb('VmRSS:')
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if mode == 'completo':
+        df = transform(load_data(path, use_cache=False, schema=schema))
+        cube = build_monthly_cube(*CUBE_INPUTS[schema](df))
+    else:
+        df, cube = stream_transform(path, transform, schema, chunksize, keep_frame=mode == 'bloques')
+elapsed = time.perf_counter() - start
+peak_kb = status_kb('VmHWM:')
+print(json.dumps({'s': elapsed, 'rss_mb': (peak_kb - base_kb) / 1024,
+                  'frame_mb': df.memory_usage(deep=True).sum() / 1e6 if df is not None else 0.0,
+                  'meses': len(cube.total)}))
+"""
+
+MODES = ['completo', 'bloques', 'solo cubo']
+
+
+def _replicated_csv(source: str, copies: int, directory: str) -> str:
+    """CSV con las filas de `source` repetidas `copies` veces."""
+    if copies == 1:
+        return source
+    path = os.path.join(directory, f"x{copies}-{os.path.basename(source)}")
+    df = pd.read_csv(source, sep=';', low_memory=False)
+    pd.concat([df] * copies, ignore_index=True).to_csv(path, sep=';', index=False)
+    return path
+
+
+def _measure(mode: str, path: str, schema: str, chunksize: int) -> dict:
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', _CHILD, mode, path, schema, str(chunksize)],
+                            capture_output=True, text=True, check=True, cwd=repo_root)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(copies_list, chunksize: int):
+    """Mide los tres modos para cada exportación y cada factor de réplica."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='serviplagas-bench-') as directory:
+        for schema, source in LOCAL_FILES.items():
+            for copies in copies_list:
+                path = _replicated_csv(source, copies, directory)
+                row = {'dataset': schema, 'copias': copies}
+                for mode in MODES:
+                    row[mode] = _measure(mode, path, schema, chunksize)
+                results.append(row)
+                print(f"   {schema:<12} x{copies:<4} " + " | ".join(
+                    f"{mode}: {row[mode]['s']:.2f}s, RSS +{row[mode]['rss_mb']:.0f} MB" for mode in MODES
+                ) + f" | frame {row['completo']['frame_mb']:.0f} MB")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la carga por bloques")
+    parser.add_argument('--copies', type=int, nargs='+', default=DEFAULT_COPIES,
+                        help="Veces que se repiten las filas de cada exportación")
+    parser.add_argument('--chunksize', type=int, default=STREAMING_CONFIG['chunksize'],
+                        help="Filas por bloque")
+    args = parser.parse_args()
+
+    print(f"⏱️  BENCHMARK carga por bloques ({args.chunksize:,} filas por bloque)")
+    print("=" * 60)
+    run_benchmark(args.copies, args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
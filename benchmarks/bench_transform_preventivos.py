@@ -0,0 +1,98 @@
+"""
+Benchmark de transform_preventivos_df: motor por columnas vs. versión fila a fila.
+
+Uso:
+    python -m benchmarks.bench_transform_preventivos
+    python -m benchmarks.bench_transform_preventivos --sizes 4000 100000 1000000 --legacy-max-rows 100000
+
+La versión fila a fila (la implementación anterior con DataFrame.apply(axis=1))
+se reconstruye aquí con las mismas funciones auxiliares de data_cleaner, para
+comparar tiempos y comprobar que ambas producen exactamente la misma salida.
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_preventivos_raw
+from data_processing import data_cleaner
+from data_processing.data_cleaner import (
+    concatenate_non_nulls,
+    concatenate_tecnicos,
+    concatenate_details,
+    transform_preventivos_df,
+)
+
+DEFAULT_SIZES = [4_000, 100_000, 1_000_000]
+
+
+def _rowwise_join_columns(df, columns, sep, mode='values'):
+    """Sustituto fila a fila de data_cleaner._join_columns (comportamiento anterior)."""
+    if mode == 'details':
+        return df.apply(lambda row: concatenate_details(row, columns), axis=1)
+    return df[columns].apply(concatenate_non_nulls, axis=1)
+
+
+def _rowwise_decode_one_hot(df, prefix, sep=', '):
+    """Sustituto fila a fila de decode_one_hot (comportamiento anterior)."""
+    columns = [col for col in df.columns if col.startswith(prefix)]
+    return df.apply(lambda row: concatenate_tecnicos(row, columns), axis=1)
+
+
+def transform_preventivos_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """Ejecuta transform_preventivos_df con el motor fila a fila original."""
+    vectorized = (data_cleaner._join_columns, data_cleaner.decode_one_hot)
+    data_cleaner._join_columns = _rowwise_join_columns
+    data_cleaner.decode_one_hot = _rowwise_decode_one_hot
+    try:
+        return transform_preventivos_df(df)
+    finally:
+        data_cleaner._join_columns, data_cleaner.decode_one_hot = vectorized
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(sizes, legacy_max_rows: int = 100_000, seed: int = 0):
+    """Mide ambos motores para cada tamaño y verifica que la salida sea idéntica."""
+    results = []
+    for n_rows in sizes:
+        raw = make_preventivos_raw(n_rows, seed=seed)
+        vectorized, t_vectorized = _timed(transform_preventivos_df, raw)
+
+        row = {'filas': n_rows, 'columnas_s': t_vectorized, 'fila_a_fila_s': None, 'aceleracion': None}
+        if n_rows <= legacy_max_rows:
+            legacy, t_legacy = _timed(transform_preventivos_rowwise, raw)
+            pd.testing.assert_frame_equal(vectorized, legacy)
+            row['fila_a_fila_s'] = t_legacy
+            row['aceleracion'] = t_legacy / t_vectorized
+        results.append(row)
+
+        legacy_txt = f"{row['fila_a_fila_s']:.3f}s" if row['fila_a_fila_s'] is not None else "omitido"
+        speedup_txt = f"{row['aceleracion']:.1f}x" if row['aceleracion'] is not None else "-"
+        print(f"   {n_rows:>10,} filas | columnas: {t_vectorized:.3f}s | "
+              f"fila a fila: {legacy_txt} | aceleración: {speedup_txt}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de transform_preventivos_df")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Cantidades de filas sintéticas a medir")
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000,
+                        help="Tamaño máximo para ejecutar la versión fila a fila (es lenta)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK transform_preventivos_df")
+    print("=" * 60)
+    run_benchmark(args.sizes, args.legacy_max_rows, args.seed)
+    print("✅ Salidas idénticas en todos los tamaños comparados")
+
+
+if __name__ == "__main__":
+    main()
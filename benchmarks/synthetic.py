@@ -0,0 +1,202 @@
+"""
+Generadores de datos sintéticos con la forma de las exportaciones de KoBoToolbox.
+Producen DataFrames "crudos" (como los devuelve load_data) a la escala que se pida,
+para medir el rendimiento de las transformaciones sin depender de los CSV reales.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_processing.data_cleaner import UBICACION_COLUMNS, BLOQUE_TORRE_COLUMNS
+
+SEDES_SINTETICAS = ['Rionegro', 'Medellín']
+
+TECNICOS = ['Adolfo Guerrero', 'Alexander Barrientos', 'Brayan Fontalvo', 'Cristian Cadavid',
+            'Edgar Giraldo', 'Juan Escobar', 'Nelson Tabares', 'Ricardo Zuleta']
+
+PLAGAS = ['Cucaracha Americana', 'Cucaracha Alemana', 'Hormigas', 'Moscas', 'Mosquitos',
+          'Ratón casero', 'Rata Noruega', 'Ratón de tejado', 'Otras', 'Sin evidencia', 'Zancudos']
+
+ESTADOS_ESTACION = ['Consumido', 'Instalación', 'Sin novedad', 'Presencia de roedores',
+                    'Presencia de bioindicador', 'Cambio de cebo por consumo', 'Cambio de cebo por deterioro',
+                    'Desaparecida', 'Estación dañada', 'Estación bloqueada']
+
+ESTADOS_LAMPARA = ['Buena potencia', 'Deteriorada', 'Apagada', 'Bombillo averiado', 'Desconectada',
+                   'Faltante', 'Lámina saturada', 'Obstruida', 'Baja potencia']
+
+ESPECIES_LAMPARA = ['Mariposas', 'Moscas', 'Mosquitos', 'Polillas', 'Zancudos',
+                    'Avispas', 'Abejas', 'Grillos', 'Coleópteros', 'Otras']
+
+# Columnas de cantidad/detalle tal como vienen en la exportación (incluye sus irregularidades)
+HALLAZGOS_PREVENTIVOS = [
+    ('Cantidad de hallazgos de Cucaracha Americana', 'Detalles del hallazgo Cucaracha Americana'),
+    ('Cantidad de hallazgos de Cucaracha Alemana ', 'Detalles del hallazgo Cucarachas Alemana'),
+    ('Cantidad de hallazgos de Hormigas', 'Detalles del hallazgo de Hormigas'),
+    ('Cantidad de hallazgos de Moscas', 'Detalles del hallazgo de Moscas'),
+    ('Cantidad de hallazgos de Mosquitos', 'Detalles del hallazgo de Mosquitos'),
+    ('Cantidad de hallazgos de Zancudos', 'Detalles del hallazgo de Zancudos'),
+    ('Cantidad de hallazgos de Ratón casero', 'Detalles del hallazgo de Ratón casero'),
+    ('Cantidad de hallazgos de Rata Noruega', 'Detalles del hallazgo de Rata Noruega'),
+    ('Cantidad de hallazgos de Ratón de tejado', 'Detalles del hallazgo de Ratón de tejado'),
+    ('Cantidad de hallazgos de ${Otras_plagas_evidenciadas}',
+     'Detalles del hallazgo de ${Otras_plagas_evidenciadas}'),
+]
+
+
+def _fechas(rng: np.random.Generator, n_rows: int, months: int = 24) -> np.ndarray:
+    """Fechas diarias repartidas en los últimos `months` meses, como texto ISO."""
+    start = np.datetime64('2023-01-01')
+    offsets = rng.integers(0, months * 30, size=n_rows)
+    return (start + offsets.astype('timedelta64[D]')).astype(str)
+
+
+def _sparse_text(rng: np.random.Generator, n_rows: int, fill: float, label: str) -> np.ndarray:
+    """Columna de texto mayormente vacía (NaN) con `fill` de proporción de valores."""
+    values = np.full(n_rows, np.nan, dtype=object)
+    mask = rng.random(n_rows) < fill
+    values[mask] = label
+    return values
+
+
+def _one_hot(rng: np.random.Generator, n_rows: int, n_cols: int, p: float) -> np.ndarray:
+    """Bloque 0/1 con al menos un 1 por fila, como un select_multiple de KoBo."""
+    block = (rng.random((n_rows, n_cols)) < p).astype(np.int64)
+    block[np.arange(n_rows), rng.integers(0, n_cols, size=n_rows)] = 1
+    return block
+
+
+def make_preventivos_raw(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera una exportación sintética de Preventivos con `n_rows` filas.
+
+    Incluye todas las columnas que usa transform_preventivos_df, con la misma
+    dispersión aproximada que los datos reales (ubicaciones mayormente vacías,
+    pocos hallazgos con detalle, técnicos en one-hot).
+    """
+    rng = np.random.default_rng(seed)
+    data = {
+        'Fecha': _fechas(rng, n_rows),
+        'Sede': rng.choice(SEDES_SINTETICAS, size=n_rows),
+        'Código': rng.integers(200_000_000, 200_500_000, size=n_rows),
+    }
+
+    # Exactamente una ubicación por fila, como en el formulario
+    ubicacion = rng.integers(0, len(UBICACION_COLUMNS), size=n_rows)
+    for i, col in enumerate(UBICACION_COLUMNS):
+        values = np.full(n_rows, np.nan, dtype=object)
+        values[ubicacion == i] = f'{col} - Área {i % 7}'
+        data[col] = values
+    for col in BLOQUE_TORRE_COLUMNS:
+        data[col] = _sparse_text(rng, n_rows, 0.5, f'{col} 3')
+
+    tecnicos = _one_hot(rng, n_rows, len(TECNICOS), 0.1)
+    for j, name in enumerate(TECNICOS):
+        data[f'Técnicos/{name}'] = tecnicos[:, j]
+
+    plagas = _one_hot(rng, n_rows, len(PLAGAS), 0.02)
+    data['Evidencia de plagas'] = np.where(plagas[:, PLAGAS.index('Sin evidencia')] == 1,
+                                           'Sin evidencia', 'Moscas')
+    for j, plaga in enumerate(PLAGAS):
+        data[f'Evidencia de plagas/{plaga}'] = plagas[:, j]
+    data['Cuales otras plagase evidenció?'] = _sparse_text(rng, n_rows, 0.002, 'Palomas')
+
+    for cantidad_col, detalle_col in HALLAZGOS_PREVENTIVOS:
+        mask = rng.random(n_rows) < 0.01
+        cantidad = np.full(n_rows, np.nan)
+        cantidad[mask] = rng.integers(1, 50, size=mask.sum())
+        detalle = np.full(n_rows, np.nan, dtype=object)
+        detalle[mask] = 'Hallazgo en zona de almacenamiento'
+        data[cantidad_col] = cantidad
+        data[detalle_col] = detalle
+
+    data['Plaguicidas'] = rng.choice(['Demand CS', 'Sipertrin SC', 'Black Jack-Gel'], size=n_rows)
+    data['Servicio verificado por'] = _sparse_text(rng, n_rows, 0.95, 'Supervisor de área')
+    data['OBSERVACIONES'] = _sparse_text(rng, n_rows, 0.6, 'Excelentes condiciones higiénicas')
+    data['_index'] = np.arange(1, n_rows + 1)
+
+    return pd.DataFrame(data)
+
+
+def _por_sede(rng: np.random.Generator, sedes: np.ndarray, sede: str, labels) -> np.ndarray:
+    """Columna con un valor de `labels` solo en las filas de `sede` (NaN en las demás)."""
+    values = np.full(len(sedes), np.nan, dtype=object)
+    mask = sedes == sede
+    values[mask] = rng.choice(labels, size=mask.sum())
+    return values
+
+
+def make_roedores_raw(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera una exportación sintética de Roedores con `n_rows` filas.
+
+    Cada fila trae el número de estación de su sede (la otra columna vacía), el
+    estado de la estación en one-hot (con 'Consumido' vacío en la mitad de los
+    envíos, como en las versiones anteriores del formulario) y los técnicos.
+    """
+    rng = np.random.default_rng(seed)
+    sedes = rng.choice(SEDES_SINTETICAS, size=n_rows)
+    data = {
+        'Fecha': _fechas(rng, n_rows),
+        'Sede': sedes,
+        'Número de estación Medellín': _por_sede(rng, sedes, 'Medellín', np.arange(1, 60)),
+        'Número de estación Rionegro': _por_sede(rng, sedes, 'Rionegro', np.arange(1, 90)),
+    }
+
+    tecnicos = _one_hot(rng, n_rows, len(TECNICOS), 0.1)
+    for j, name in enumerate(TECNICOS):
+        data[f'Técnicos/{name}'] = tecnicos[:, j]
+
+    estados = _one_hot(rng, n_rows, len(ESTADOS_ESTACION), 0.05).astype(float)
+    estados[rng.random(n_rows) < 0.5, ESTADOS_ESTACION.index('Consumido')] = np.nan
+    for j, estado in enumerate(ESTADOS_ESTACION):
+        data[f'Estado de la estación/{estado}'] = estados[:, j]
+
+    data['Localización'] = '6.152968 -75.43471 2166.3 20.4'
+    data['Plaguicida'] = rng.choice(['Klerat', 'Ratunet', 'Otro'], size=n_rows)
+    data['OBSERVACIONES'] = _sparse_text(rng, n_rows, 0.99, 'Sin novedad')
+    data['_index'] = np.arange(1, n_rows + 1)
+
+    return pd.DataFrame(data)
+
+
+def make_lamparas_raw(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera una exportación sintética de Lámparas con `n_rows` filas.
+
+    Incluye la lámpara de la sede de cada fila, el estado de la lámpara y las
+    especies encontradas en one-hot, las capturas por especie (vacías cuando no
+    hubo capturas) y la columna de "otra especie", que mezcla texto y números.
+    """
+    rng = np.random.default_rng(seed)
+    sedes = rng.choice(SEDES_SINTETICAS, size=n_rows)
+    data = {
+        'Fecha': _fechas(rng, n_rows),
+        'Sede': sedes,
+        'Lámpara Rionegro': _por_sede(rng, sedes, 'Rionegro', [f'{i} Ingreso - Torre A' for i in range(1, 30)]),
+        'Lámparas Medellín': _por_sede(rng, sedes, 'Medellín', [f'Sala {i}' for i in range(1, 40)]),
+    }
+
+    tecnicos = _one_hot(rng, n_rows, len(TECNICOS), 0.1)
+    for j, name in enumerate(TECNICOS):
+        data[f'Técnicos/{name}'] = tecnicos[:, j]
+
+    estados = _one_hot(rng, n_rows, len(ESTADOS_LAMPARA), 0.05)
+    for j, estado in enumerate(ESTADOS_LAMPARA):
+        data[f'Estado de la lámpara/{estado}'] = estados[:, j]
+    data['Estado del tubo'] = rng.choice(['Alta potencia', 'Media potencia', 'Sin potencia'], size=n_rows)
+
+    especies = _one_hot(rng, n_rows, len(ESPECIES_LAMPARA), 0.5)
+    for j, especie in enumerate(ESPECIES_LAMPARA):
+        data[f'Especies encontradas/{especie}'] = especies[:, j]
+    data['Cual otra especie encontró?'] = _sparse_text(rng, n_rows, 0.01, 'Libélula')
+
+    for j, especie in enumerate(ESPECIES_LAMPARA[:-1]):
+        cantidad = rng.integers(1, 200, size=n_rows).astype(float)
+        cantidad[especies[:, j] == 0] = np.nan
+        data[f'Cantidad de {especie.lower()}'] = cantidad
+    data['Cantidad de ${Otra_especie_encontrada}'] = _sparse_text(rng, n_rows, 0.01, '1')
+
+    data['OBSERVACIONES'] = _sparse_text(rng, n_rows, 0.67, 'Excelentes condiciones higiénicas')
+    data['_index'] = np.arange(1, n_rows + 1)
+
+    return pd.DataFrame(data)
@@ -20,6 +20,13 @@ API_URLS = {
     'lamparas': 'https://kf.kobotoolbox.org/api/v2/assets/aJQdE5dQrEh3j8Q26LzGUo/export-settings/esR8A6WquxNsjcsqihXgCMx/data.csv'
 }
 
+# Endpoints paginados de datos para la sincronización incremental (ver SYNC_CONFIG)
+SYNC_URLS = {
+    'preventivos': 'https://kf.kobotoolbox.org/api/v2/assets/aB3FoJyiCjAoXF5ejP69Au/data/',
+    'roedores': 'https://kf.kobotoolbox.org/api/v2/assets/a9E2TU2PJxCqH3JWtZv9Lb/data/',
+    'lamparas': 'https://kf.kobotoolbox.org/api/v2/assets/aJQdE5dQrEh3j8Q26LzGUo/data/'
+}
+
 # Archivos CSV locales
 LOCAL_FILES = {
     'preventivos': 'data/Preventivos.csv',
@@ -27,6 +34,162 @@ LOCAL_FILES = {
     'lamparas': 'data/Lámparas.csv'
 }
 
+# Sincronización incremental: en lugar de descargar la exportación completa, se piden
+# solo los envíos con `high_water_field` mayor al último almacenado en el CSV local.
+SYNC_CONFIG = {
+    'enabled': False,  # Cambiar a True para sincronizar antes de cada carga
+    'high_water_field': '_id',  # '_id' o '_submission_time'
+    'page_size': 1000,
+    'timeout_seconds': 60,
+    'state_directory': 'data/.sync'
+}
+
+# Descarga de las exportaciones desde API_URLS cuando falta el archivo local:
+# sesión keep-alive compartida, gzip y peticiones condicionales (ETag / Last-Modified)
+# contra la última copia descargada (ver data_processing.http_fetch)
+HTTP_FETCH_CONFIG = {
+    'enabled': True,  # False: pd.read_csv directo sobre la URL, sin copia local
+    'directory': 'data/.http',
+    'timeout_seconds': 60,
+    'compression': True,
+    'max_idle_per_host': 3,
+    'max_redirects': 5
+}
+
+# Caché columnar (Feather/Arrow) de las exportaciones CSV locales.
+# Requiere pyarrow; si no está instalado la caché se desactiva automáticamente.
+CACHE_CONFIG = {
+    'enabled': True,
+    'directory': 'data/.cache',
+    'cache_transformed': True  # Guardar también el frame transformado (se invalida si cambia el código)
+}
+
+# Caché por etapas del pipeline (carga → transformación → agregados → documento):
+# cada salida se guarda bajo el hash de sus entradas y de su código, y una nueva
+# ejecución solo recalcula las etapas afectadas por lo que cambió (ver pipeline_cache)
+PIPELINE_CACHE_CONFIG = {
+    'enabled': True,
+    'directory': 'data/.cache/stages',
+    'max_entries_per_stage': 3,
+    # Código y plantillas de los que dependen los documentos: cambiarlos los invalida
+    # (todo data_processing: cubos, períodos, particiones, historial y transformaciones)
+    'document_code_paths': ['reports', 'visualisations', 'llm_integration', 'config', 'data_processing',
+                            'prompt_manager.py']
+}
+
+# Historial de registros limpios (--history) en Parquet particionado por sede / año / mes:
+# los meses cerrados se congelan y los reportes leen solo las particiones que necesitan
+# (ver data_processing.history_store)
+HISTORY_CONFIG = {
+    'enabled': False,
+    'directory': 'data/history',
+    # Meses de las gráficas de tendencia cuando se lee desde el historial
+    'trend_months': 12
+}
+
+# Reportes por rango de meses (--range): mes, trimestre, ciclo de contrato o año hasta la fecha
+# (ver data_processing.report_periods)
+REPORT_RANGE_CONFIG = {
+    # None: reporte mensual con los datos de toda la historia (comportamiento original)
+    'default': None,
+    # Mes (1-12) en que empieza el ciclo de contrato de 12 meses
+    'cycle_start_month': 1
+}
+
+# Carga por bloques (--stream) para exportaciones con muchos años de historia:
+# el CSV se lee, transforma y agrega de a 'chunksize' filas (ver data_processing.streaming)
+STREAMING_CONFIG = {
+    'enabled': False,
+    'chunksize': 50_000
+}
+
+# Carga concurrente de las tres exportaciones (lectura + transformación de cada una):
+# 'threads' solapa la espera de red y el parseo de pyarrow (libera el GIL); 'processes'
+# sirve para el lector de pandas sin pyarrow en varios núcleos; 'serial' las carga en orden
+LOADING_CONFIG = {
+    'executor': 'threads',
+    'max_workers': 3
+}
+
+# Esquemas de lectura de las exportaciones CSV: solo se leen las columnas que usa
+# cada transform_*_df, con tipos compactos. 'columns' son columnas exactas y
+# 'prefixes' familias de columnas (bloques one-hot de KoBo, cantidades); un tipo
+# None deja que el lector lo infiera (la carga por bloques los lee como texto, ya que
+# cada bloque inferiría un tipo distinto). Las marcas one-hot son UInt8 (con nulos):
+# KoBo deja vacías las opciones añadidas después de envíos anteriores.
+CSV_SCHEMAS = {
+    'preventivos': {
+        'columns': {
+            'Fecha': None, 'Sede': 'category', 'Código': 'category',
+            'Torre o Área': None, 'Bloque o Área': None,
+            'Ubicación Bloque 1': None, 'Ubicación Bloque 2': None, 'Ubicación Bloque 3': None,
+            'Ubicación Bloque 4': None, 'Ubicación Bloque 5 (verde)': None, 'Ubicación Bloque 6': None,
+            'Ubicación Bloque 7': None, 'Ubicación Bloque 8': None, 'Ubicación Bloque 9': None,
+            'Ubicación Bloque 10': None, 'Ubicación Bloque 11': None, 'Ubicación Bloque 12': None,
+            'Ubicación Bloque 13': None, 'Ubicación Bloque 14': None, 'Ubicación Bloque 15': None,
+            'Ubicación Bloque 16': None, 'Ubicación Bloque 17': None,
+            'Acopio de Basuras y portería': None, 'Plantas de Emergencias': None,
+            'Áreas Quirúrgicas': None, 'Cuartos técnicos y gases medicinales': None,
+            'Zona externa': None, 'Torre A': None, 'Torre B': None, 'Torre C': None, 'Torre D': None,
+            'Evidencia de plagas': None, 'Cuales otras plagase evidenció?': None,
+            'Plaguicidas': None, 'Servicio verificado por': None, 'OBSERVACIONES': None,
+            '_index': 'int64'
+        },
+        'prefixes': {
+            'Técnicos/': 'UInt8',
+            'Evidencia de plagas/': 'UInt8',
+            'Cantidad de hallazgos ': 'Int16',
+            'Detalles del hallazgo': None
+        },
+        'dates': ['Fecha']
+    },
+    'roedores': {
+        'columns': {
+            'Fecha': None, 'Sede': 'category',
+            'Número de estación Medellín': 'Int16', 'Número de estación Rionegro': 'Int16',
+            'Localización': None, 'Plaguicida': None, 'OBSERVACIONES': None, '_index': 'int64'
+        },
+        'prefixes': {
+            'Técnicos/': 'UInt8',
+            'Estado de la estación/': 'UInt8'
+        },
+        'dates': ['Fecha']
+    },
+    'lamparas': {
+        'columns': {
+            'Fecha': None, 'Sede': 'category',
+            'Lámpara Rionegro': None, 'Lámparas Medellín': None, 'Estado del tubo': None,
+            'Cual otra especie encontró?': None, 'OBSERVACIONES': None, '_index': 'int64',
+            # Mezcla números y texto en la exportación: se deja como texto
+            'Cantidad de ${Otra_especie_encontrada}': None
+        },
+        'prefixes': {
+            'Técnicos/': 'UInt8',
+            'Estado de la lámpara/': 'UInt8',
+            'Especies encontradas/': 'UInt8',
+            # Las capturas mensuales de una lámpara superan el rango de Int16
+            'Cantidad de ': 'Int32'
+        },
+        'dates': ['Fecha']
+    }
+}
+
+# Gráficas por facetas (barras + línea por métrica): 'matplotlib' dibuja directamente
+# desde la tabla agregada; 'seaborn' usa FacetGrid + barplot + lineplot (más lento)
+CHART_CONFIG = {
+    'facet_backend': 'matplotlib'
+}
+
+# Caché en disco de las imágenes PNG de las gráficas mensuales, direccionada por el
+# contenido de la tabla agregada de cada gráfica. Se eliminan las imágenes usadas
+# hace más tiempo (LRU) cuando el directorio supera `max_size_mb`.
+RENDER_CACHE_CONFIG = {
+    'enabled': True,
+    'directory': 'data/.cache/figures',
+    'max_size_mb': 200,
+    'style_version': 1  # Incrementar al cambiar el estilo de las gráficas sin cambiar su código
+}
+
 # =============================================================================
 # CONFIGURACIÓN LLM
 # =============================================================================
@@ -37,13 +200,32 @@ LLM_CONFIG = {
     'provider': 'openai',  # 'openai', 'anthropic', 'local'
     'model': 'gpt-4',
     'max_tokens': 500,
-    'temperature': 0.3
+    'temperature': 0.3,
+    # Cliente asíncrono (llm_integration.async_client): los prompts de tablas se
+    # envían en paralelo y los resúmenes esperan a los análisis de los que dependen
+    'base_url': None,  # None usa el endpoint del proveedor; p. ej. 'http://127.0.0.1:8000/v1' para un servidor local
+    'max_concurrency': 4,  # Peticiones simultáneas como máximo
+    'requests_per_second': 2.0,  # Ritmo sostenido del token bucket
+    'burst': 4,  # Peticiones que pueden salir de golpe antes de aplicar el ritmo
+    'max_retries': 3,  # Reintentos ante 429, errores 5xx, de red o tiempo agotado
+    'backoff_seconds': 1.0,  # Espera base del backoff exponencial (se duplica en cada reintento)
+    'timeout_seconds': 60  # Tiempo máximo de espera del socket por petición
+}
+
+# Caché persistente (SQLite) de respuestas del LLM, por proveedor, modelo, temperatura,
+# máximo de tokens y hash del prompt (ver llm_integration/response_cache.py)
+LLM_CACHE_CONFIG = {
+    'enabled': True,
+    'path': 'data/.cache/llm_responses.sqlite',
+    'ttl_days': 90,  # Días de vigencia de una respuesta (None = sin vencimiento)
+    'max_size_mb': 50  # Al superarlo se eliminan las respuestas usadas hace más tiempo
 }
 
 # Claves API (cargadas desde variables de entorno)
 API_KEYS = {
     'openai': os.getenv('OPENAI_API_KEY'),
     'anthropic': os.getenv('ANTHROPIC_API_KEY'),
+    'kobo': os.getenv('KOBO_API_TOKEN'),  # Token para la sincronización incremental
 }
 
 # =============================================================================
@@ -56,13 +238,26 @@ DOCUMENT_CONFIG = {
     'logo_width_inches': 3.25,
     'table_style': 'Table Grid',
     'figure_width_inches': 5.5,
-    'figure_dpi': 300,
+    # Perfil de las gráficas (ver RENDER_PROFILES): 'draft', 'final' o 'vector'
+    'render_profile': 'final',
+    # False genera los reportes solo con tablas y prompts (sin dibujar las gráficas ni importar matplotlib)
+    'include_figures': True,
     # 🆕 Configuración para mostrar prompts en documentos (solo para revisión)
     'include_prompts_in_document': True,  # Cambiar a False para versión final sin prompts
     'prompt_style': 'detailed',  # 'detailed' o 'compact'
     'show_llm_placeholders': True  # Mostrar marcadores donde irían las respuestas del LLM
 }
 
+# Perfiles de codificación de las gráficas
+#   draft:  PNG liviano para revisiones (96 dpi, sin recorte de márgenes con bbox 'tight')
+#   final:  PNG de 300 dpi (calidad de producción)
+#   vector: SVG incrustado en el docx, con un PNG de respaldo para visores sin soporte SVG
+RENDER_PROFILES = {
+    'draft': {'format': 'png', 'dpi': 96, 'bbox_tight': False},
+    'final': {'format': 'png', 'dpi': 300, 'bbox_tight': True},
+    'vector': {'format': 'svg', 'dpi': 300, 'bbox_tight': True, 'fallback_dpi': 150},
+}
+
 # Texto introductorio del reporte
 REPORT_INTRO = (
     "A continuación, el resultado del ejercicio del séptimo mes (marzo) del ciclo de análisis de 12 meses "
@@ -89,7 +284,9 @@ SEDES = ['Rionegro', 'Medellín']
 LOGGING_CONFIG = {
     'level': 'INFO',
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    'file_path': 'logs/serviplagas.log'
+    'file_path': 'logs/serviplagas.log',
+    'instrumentation': False,  # Tiempos y memoria por etapa como líneas JSON en file_path (--instrument)
+    'trace_memory': False  # Pico de memoria de Python por etapa con tracemalloc (más lento)
 }
 
 # =============================================================================
@@ -98,7 +295,13 @@ LOGGING_CONFIG = {
 
 # Configuración para los prompts del LLM
 PROMPT_CONFIG = {
-    'max_table_rows_display': 20,  # Máximo número de filas a mostrar en prompts
+    'max_table_rows_display': 20,  # Meses (filas) textuales por tabla; los anteriores se resumen
+    'general_recent_months': 3,    # Meses textuales por tabla en el resumen general
+    'table_format': 'csv',         # 'csv' o 'markdown' (ver llm_integration/table_serializer.py)
+    # Presupuesto de tokens estimados por prompt (plantilla + tablas)
+    'table_prompt_max_tokens': 1500,
+    'section_prompt_max_tokens': 3000,
+    'general_prompt_max_tokens': 4000,
     'analysis_max_words': 150,     # Máximo de palabras para análisis individual
     'section_summary_max_words': 200,  # Máximo de palabras para resumen de sección
     'general_summary_max_words': 300,  # Máximo de palabras para resumen general
@@ -0,0 +1,315 @@
+"""
+Caché columnar (Feather/Arrow IPC) para las exportaciones CSV de KoBoToolbox.
+
+La primera carga de un CSV guarda el DataFrame en un archivo Feather sin comprimir
+junto a un manifiesto JSON con la huella del origen (ruta, tamaño, mtime y SHA-256
+del contenido). Las cargas siguientes validan la huella y leen el Feather mediante
+memory-map, evitando por completo el parseo del CSV. Si el CSV cambia, la caché
+se invalida y se reescribe automáticamente.
+
+pyarrow es una dependencia opcional: si no está instalado la caché se desactiva
+y el sistema sigue leyendo los CSV como siempre.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+from datetime import datetime
+from types import ModuleType
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import CACHE_CONFIG
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_warned_missing_pyarrow = False
+
+
+def is_pyarrow_available() -> bool:
+    """Verifica si pyarrow está instalado (avisa una sola vez si no lo está)."""
+    global _warned_missing_pyarrow
+    try:
+        import pyarrow.feather  # noqa: F401
+        return True
+    except ImportError:
+        if not _warned_missing_pyarrow:
+            print("⚠️  pyarrow no instalado: caché columnar desactivada. Instalar con: pip install pyarrow")
+            _warned_missing_pyarrow = True
+        return False
+
+
+def is_cache_enabled() -> bool:
+    """Indica si la caché está habilitada en la configuración y pyarrow disponible."""
+    return CACHE_CONFIG.get('enabled', False) and is_pyarrow_available()
+
+
+def file_sha256(path: str) -> str:
+    """Calcula el SHA-256 del contenido de un archivo leyéndolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path: str, sha256: Optional[str] = None) -> Dict:
+    """Huella de un archivo de origen: ruta absoluta, tamaño, mtime y hash del contenido."""
+    stat = os.stat(path)
+    return {
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256 if sha256 is not None else file_sha256(path),
+    }
+
+
+def _cache_paths(source: str, variant: str) -> tuple:
+    """Rutas del archivo Feather y su manifiesto para un origen y una variante."""
+    source_abs = os.path.abspath(source)
+    path_key = hashlib.sha1(source_abs.encode('utf-8')).hexdigest()[:10]
+    stem = os.path.splitext(os.path.basename(source))[0]
+    base = os.path.join(CACHE_CONFIG['directory'], f"{stem}-{path_key}-{variant}")
+    return f"{base}.feather", f"{base}.json"
+
+
+def _read_manifest(manifest_path: str) -> Optional[Dict]:
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _matches_source(manifest: Dict, manifest_path: str, source: str) -> bool:
+    """
+    Compara la huella guardada con el archivo actual.
+
+    Si tamaño y mtime coinciden se acepta sin releer el archivo; si alguno cambió
+    se recalcula el hash, de modo que un CSV re-descargado con el mismo contenido
+    sigue aprovechando la caché.
+    """
+    stat = os.stat(source)
+    saved = manifest.get('source_fingerprint', {})
+    if saved.get('size') == stat.st_size and saved.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if saved.get('size') != stat.st_size:
+        return False
+
+    if saved.get('sha256') == file_sha256(source):
+        saved['mtime_ns'] = stat.st_mtime_ns
+        with open(manifest_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        return True
+    return False
+
+
+def _none_null_columns(df: pd.DataFrame) -> list:
+    """Columnas de texto cuyos nulos son None (y no NaN) en el frame original."""
+    columns = []
+    for col in df.columns[df.dtypes == object]:
+        nulls = df[col][df[col].isna()]
+        if not nulls.empty and nulls.iloc[0] is None:
+            columns.append(col)
+    return columns
+
+
+def _restore_nulls(df: pd.DataFrame, none_columns: list) -> pd.DataFrame:
+    """Arrow devuelve None en columnas de texto; se restituye NaN donde el original lo tenía."""
+    keep_none = set(none_columns)
+    for col in df.columns[df.dtypes == object]:
+        if col not in keep_none and df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def _mixed_object_columns(df: pd.DataFrame) -> list:
+    """Columnas object con valores de varios tipos (p. ej. texto y enteros), no representables en Arrow."""
+    return [col for col in df.columns[df.dtypes == object]
+            if df[col].dropna().map(type).nunique() > 1]
+
+
+def _encode_mixed(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_mixed_columns(df: pd.DataFrame, mixed_columns: list) -> pd.DataFrame:
+    if not mixed_columns:
+        return df
+    return df.assign(**{col: df[col].map(_encode_mixed, na_action='ignore') for col in mixed_columns})
+
+
+def frame_to_arrow(df: pd.DataFrame, mixed_columns: Optional[list] = None, schema=None) -> tuple:
+    """
+    Convierte `df` en una tabla de Arrow.
+
+    Las columnas con tipos mezclados se guardan como texto JSON por valor para
+    poder restituir cada valor con su tipo original al leer (arrow_to_frame).
+    Con `mixed_columns` se codifican esas columnas sin detectarlas, y con `schema`
+    la tabla toma ese esquema (p. ej. el de todo el frame al escribir una parte).
+
+    Returns:
+        Tuple: (pyarrow.Table, metadatos necesarios para arrow_to_frame)
+    """
+    import pyarrow as pa
+
+    if mixed_columns is None:
+        mixed_columns = []
+        try:
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mixed_columns = _mixed_object_columns(df)
+            table = pa.Table.from_pandas(_encode_mixed_columns(df, mixed_columns), schema=schema,
+                                         preserve_index=False)
+    else:
+        table = pa.Table.from_pandas(_encode_mixed_columns(df, mixed_columns), schema=schema, preserve_index=False)
+    return table, {
+        'none_null_columns': _none_null_columns(df),
+        'mixed_columns': mixed_columns,
+    }
+
+
+def arrow_to_frame(table, meta: Optional[Dict] = None) -> pd.DataFrame:
+    """Convierte una tabla escrita con frame_to_arrow en DataFrame, restituyendo nulos y tipos."""
+    meta = meta or {}
+    df = table.to_pandas()
+    for col in meta.get('mixed_columns', []):
+        df[col] = df[col].map(json.loads, na_action='ignore')
+    return _restore_nulls(df, meta.get('none_null_columns', []))
+
+
+def write_feather_frame(df: pd.DataFrame, path: str) -> Dict:
+    """
+    Escribe `df` como Feather sin comprimir (apto para memory-map), de forma atómica.
+
+    Returns:
+        Dict: Metadatos necesarios para leer el frame con read_feather_frame
+    """
+    import pyarrow.feather as feather
+
+    table, meta = frame_to_arrow(df)
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return meta
+
+
+def read_feather_frame(path: str, meta: Optional[Dict] = None) -> pd.DataFrame:
+    """Lee (con memory-map) un Feather escrito por write_feather_frame y restituye nulos y tipos."""
+    import pyarrow.feather as feather
+
+    return arrow_to_frame(feather.read_table(path, memory_map=True), meta)
+
+
+def read_cached_frame(source: str, variant: str = 'raw', extra_key: str = '') -> Optional[pd.DataFrame]:
+    """
+    Devuelve el DataFrame en caché para `source` si sigue siendo válido.
+
+    Args:
+        source: Ruta al CSV de origen
+        variant: Tipo de frame guardado ('raw' o el nombre de una transformación)
+        extra_key: Clave adicional que debe coincidir (p. ej. versión del código)
+
+    Returns:
+        pd.DataFrame o None si no hay caché válida
+    """
+    if not is_cache_enabled() or not os.path.exists(source):
+        return None
+
+    feather_path, manifest_path = _cache_paths(source, variant)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(feather_path):
+        return None
+    if manifest.get('extra_key', '') != extra_key or not _matches_source(manifest, manifest_path, source):
+        return None
+
+    try:
+        return read_feather_frame(feather_path, manifest)
+    except Exception as e:
+        print(f"⚠️  Caché columnar ilegible ({feather_path}): {e}")
+        return None
+
+
+def write_cached_frame(source: str, df: pd.DataFrame, variant: str = 'raw', extra_key: str = '') -> bool:
+    """
+    Guarda `df` como Feather sin comprimir (apto para memory-map) junto a su manifiesto.
+
+    Returns:
+        bool: True si la caché se escribió correctamente
+    """
+    if not is_cache_enabled() or not os.path.exists(source):
+        return False
+
+    feather_path, manifest_path = _cache_paths(source, variant)
+    try:
+        os.makedirs(os.path.dirname(feather_path), exist_ok=True)
+        frame_meta = write_feather_frame(df, feather_path)
+
+        manifest = {
+            'variant': variant,
+            'extra_key': extra_key,
+            'source_fingerprint': source_fingerprint(source),
+            'rows': len(df),
+            'columns': len(df.columns),
+            **frame_meta,
+            'created': datetime.now().isoformat(),
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        print(f"⚠️  No se pudo escribir la caché columnar para {source}: {e}")
+        return False
+
+
+# Raíz del proyecto: los módulos bajo ella (fuera de entornos virtuales) son código propio
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _project_module(obj) -> Optional[ModuleType]:
+    """Módulo del proyecto al que pertenece `obj` (un módulo importado o algo definido en él)."""
+    module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    if not path.startswith(_PROJECT_ROOT + os.sep) or 'site-packages' in path:
+        return None
+    return module
+
+
+def _imported_project_modules(module: ModuleType) -> list:
+    """El módulo y los módulos del proyecto que importa, directa o indirectamente, ordenados por nombre."""
+    found = {module.__name__: module}
+    pending = [module]
+    while pending:
+        for value in list(vars(pending.pop()).values()):
+            dependency = _project_module(value)
+            if dependency is not None and dependency.__name__ not in found:
+                found[dependency.__name__] = dependency
+                pending.append(dependency)
+    return [found[name] for name in sorted(found)]
+
+
+def transform_cache_key(transform: Callable) -> str:
+    """
+    Clave de versión de una transformación: nombre + hash del código de su módulo y de los
+    módulos del proyecto que este importa (p. ej. one_hot_decoder para data_cleaner), así
+    un cambio en una dependencia también invalida lo que se guardó con la clave.
+    """
+    digest = hashlib.sha256()
+    module = inspect.getmodule(transform)
+    for dependency in ([] if module is None else _imported_project_modules(module)):
+        try:
+            module_source = inspect.getsource(dependency)
+        except (OSError, TypeError):
+            module_source = ''
+        digest.update(dependency.__name__.encode('utf-8'))
+        digest.update(module_source.encode('utf-8'))
+    code_hash = digest.hexdigest()[:16]
+    return f"{transform.__module__}.{transform.__qualname__}:{code_hash}"
@@ -0,0 +1,104 @@
+"""
+Carga concurrente de las exportaciones (Preventivos, Roedores y Lámparas).
+
+Cada exportación es una tarea independiente (sincronización, lectura y
+transformación) y las tareas corren en un pool: la transformación de cada
+dataset empieza apenas su propio frame está listo, sin esperar a los demás.
+    - 'threads': el lector de pyarrow libera el GIL al parsear y la espera de
+      red (URL de fallback, sincronización incremental) se solapa
+    - 'processes': cada tarea en un proceso propio (spawn), para el lector de
+      pandas sin pyarrow, que retiene el GIL durante buena parte del parseo. El
+      frame vuelve al proceso principal por pickle y cada proceso paga la
+      importación de pandas: solo conviene con exportaciones grandes y varios núcleos
+    - 'serial': en orden, en el proceso actual
+Con 'processes' las tareas deben poder serializarse (funciones de módulo o
+functools.partial de ellas).
+
+Por cada dataset se informa cuándo quedó listo desde el inicio de la carga, y al
+final la ruta crítica (el dataset que define la duración total) frente a la suma
+de las tareas. Cada tarea se mide además como la etapa 'carga' de la instrumentación.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import LOADING_CONFIG
+from instrumentation import drain_spans, enable_instrumentation, instrumentation_settings, record_spans, span
+
+EXECUTORS = ('serial', 'threads', 'processes')
+
+
+def _run_task(name: str, task: Callable[[], Any], instrumentation: Optional[Dict] = None):
+    """Ejecuta la tarea de un dataset; devuelve (resultado, segundos, etapas medidas en otro proceso)."""
+    if instrumentation is not None:
+        # Proceso trabajador: las etapas vuelven al proceso principal con el resultado
+        enable_instrumentation(to_file=False, **instrumentation)
+    start = time.perf_counter()
+    with span('carga', dataset=name):
+        result = task()
+    elapsed = time.perf_counter() - start
+    return result, elapsed, drain_spans() if instrumentation is not None else []
+
+
+def load_concurrently(tasks: Dict[str, Callable[[], Any]], executor: Optional[str] = None,
+                      max_workers: Optional[int] = None, return_exceptions: bool = False) -> Dict[str, Any]:
+    """
+    Ejecuta las tareas de carga de varios datasets en paralelo.
+
+    Args:
+        tasks: Dataset -> función sin argumentos que lo carga (y transforma),
+            p. ej. functools.partial(load_data_with_fallback, ruta, url, transform=...)
+        executor: 'threads', 'processes' o 'serial' (por defecto LOADING_CONFIG['executor'])
+        max_workers: Tareas simultáneas (por defecto LOADING_CONFIG['max_workers'])
+        return_exceptions: Devolver la excepción de una tarea fallida como su resultado
+            en lugar de lanzarla (después de esperar a las demás)
+
+    Returns:
+        Dict[str, Any]: Resultado de cada tarea, en el orden de `tasks`
+    """
+    executor = executor or LOADING_CONFIG.get('executor', 'threads')
+    if executor not in EXECUTORS:
+        print(f"⚠️  Modo de carga '{executor}' desconocido; se usa 'threads'")
+        executor = 'threads'
+    workers = max(1, min(max_workers or LOADING_CONFIG.get('max_workers', 3), len(tasks)))
+
+    results, errors, latencies, task_seconds = {}, {}, {}, {}
+    start = time.perf_counter()
+
+    def _collect(name: str, run: Callable[[], Any]):
+        try:
+            results[name], task_seconds[name], spans = run()
+            record_spans(spans)
+            latencies[name] = time.perf_counter() - start
+            print(f"   ⏱️  {name}: listo a los {latencies[name]:.2f}s")
+        except Exception as e:
+            errors[name] = e
+            latencies[name] = time.perf_counter() - start
+            print(f"   ❌ {name}: error a los {latencies[name]:.2f}s: {e}")
+
+    if executor == 'serial' or workers == 1:
+        for name, task in tasks.items():
+            _collect(name, lambda: _run_task(name, task))
+    else:
+        if executor == 'threads':
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='carga')
+            instrumentation = None
+        else:
+            # 'spawn' evita heredar por fork el estado del proceso principal
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+            instrumentation = instrumentation_settings()
+        with pool:
+            futures = {pool.submit(_run_task, name, task, instrumentation): name for name, task in tasks.items()}
+            for future in as_completed(futures):
+                _collect(futures[future], future.result)
+
+    if latencies:
+        critical = max(latencies, key=latencies.get)
+        print(f"🧭 Ruta crítica de la carga ({executor}): {critical}, {latencies[critical]:.2f}s "
+              f"(suma de las tareas: {sum(task_seconds.values()):.2f}s)")
+
+    if errors and not return_exceptions:
+        raise next(errors[name] for name in tasks if name in errors)
+    return {name: results[name] if name in results else errors[name] for name in tasks}
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 import calendar
 from typing import List
 
+from data_processing.one_hot_decoder import decode_one_hot
+
 
 ################################################
 ################ Preventivos ###################
@@ -36,11 +39,25 @@ def concatenate_tecnicos(row, tecnicos_cols):
     return ', '.join([col.split('/')[1] for col in tecnicos_cols if row[col] == 1])
 
 
-def format_mes_ano(date):
-    """Format a datetime as 'Mon YYYY'."""
-    if pd.isnull(date):
-        return None
-    return f"{calendar.month_name[date.month][:3]} {date.year}"
+def month_key(fecha: pd.Series) -> pd.Series:
+    """Integer yyyymm month key of a datetime Series (<NA> where the date is missing)."""
+    return (fecha.dt.year * 100 + fecha.dt.month).astype('Int64')
+
+
+def month_label(keys) -> pd.Categorical:
+    """
+    Ordered categorical 'Mon YYYY' labels of yyyymm month keys.
+
+    Only the distinct months are formatted; the categories follow the
+    chronological order of the keys, so sorting by the label sorts by date.
+    """
+    keys = pd.Series(keys, dtype='Int64')
+    missing = keys.isna().to_numpy()
+    unique_keys = np.sort(keys[~missing].unique().astype(np.int64))
+    labels = [f"{calendar.month_name[key % 100][:3]} {key // 100}" for key in unique_keys]
+    codes = np.searchsorted(unique_keys, keys.fillna(0).to_numpy(dtype=np.int64))
+    codes[missing] = -1
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
 
 
 def concatenate_details(row, detail_columns):
@@ -48,17 +65,49 @@ def concatenate_details(row, detail_columns):
     return ', '.join([f"{col}: {row[col]}" for col in detail_columns if pd.notna(row[col])])
 
 
+def _join_columns(df: pd.DataFrame, columns: List[str], sep: str,
+                  mode: str = 'values') -> pd.Series:
+    """
+    Column-wise equivalent of the row-wise concatenation helpers above.
+
+    Walks the columns once (not the rows) and appends each column's contribution
+    to an object array with ``np.where``, so the cost is one vectorized pass per
+    column instead of one Python call per row.
+
+    mode:
+        'values' -> non-null values as text (``concatenate_non_nulls``)
+        'details' -> "column: value" for non-null values (``concatenate_details``)
+    """
+    joined = np.full(len(df), '', dtype=object)
+    has_value = np.zeros(len(df), dtype=bool)
+
+    for col in columns:
+        series = df[col]
+        mask = series.notna().to_numpy()
+        if not mask.any():
+            continue
+
+        pieces = series[mask].astype(str).to_numpy(dtype=object)
+        if mode == 'details':
+            pieces = f"{col}: " + pieces
+
+        current = joined[mask]
+        joined[mask] = np.where(has_value[mask], current + sep + pieces, pieces)
+        has_value |= mask
+
+    return pd.Series(joined, index=df.index, dtype=object)
+
+
 def transform_preventivos_df(df: pd.DataFrame) -> pd.DataFrame:
     """Transform the 'preventivos' DataFrame according to the business rules."""
     df = df.copy()
 
     # Create 'Área' and 'Bloque/Torre' columns
-    df['Área'] = df[UBICACION_COLUMNS].apply(concatenate_non_nulls, axis=1)
-    df['Bloque/Torre'] = df[BLOQUE_TORRE_COLUMNS].apply(concatenate_non_nulls, axis=1)
+    df['Área'] = _join_columns(df, UBICACION_COLUMNS, ' ')
+    df['Bloque/Torre'] = _join_columns(df, BLOQUE_TORRE_COLUMNS, ' ')
 
     # Process Técnicos
-    tecnicos_cols = [col for col in df.columns if col.startswith('Técnicos/')]
-    df['Técnicos'] = df.apply(lambda row: concatenate_tecnicos(row, tecnicos_cols), axis=1)
+    df['Técnicos'] = decode_one_hot(df, 'Técnicos/')
 
     # Clean column names for 'Evidencia de plagas/'
     df.columns = [col.replace('Evidencia de plagas/', '') for col in df.columns]
@@ -69,14 +118,15 @@ def transform_preventivos_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # Format Fecha and Mes
     df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-    df['Mes'] = df['Fecha'].apply(format_mes_ano)
+    df['Mes_key'] = month_key(df['Fecha'])
+    df['Mes'] = month_label(df['Mes_key'])
 
     # Rename columns
     df.rename(columns=COLUMN_RENAMES, inplace=True)
 
     # Concatenate hallazgos (details)
     detail_cols = [col for col in df.columns if col.startswith('Detalles del hallazgo de ')]
-    df['Hallazgos'] = df.apply(lambda row: concatenate_details(row, detail_cols), axis=1)
+    df['Hallazgos'] = _join_columns(df, detail_cols, ', ', mode='details')
 
     # Clean column names starting with 'Cantidad de hallazgos'
     df.columns = [col.replace('Cantidad de hallazgos ', 'Cantidad ') if col.startswith('Cantidad de hallazgos ') else col for col in df.columns]
@@ -87,7 +137,7 @@ def transform_preventivos_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # Final column selection
     final_columns = [
-        'ID', 'Fecha', 'Mes', 'Sede', 'Código', 'Bloque/Torre', 'Área', 'Técnicos', 'Plagas evidenciadas',
+        'ID', 'Fecha', 'Mes', 'Mes_key', 'Sede', 'Código', 'Bloque/Torre', 'Área', 'Técnicos', 'Plagas evidenciadas',
         'Cucaracha Americana', 'Cucaracha Alemana', 'Hormigas', 'Moscas', 'Mosquitos', 'Ratón casero',
         'Rata Noruega', 'Ratón de tejado', 'Otras', 'Sin evidencia', 'Zancudos', 'Otras plagas',
         'Cantidad de Cucaracha Americana', 'Cantidad de Cucaracha Alemana ', 'Cantidad de Hormigas',
@@ -107,16 +157,6 @@ def transform_preventivos_df(df: pd.DataFrame) -> pd.DataFrame:
 
 
 
-def _extract_tecnicos(df: pd.DataFrame, prefix: str = 'Técnicos/') -> pd.Series:
-    """Concatenate technician names based on one-hot encoded columns."""
-    tecnicos_cols = [col for col in df.columns if col.startswith(prefix)]
-
-    def concatenate_tecnicos(row):
-        return ', '.join([col.split('/')[1] for col in tecnicos_cols if row[col] == 1])
-
-    return df[tecnicos_cols].apply(concatenate_tecnicos, axis=1)
-
-
 def _combine_station_numbers(row: pd.Series) -> str:
     """Concatenate station numbers from two locations."""
     values = []
@@ -127,29 +167,12 @@ def _combine_station_numbers(row: pd.Series) -> str:
     return ' '.join(values)
 
 
-def _format_mes_ano(date: pd.Timestamp) -> str:
-    """Format datetime into abbreviated month and year."""
-    if pd.isnull(date):
-        return ""
-    return f"{calendar.month_name[date.month][:3]} {date.year}"
-
-
-def _concat_estacion_estado(df: pd.DataFrame, prefix: str = 'Estado de la estación/') -> pd.Series:
-    """Concatenate the station status columns into a single readable string."""
-    estaciones_cols = [col for col in df.columns if col.startswith(prefix)]
-
-    def concatenar_estaciones(row):
-        return ' - '.join([col.split('/')[1] for col in estaciones_cols if row[col] == 1])
-
-    return df[estaciones_cols].apply(concatenar_estaciones, axis=1)
-
-
 def transform_roedores_df(df: pd.DataFrame) -> pd.DataFrame:
     """Transform the raw 'roedores' DataFrame according to business rules."""
     df = df.copy()
 
     # Técnicos
-    df['Técnicos'] = _extract_tecnicos(df)
+    df['Técnicos'] = decode_one_hot(df, 'Técnicos/')
 
     # Número de estación
     df['Numero de estación'] = df.apply(_combine_station_numbers, axis=1)
@@ -165,10 +188,11 @@ def transform_roedores_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # Convert date and extract month
     df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-    df['Mes'] = df['Fecha'].apply(_format_mes_ano)
+    df['Mes_key'] = month_key(df['Fecha'])
+    df['Mes'] = month_label(df['Mes_key'])
 
     # Concatenate station status columns
-    df['Estado de la estación'] = _concat_estacion_estado(df)
+    df['Estado de la estación'] = decode_one_hot(df, 'Estado de la estación/', sep=' - ')
 
     # Rename columns
     df.rename(columns={
@@ -191,6 +215,7 @@ def transform_roedores_df(df: pd.DataFrame) -> pd.DataFrame:
         'ID',
         'Fecha',
         'Mes',
+        'Mes_key',
         'Sede',
         'Numero de estación',
         'Técnicos',
@@ -219,18 +244,6 @@ def transform_roedores_df(df: pd.DataFrame) -> pd.DataFrame:
 ################################################
 
 
-def _format_mes_ano(date: pd.Timestamp) -> str:
-    """Format a datetime object into abbreviated month and year (e.g. 'Mar 2024')."""
-    if pd.isnull(date):
-        return ""
-    return f"{calendar.month_name[date.month][:3]} {date.year}"
-
-
-def _concatenate_binary_columns(row: pd.Series, columns: List[str], prefix: str) -> str:
-    """Concatenate labels from one-hot columns if their value is 1."""
-    return ', '.join([col.split(f'{prefix}/')[1] for col in columns if row[col] == 1])
-
-
 def _combine_non_null_values(row: pd.Series, columns: List[str]) -> str:
     """Combine values from a list of columns if not null."""
     return ' '.join([str(row[col]) for col in columns if pd.notna(row[col])])
@@ -254,14 +267,11 @@ def transform_lamparas_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # Convert and extract formatted date
     df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-    df['Mes'] = df['Fecha'].apply(_format_mes_ano)
+    df['Mes_key'] = month_key(df['Fecha'])
+    df['Mes'] = month_label(df['Mes_key'])
 
     # Técnicos
-    tecnicos_cols = [col for col in df.columns if col.startswith('Técnicos/')]
-    df['Técnicos'] = df[tecnicos_cols].apply(
-        lambda row: _concatenate_binary_columns(row, tecnicos_cols, 'Técnicos'),
-        axis=1
-    )
+    df['Técnicos'] = decode_one_hot(df, 'Técnicos/')
 
     # Concatenate lamp numbers
     df['Lámpara'] = df.apply(
@@ -270,18 +280,10 @@ def transform_lamparas_df(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # Estado de la lámpara
-    lamp_status_cols = [col for col in df.columns if col.startswith('Estado de la lámpara/')]
-    df['Estado de la lámpara'] = df[lamp_status_cols].apply(
-        lambda row: _concatenate_binary_columns(row, lamp_status_cols, 'Estado de la lámpara'),
-        axis=1
-    )
+    df['Estado de la lámpara'] = decode_one_hot(df, 'Estado de la lámpara/')
 
     # Especies encontradas
-    species_cols = [col for col in df.columns if col.startswith('Especies encontradas/')]
-    df['Especies encontradas'] = df[species_cols].apply(
-        lambda row: _concatenate_binary_columns(row, species_cols, 'Especies encontradas'),
-        axis=1
-    )
+    df['Especies encontradas'] = decode_one_hot(df, 'Especies encontradas/')
 
     # Combine 'Cual otra especie encontró?'
     df['Especies encontradas'] = df.apply(
@@ -314,7 +316,7 @@ def transform_lamparas_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # Final column order
     final_columns = [
-        'ID', 'Fecha', 'Mes', 'Técnicos', 'Sede', 'Lámpara', 'Estado de la lámpara',
+        'ID', 'Fecha', 'Mes', 'Mes_key', 'Técnicos', 'Sede', 'Lámpara', 'Estado de la lámpara',
         'Buena potencia', 'Deteriorada', 'Apagada',
         'Bombillo averiado', 'Desconectada', 'Faltante', 'Lámina saturada',
         'Obstruida', 'Baja potencia', 'Estado del tubo', 'Especies encontradas',
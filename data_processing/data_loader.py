@@ -1,13 +1,103 @@
+import numpy as np
 import pandas as pd
-from typing import Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import hashlib
+import json
 import os
 
-def load_data(source: str) -> pd.DataFrame:
+from data_processing.columnar_cache import (
+    is_pyarrow_available,
+    read_cached_frame,
+    write_cached_frame,
+    transform_cache_key
+)
+from data_processing.http_fetch import fetch_export
+from data_processing.kobo_sync import sync_kobo_export
+from config.settings import CACHE_CONFIG, CSV_SCHEMAS, HTTP_FETCH_CONFIG
+from instrumentation import span
+
+
+def schema_cache_key(schema: str) -> str:
+    """Clave de versión de un esquema de CSV_SCHEMAS (cambia si se edita el esquema)."""
+    content = json.dumps(CSV_SCHEMAS[schema], sort_keys=True, ensure_ascii=False)
+    return f"{schema}:{hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]}"
+
+
+def resolve_schema(columns: List[str], schema: str) -> Tuple[List[str], Dict[str, str], List[str]]:
+    """
+    Resuelve un esquema de CSV_SCHEMAS contra los encabezados reales de una exportación.
+
+    Args:
+        columns: Encabezados del CSV
+        schema: Nombre del esquema ('preventivos', 'roedores', 'lamparas')
+
+    Returns:
+        Tuple: (columnas a leer en el orden del archivo, tipos por columna, columnas de fecha)
+    """
+    spec = CSV_SCHEMAS[schema]
+    usecols, dtype = [], {}
+    for col in columns:
+        if col in spec['columns']:
+            col_dtype = spec['columns'][col]
+        else:
+            prefix = next((p for p in spec.get('prefixes', {}) if col.startswith(p)), None)
+            if prefix is None:
+                continue
+            col_dtype = spec['prefixes'][prefix]
+        usecols.append(col)
+        if col_dtype is not None:
+            dtype[col] = col_dtype
+    parse_dates = [col for col in spec.get('dates', []) if col in usecols]
+    return usecols, dtype, parse_dates
+
+
+def read_csv_with_schema(source: str, schema: str) -> pd.DataFrame:
+    """
+    Lee un CSV local con solo las columnas y los tipos declarados en su esquema.
+
+    Usa el lector multihilo de pyarrow si está instalado y, si no, el lector de pandas.
+    """
+    header = pd.read_csv(source, sep=';', nrows=0).columns
+    usecols, dtype, parse_dates = resolve_schema(list(header), schema)
+    options = {'sep': ';', 'usecols': usecols, 'dtype': dtype, 'parse_dates': parse_dates}
+    if is_pyarrow_available():
+        df = pd.read_csv(source, engine='pyarrow', **options)
+        # pyarrow devuelve None en los textos vacíos; el lector de pandas (y las transformaciones) usan NaN
+        for col in df.columns[df.dtypes == object]:
+            nulls = df[col].isna()
+            if nulls.any():
+                df.loc[nulls, col] = np.nan
+    else:
+        df = pd.read_csv(source, low_memory=False, **options)
+    return df[usecols]
+
+
+def _apply_schema(df: pd.DataFrame, schema: str) -> pd.DataFrame:
+    """Poda y convierte un DataFrame ya leído (p. ej. desde una URL) según su esquema."""
+    usecols, dtype, parse_dates = resolve_schema(list(df.columns), schema)
+    df = df[usecols].astype(dtype)
+    for col in parse_dates:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def load_data(source: str, use_cache: bool = True, schema: Optional[str] = None) -> pd.DataFrame:
     """
     Carga datos desde un archivo CSV local o una URL.
     
+    Los archivos locales pasan por la caché columnar (Feather): si el CSV no cambió
+    desde la última carga se lee la caché mediante memory-map y no se parsea el CSV.
+    Las URLs se descargan con petición condicional a una copia local (ver http_fetch),
+    que se carga igual que un archivo local.
+    
+    Con `schema` solo se leen las columnas que necesita la transformación, con los
+    tipos compactos declarados en CSV_SCHEMAS; sin él se leen todas las columnas
+    (p. ej. para reescribir el CSV en la sincronización incremental).
+    
     Args:
         source: Ruta al archivo CSV local o URL
+        use_cache: Si usar la caché columnar para archivos locales
+        schema: Nombre del esquema de CSV_SCHEMAS a aplicar (opcional)
         
     Returns:
         pd.DataFrame: DataFrame con los datos cargados
@@ -19,33 +109,119 @@ def load_data(source: str) -> pd.DataFrame:
         # Determinar si es archivo local o URL
         if source.startswith(('http://', 'https://')):
             print(f"📡 Cargando datos desde URL: {source[:50]}...")
-            return pd.read_csv(source, sep=';', low_memory=False)
+            if HTTP_FETCH_CONFIG.get('enabled', True):
+                # Descarga condicional a una copia local, que se lee como cualquier archivo local
+                return load_data(fetch_export(source), use_cache=use_cache, schema=schema)
+            df = pd.read_csv(source, sep=';', low_memory=False)
+            if schema is not None:
+                try:
+                    df = _apply_schema(df, schema)
+                except Exception as e:
+                    print(f"⚠️  No se pudo aplicar el esquema '{schema}', se usan todas las columnas: {e}")
+            return df
         else:
             # Verificar que el archivo existe
             if not os.path.exists(source):
                 raise FileNotFoundError(f"Archivo no encontrado: {source}")
                 
+            # La caché de un frame podado se guarda aparte y depende de la versión del esquema
+            variant, extra_key = ('schema', schema_cache_key(schema)) if schema is not None else ('raw', '')
+            if use_cache:
+                cached = read_cached_frame(source, variant=variant, extra_key=extra_key)
+                if cached is not None:
+                    print(f"⚡ Cargando datos desde caché columnar: {source}")
+                    return cached
+                
             print(f"📁 Cargando datos desde archivo: {source}")
-            return pd.read_csv(source, sep=';', low_memory=False)
+            if schema is not None:
+                try:
+                    df = read_csv_with_schema(source, schema)
+                except Exception as e:
+                    print(f"⚠️  Lectura con esquema '{schema}' fallida, se leen todas las columnas: {e}")
+                    return pd.read_csv(source, sep=';', low_memory=False)
+            else:
+                df = pd.read_csv(source, sep=';', low_memory=False)
+            if use_cache:
+                write_cached_frame(source, df, variant=variant, extra_key=extra_key)
+            return df
             
     except Exception as e:
         raise RuntimeError(f"Error cargando datos desde {source}: {e}")
 
 
-def load_data_with_fallback(local_path: str, url_fallback: str) -> pd.DataFrame:
+def load_data_with_fallback(local_path: str, url_fallback: str,
+                            transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                            sync_url: Optional[str] = None, schema: Optional[str] = None) -> pd.DataFrame:
     """
     Intenta cargar datos desde archivo local, si falla usa URL como fallback.
     
     Args:
         local_path: Ruta al archivo CSV local
         url_fallback: URL de fallback si no se encuentra el archivo local
+        transform: Transformación opcional (p. ej. transform_preventivos_df). Si se indica,
+            se devuelve el frame transformado y, para archivos locales, también se guarda
+            en la caché columnar junto con la versión del código de la transformación.
+        sync_url: Endpoint de sincronización incremental. Si se indica, antes de cargar
+            se añaden al CSV local solo los envíos nuevos (ver kobo_sync); si la
+            sincronización falla se continúa con el archivo local o el fallback.
+        schema: Esquema de CSV_SCHEMAS con las columnas y tipos a leer (opcional)
         
     Returns:
-        pd.DataFrame: DataFrame con los datos cargados
+        pd.DataFrame: DataFrame con los datos cargados (o transformados)
     """
+    if sync_url:
+        try:
+            with span('sincronizacion', dataset=schema or os.path.basename(local_path)):
+                sync_kobo_export(local_path, sync_url)
+        except Exception as e:
+            print(f"⚠️  Sincronización incremental fallida: {e}")
+    
+    if transform is not None:
+        return _load_transformed_with_fallback(local_path, url_fallback, transform, schema)
+    
     try:
-        return load_data(local_path)
+        return load_data(local_path, schema=schema)
     except (FileNotFoundError, RuntimeError) as e:
         print(f"⚠️  No se pudo cargar archivo local: {e}")
         print(f"🔄 Intentando cargar desde URL fallback...")
-        return load_data(url_fallback)
+        return load_data(url_fallback, schema=schema)
+
+
+def transformed_frame_key(transform: Callable[[pd.DataFrame], pd.DataFrame], schema: Optional[str] = None) -> str:
+    """Clave de versión del frame transformado en la caché columnar: código de la transformación + esquema."""
+    code_key = transform_cache_key(transform)
+    if schema is not None:
+        # Los tipos de entrada definen los tipos de salida de la transformación
+        code_key = f"{code_key}|{schema_cache_key(schema)}"
+    return code_key
+
+
+def _load_transformed_with_fallback(local_path: str, url_fallback: str,
+                                    transform: Callable[[pd.DataFrame], pd.DataFrame],
+                                    schema: Optional[str] = None) -> pd.DataFrame:
+    """Carga y transforma, reutilizando el frame transformado en caché si sigue vigente."""
+    variant = transform.__name__
+    code_key = transformed_frame_key(transform, schema)
+    
+    if CACHE_CONFIG.get('cache_transformed', False):
+        cached = read_cached_frame(local_path, variant=variant, extra_key=code_key)
+        if cached is not None:
+            print(f"⚡ Datos transformados desde caché columnar: {local_path}")
+            return cached
+    
+    dataset = schema or variant
+    with span('lectura', dataset=dataset):
+        try:
+            raw = load_data(local_path, schema=schema)
+            from_local = True
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"⚠️  No se pudo cargar archivo local: {e}")
+            print(f"🔄 Intentando cargar desde URL fallback...")
+            raw = load_data(url_fallback, schema=schema)
+            from_local = False
+    
+    with span('transformacion', dataset=dataset):
+        transformed = transform(raw)
+    if from_local and CACHE_CONFIG.get('cache_transformed', False):
+        write_cached_frame(local_path, transformed, variant=variant, extra_key=code_key)
+    return transformed
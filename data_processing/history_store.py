@@ -0,0 +1,284 @@
+"""
+Historial persistente de registros limpios, particionado por sede / año / mes.
+
+Los frames transformados solo existían en memoria durante una ejecución. Aquí se
+guardan en Parquet con particiones al estilo Hive:
+
+    <HISTORY_CONFIG['directory']>/<dataset>/sede=<sede>/year=<año>/month=<mes>/part-0.parquet
+
+Los meses cerrados (anteriores al mes en curso) se congelan la primera vez que se
+escriben: las ejecuciones siguientes no los reescriben, y si la exportación trae
+filas distintas para un mes congelado solo se avisa. El mes en curso (y las filas
+sin fecha) se reescriben en cada actualización. Si cambia el código de la
+transformación o el esquema de las columnas, el historial del dataset se
+reconstruye desde la exportación.
+
+Las lecturas usan pyarrow.dataset con el filtro de sede y meses sobre las
+claves de partición: solo se abren los archivos de las particiones pedidas (p. ej.
+el mes en curso de una sede, o los últimos 12 meses para las tendencias). El frame
+leído tiene los mismos tipos que el transformado (ver columnar_cache.frame_to_arrow)
+y sus filas en el orden de la exportación ('ID').
+
+Requiere pyarrow.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+from config.settings import HISTORY_CONFIG
+from data_processing.columnar_cache import arrow_to_frame, frame_to_arrow
+from data_processing.report_periods import month_key, shift_month
+from data_processing.streaming import concat_transformed_chunks
+
+# Valor de partición de las filas sin sede o sin fecha (el mismo que usa pyarrow para los nulos)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+_MANIFEST = '_historial.json'
+# Esquema de Arrow serializado (conserva los tipos diccionario de las columnas categóricas)
+_SCHEMA = '_schema.arrow'
+
+
+def history_window(months: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+    """(desde, hasta) en yyyymm: los últimos `months` meses (HISTORY_CONFIG['trend_months']) hasta `end`."""
+    end = end or month_key()
+    months = months or HISTORY_CONFIG['trend_months']
+    return shift_month(end, -(months - 1)), end
+
+
+def _dataset_dir(dataset: str) -> str:
+    return os.path.join(HISTORY_CONFIG['directory'], dataset)
+
+
+def _partition_path(sede, key) -> str:
+    """Ruta relativa de la partición de una sede y un mes (llave yyyymm o NaN)."""
+    sede_value = NULL_PARTITION if pd.isna(sede) else quote(str(sede), safe='')
+    if pd.isna(key):
+        year = month = NULL_PARTITION
+    else:
+        year, month = int(key) // 100, int(key) % 100
+    return os.path.join(f"sede={sede_value}", f"year={year}", f"month={month}")
+
+
+def _read_manifest(dataset: str) -> Dict:
+    try:
+        with open(os.path.join(_dataset_dir(dataset), _MANIFEST), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(dataset: str, manifest: Dict):
+    path = os.path.join(_dataset_dir(dataset), _MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _group_partitions(df: pd.DataFrame) -> Dict[str, List[int]]:
+    """Posiciones de las filas de cada partición (sede, mes), en el orden del frame."""
+    keys = pd.DataFrame({'sede': df['Sede'].astype(object).to_numpy(), 'mes': df['Mes_key'].array})
+    groups = keys.groupby(['sede', 'mes'], dropna=False, sort=False).indices
+    return {_partition_path(sede, key): positions for (sede, key), positions in groups.items()}
+
+
+def update_history(df: pd.DataFrame, dataset: str, version: str = '',
+                   now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Escribe en el historial las particiones de un frame transformado.
+
+    Args:
+        df: Frame transformado con columnas 'Sede' y 'Mes_key'
+        dataset: Nombre del dataset ('preventivos', 'roedores', 'lamparas')
+        version: Versión del código de la transformación (p. ej. transformed_frame_key);
+            si cambia, el historial del dataset se reconstruye
+        now: Fecha de referencia para decidir qué meses están cerrados (por defecto hoy)
+
+    Returns:
+        Dict[str, int]: Particiones escritas, congeladas (sin tocar) y eliminadas,
+            y filas de meses congelados que no coinciden con la exportación
+    """
+    import pyarrow.parquet as pq
+
+    root = _dataset_dir(dataset)
+    current = month_key(now)
+    table, meta = frame_to_arrow(df)
+    schema = table.schema
+    del table
+
+    manifest = _read_manifest(dataset)
+    if manifest and (manifest.get('version') != version or manifest.get('schema') != str(schema.remove_metadata())
+                     or manifest.get('mixed_columns') != meta['mixed_columns']):
+        print(f"⚠️  Historial de {dataset}: cambió la transformación o el esquema, se reconstruye")
+        manifest = {}
+    if not manifest and os.path.isdir(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    partitions = manifest.get('partitions', {})
+    stats = {'escritas': 0, 'congeladas': 0, 'eliminadas': 0, 'filas_distintas': 0}
+    groups = _group_partitions(df)
+    for path, positions in groups.items():
+        saved = partitions.get(path)
+        if saved is not None and saved.get('frozen'):
+            stats['congeladas'] += 1
+            stats['filas_distintas'] += abs(len(positions) - saved['rows'])
+            continue
+
+        part_table, _ = frame_to_arrow(df.iloc[positions], mixed_columns=meta['mixed_columns'], schema=schema)
+        directory = os.path.join(root, path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, 'part-0.parquet.tmp')
+        pq.write_table(part_table, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, 'part-0.parquet'))
+
+        key = df['Mes_key'].iloc[positions[0]]
+        partitions[path] = {
+            'rows': len(positions),
+            'frozen': bool(pd.notna(key) and int(key) < current),
+            'written': datetime.now().isoformat(),
+        }
+        stats['escritas'] += 1
+
+    # Meses congelados que ya no están en la exportación: se conservan
+    stats['filas_distintas'] += sum(saved['rows'] for path, saved in partitions.items()
+                                    if path not in groups and saved.get('frozen'))
+    # Particiones abiertas que ya no están en la exportación
+    for path in [path for path, saved in partitions.items() if path not in groups and not saved.get('frozen')]:
+        shutil.rmtree(os.path.join(root, path), ignore_errors=True)
+        del partitions[path]
+        stats['eliminadas'] += 1
+
+    schema_path = os.path.join(root, _SCHEMA)
+    with open(f"{schema_path}.tmp", 'wb') as file:
+        file.write(schema.serialize().to_pybytes())
+    os.replace(f"{schema_path}.tmp", schema_path)
+    _write_manifest(dataset, {
+        'version': version,
+        'schema': str(schema.remove_metadata()),
+        **meta,
+        'partitions': dict(sorted(partitions.items())),
+        'updated': datetime.now().isoformat(),
+    })
+
+    print(f"🗄️  Historial {dataset}: {stats['escritas']} particiones escritas, "
+          f"{stats['congeladas']} congeladas, {stats['eliminadas']} eliminadas")
+    if stats['filas_distintas']:
+        print(f"⚠️  Historial {dataset}: {stats['filas_distintas']} filas de meses cerrados difieren "
+              f"de la exportación y no se escribieron (meses congelados)")
+    return stats
+
+
+def _months_filter(start: Optional[int], end: Optional[int]):
+    """Filtro sobre las claves de partición year/month para los meses entre `start` y `end` (yyyymm)."""
+    import pyarrow.dataset as ds
+
+    year, month = ds.field('year'), ds.field('month')
+    conditions = []
+    if start is not None:
+        conditions.append((year > start // 100) | ((year == start // 100) & (month >= start % 100)))
+    if end is not None:
+        conditions.append((year < end // 100) | ((year == end // 100) & (month <= end % 100)))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else conditions[0] & conditions[1]
+
+
+def read_history(dataset: str, sedes: Optional[Sequence[str]] = None, start: Optional[int] = None,
+                 end: Optional[int] = None) -> Optional[pd.DataFrame]:
+    """
+    Lee del historial solo las particiones de las sedes y meses pedidos.
+
+    Args:
+        dataset: Nombre del dataset
+        sedes: Sedes a leer (None: todas, incluidas las filas sin sede)
+        start, end: Primer y último mes (yyyymm) a leer; None sin límite (con
+            límites de meses no se leen las filas sin fecha)
+
+    Returns:
+        pd.DataFrame con las columnas y tipos del frame transformado, o None si el
+        dataset no tiene historial
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    root = _dataset_dir(dataset)
+    manifest = _read_manifest(dataset)
+    if not manifest:
+        return None
+    with open(os.path.join(root, _SCHEMA), 'rb') as file:
+        schema = pa.ipc.read_schema(pa.py_buffer(file.read()))
+    partitioning = ds.partitioning(
+        pa.schema([('sede', pa.string()), ('year', pa.int32()), ('month', pa.int32())]), flavor='hive'
+    )
+    dataset_files = ds.dataset(root, format='parquet', partitioning=partitioning)
+
+    expression = _months_filter(start, end)
+    if sedes is not None:
+        sede_filter = ds.field('sede').isin(list(sedes))
+        expression = sede_filter if expression is None else expression & sede_filter
+    fragments = list(dataset_files.get_fragments(filter=expression))
+    print(f"📦 Historial {dataset}: {len(fragments)} de {len(manifest['partitions'])} particiones leídas")
+
+    # Parquet solo restituye como diccionario las columnas de texto: las categóricas se leen
+    # con su tipo de valores y se vuelven a codificar como diccionario al unir las particiones
+    read_schema = pa.schema([pa.field(field.name, field.type.value_type, field.nullable)
+                             if pa.types.is_dictionary(field.type) else field for field in schema],
+                            metadata=schema.metadata)
+    if fragments:
+        table = pa.concat_tables([fragment.to_table(schema=read_schema) for fragment in fragments])
+    else:
+        table = read_schema.empty_table()
+    for index, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(index, field.name, table.column(index).dictionary_encode())
+    frame = arrow_to_frame(table, manifest)
+    if frame.empty:
+        return frame
+    # Categorías unidas y ordenadas y 'Mes' con los meses leídos, como al unir bloques en streaming
+    frame = concat_transformed_chunks([frame])
+    if 'ID' in frame.columns:
+        frame = frame.sort_values('ID', kind='stable')
+    return frame.reset_index(drop=True)
+
+
+def refresh_history(frames: Dict[str, pd.DataFrame], versions: Dict[str, str], sedes: Sequence[str],
+                    months: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Actualiza el historial con los frames transformados y lee la ventana de tendencias.
+
+    La ventana son los últimos `months` meses (HISTORY_CONFIG['trend_months']) hasta el
+    mes en curso o, si las exportaciones aún no lo traen, hasta el último mes con datos.
+
+    Args:
+        frames: Frames transformados por dataset
+        versions: Versión de la transformación de cada dataset (ver update_history)
+        sedes: Sedes de los reportes (solo se leen sus particiones)
+
+    Returns:
+        Dict[str, pd.DataFrame]: Frames de la ventana por dataset, leídos del historial
+    """
+    for name, df in frames.items():
+        update_history(df, name, versions.get(name, ''), now=now)
+
+    latest = [int(df['Mes_key'].max()) for df in frames.values() if df['Mes_key'].notna().any()]
+    end = min([month_key(now)] + ([max(latest)] if latest else []))
+    start, end = history_window(months, end)
+    print(f"🗓️  Ventana de tendencias: {start // 100}-{start % 100:02d} a {end // 100}-{end % 100:02d}")
+    return {name: read_history(name, sedes=sedes, start=start, end=end) for name in frames}
+
+
+def history_fingerprint(datasets: Sequence[str]) -> Optional[str]:
+    """Huella del contenido del historial (particiones y filas) de varios datasets; None si no hay."""
+    manifests = {dataset: _read_manifest(dataset) for dataset in datasets}
+    if not any(manifests.values()):
+        return None
+    return json.dumps({dataset: [manifest.get('version'), {path: saved['rows'] for path, saved in
+                                                          manifest.get('partitions', {}).items()}]
+                       for dataset, manifest in manifests.items()}, sort_keys=True)
@@ -0,0 +1,262 @@
+"""
+Descarga condicional de las exportaciones CSV de KoBoToolbox (API_URLS).
+
+Cuando falta el archivo local, la carga cae a la URL de la exportación. Antes la
+URL iba directo a `pd.read_csv`: una conexión nueva por archivo, sin compresión y
+siempre con el cuerpo completo aunque la exportación no hubiera cambiado. Aquí:
+    - una sesión con conexiones persistentes (keep-alive) por host, compartida por
+      las tres exportaciones y segura entre hilos (la carga concurrente usa hilos)
+    - se pide 'Accept-Encoding: gzip' y el cuerpo se descomprime al escribirlo
+    - cada descarga se guarda como copia local en HTTP_FETCH_CONFIG['directory'] junto
+      con su ETag / Last-Modified; la siguiente petición es condicional
+      (If-None-Match / If-Modified-Since) y un 304 se sirve desde la copia local
+    - si la descarga falla y hay una copia anterior, se usa esa copia con un aviso
+    - las redirecciones a otro host (u otro esquema) no llevan el encabezado Authorization
+La copia local es un CSV normal: load_data la lee con el esquema y la caché columnar
+como cualquier archivo local.
+
+benchmarks/bench_http_fetch.py levanta un servidor local de prueba y comprueba
+las respuestas 200 / 304, la compresión y la reutilización de conexiones.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlsplit
+
+from config.settings import API_KEYS, HTTP_FETCH_CONFIG
+
+# Errores de una conexión persistente que el servidor cerró mientras estaba inactiva
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                            ConnectionResetError, BrokenPipeError)
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class KeepAliveSession:
+    """
+    Conexiones HTTP(S) persistentes reutilizables, agrupadas por (esquema, host).
+
+    Cada petición toma una conexión inactiva del host (o abre una nueva) y la devuelve
+    al terminar de leer la respuesta, si el servidor no pidió cerrarla.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, max_idle_per_host: Optional[int] = None):
+        self.timeout = timeout or HTTP_FETCH_CONFIG['timeout_seconds']
+        self.max_idle_per_host = max_idle_per_host or HTTP_FETCH_CONFIG['max_idle_per_host']
+        self._idle: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0}
+
+    def _new_connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        with self._lock:
+            self.stats['connections'] += 1
+        return connection_class(netloc, timeout=self.timeout)
+
+    def _acquire(self, key: tuple):
+        """Conexión inactiva del host (reutilizada=True) o una nueva."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.stats['reused'] += 1
+                return idle.pop(), True
+        return self._new_connection(*key), False
+
+    def _release(self, key: tuple, connection: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    @contextmanager
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """
+        GET de `url`; entrega la respuesta sin leer (http.client.HTTPResponse).
+
+        La conexión vuelve a la sesión solo si el cuerpo se leyó completo; si una
+        conexión reutilizada resulta cerrada por el servidor se reintenta una vez
+        con una conexión nueva.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        connection, reused = self._acquire(key)
+        try:
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused:
+                raise
+            connection = self._new_connection(*key)
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+        except Exception:
+            connection.close()
+            raise
+        with self._lock:
+            self.stats['requests'] += 1
+
+        try:
+            yield response
+        except BaseException:
+            connection.close()
+            raise
+        if response.isclosed() and not response.will_close:
+            self._release(key, connection)
+        else:
+            connection.close()
+
+    def close(self):
+        """Cierra todas las conexiones inactivas."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_session: Optional[KeepAliveSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> KeepAliveSession:
+    """Sesión compartida por todas las descargas del proceso."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = KeepAliveSession()
+        return _session
+
+
+def local_copy_paths(url: str) -> tuple:
+    """Rutas (copia CSV, metadatos JSON) de la última descarga de una URL."""
+    # Las URLs de exportación terminan todas en 'data.csv': el nombre sale del hash de la URL
+    digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    directory = HTTP_FETCH_CONFIG['directory']
+    return os.path.join(directory, f"{digest}.csv"), os.path.join(directory, f"{digest}.json")
+
+
+def _load_metadata(meta_path: str) -> Dict:
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _request_headers(metadata: Dict, conditional: bool) -> Dict[str, str]:
+    headers = {'Accept': 'text/csv', 'Connection': 'keep-alive'}
+    if HTTP_FETCH_CONFIG.get('compression', True):
+        headers['Accept-Encoding'] = 'gzip'
+    if API_KEYS.get('kobo'):
+        headers['Authorization'] = f"Token {API_KEYS['kobo']}"
+    if conditional:
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+    return headers
+
+
+def _write_body(response: http.client.HTTPResponse, path: str) -> tuple:
+    """Escribe el cuerpo (descomprimido si viene en gzip) de forma atómica; devuelve (bytes recibidos, bytes escritos)."""
+    encoding = (response.getheader('Content-Encoding') or '').strip().lower()
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding in ('gzip', 'x-gzip') else None
+    received = written = 0
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            while True:
+                block = response.read(1 << 20)
+                if not block:
+                    break
+                received += len(block)
+                if decompressor is not None:
+                    block = decompressor.decompress(block)
+                written += file.write(block)
+            if decompressor is not None:
+                written += file.write(decompressor.flush())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return received, written
+
+
+def fetch_export(url: str, session: Optional[KeepAliveSession] = None) -> str:
+    """
+    Descarga una exportación CSV con petición condicional y devuelve la ruta de su copia local.
+
+    Args:
+        url: URL de la exportación (p. ej. API_URLS['preventivos'])
+        session: Sesión a usar (por defecto la compartida, ver get_session)
+
+    Returns:
+        str: Ruta del CSV local con el contenido vigente de la exportación
+
+    Raises:
+        RuntimeError: Si la descarga falla y no hay copia local anterior
+    """
+    session = session or get_session()
+    copy_path, meta_path = local_copy_paths(url)
+    metadata = _load_metadata(meta_path)
+    has_copy = os.path.exists(copy_path) and metadata.get('url') == url
+    headers = _request_headers(metadata, conditional=has_copy)
+
+    try:
+        target = url
+        for _ in range(HTTP_FETCH_CONFIG['max_redirects'] + 1):
+            with session.get(target, headers) as response:
+                if response.status in _REDIRECT_STATUSES and response.getheader('Location'):
+                    response.read()
+                    target = urljoin(target, response.getheader('Location'))
+                    if urlsplit(target)[:2] != urlsplit(url)[:2]:
+                        # El token de KoBo no se envía a otro servidor (p. ej. el almacenamiento de la exportación)
+                        headers.pop('Authorization', None)
+                    continue
+                if response.status == 304 and has_copy:
+                    response.read()
+                    print(f"♻️  Exportación sin cambios (304), se usa la copia local: {copy_path}")
+                    return copy_path
+                if response.status != 200:
+                    response.read()
+                    raise RuntimeError(f"HTTP {response.status} {response.reason}")
+
+                os.makedirs(os.path.dirname(copy_path), exist_ok=True)
+                received, written = _write_body(response, copy_path)
+                etag, last_modified = response.getheader('ETag'), response.getheader('Last-Modified')
+            break
+        else:
+            raise RuntimeError("Demasiadas redirecciones")
+    except Exception as e:
+        if not has_copy:
+            raise RuntimeError(f"Descarga fallida de {url[:50]}...: {e}")
+        print(f"⚠️  Descarga fallida ({e}), se usa la copia local anterior: {copy_path}")
+        return copy_path
+
+    with open(meta_path, 'w', encoding='utf-8') as file:
+        json.dump({
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': datetime.now().isoformat(),
+            'bytes_received': received,
+            'bytes': written
+        }, file, ensure_ascii=False, indent=2)
+    compressed = f" ({received / 1e6:.1f} MB comprimidos)" if received != written else ""
+    print(f"⬇️  Exportación descargada: {written / 1e6:.1f} MB{compressed}")
+    return copy_path
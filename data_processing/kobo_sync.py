@@ -0,0 +1,389 @@
+"""
+Sincronización incremental de exportaciones de KoBoToolbox.
+
+En lugar de descargar la exportación completa, se guarda una marca de agua
+(high-water mark) con el mayor `_id` / `_submission_time` ya almacenado y solo se
+piden los envíos posteriores, página por página. Los envíos nuevos se añaden al
+final del CSV local (el mismo de LOCAL_FILES), sin reescribir las filas ya
+guardadas, de modo que el resto del sistema (caché columnar, transformaciones)
+sigue leyendo ese archivo.
+
+El endpoint de datos (/api/v2/assets/<uid>/data/) recibe los parámetros `query`
+(filtro Mongo sobre la marca de agua), `sort`, `start` y `limit`, y responde
+JSON: {"count": N, "next": url | null, "results": [{...}, ...]}. Los envíos
+vienen con los nombres de campo del formulario (XML) y los códigos de las
+opciones, no con las etiquetas de la exportación CSV: antes de añadirlos se
+traducen con la definición del formulario (/api/v2/assets/<uid>/) y se ordenan
+según la cabecera del CSV local:
+    - select_one: etiqueta de la opción elegida
+    - select_multiple: etiquetas elegidas separadas por espacio y una columna
+      'Pregunta/Opción' con 1 / 0 por cada opción
+    - geopoint: el valor y las columnas '_Pregunta_latitude', '_longitude', ...
+    - image / audio / video / file: el nombre del archivo y 'Pregunta_URL'
+Las columnas de la cabecera que el envío no trae quedan vacías. Si el CSV local no
+existe, su cabecera se arma con la definición del formulario (todas las preguntas,
+sus columnas derivadas y los metadatos de la exportación), no con los campos que
+traen los envíos: KoBo omite las preguntas sin responder.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+import pandas as pd
+
+from config.settings import SYNC_CONFIG, API_KEYS
+
+# Columnas de metadatos al final de la exportación CSV de KoBo, en su orden
+EXPORT_META_COLUMNS = ['_id', '_uuid', '_submission_time', '_validation_status', '_notes',
+                       '_status', '_submitted_by', '__version__', '_tags', '_index']
+
+GEOPOINT_PARTS = ('latitude', 'longitude', 'altitude', 'precision')
+
+# Preguntas con archivo adjunto: la exportación añade la columna 'Pregunta_URL'
+ATTACHMENT_TYPES = ('image', 'audio', 'video', 'file', 'background-audio')
+
+
+def _state_path(local_path: str) -> str:
+    """Ruta del archivo de estado (marca de agua) para un CSV local."""
+    stem = os.path.splitext(os.path.basename(local_path))[0]
+    return os.path.join(SYNC_CONFIG['state_directory'], f"{stem}.json")
+
+
+def load_sync_state(local_path: str) -> Dict:
+    """Lee el estado de sincronización guardado; vacío si no existe."""
+    try:
+        with open(_state_path(local_path), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sync_state(local_path: str, state: Dict):
+    """Guarda el estado de sincronización de un CSV local."""
+    path = _state_path(local_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, ensure_ascii=False, indent=2)
+
+
+def high_water_mark(df: pd.DataFrame) -> Dict:
+    """Calcula la marca de agua (máximo `_id` y `_submission_time`) de un frame."""
+    mark = {}
+    if df is None or df.empty:
+        return mark
+    if '_id' in df.columns and df['_id'].notna().any():
+        mark['_id'] = int(df['_id'].max())
+    if '_submission_time' in df.columns and df['_submission_time'].notna().any():
+        mark['_submission_time'] = str(df['_submission_time'].max())
+    return mark
+
+
+def _build_query(mark: Dict) -> Optional[str]:
+    """Filtro Mongo para pedir solo envíos posteriores a la marca de agua."""
+    field = SYNC_CONFIG['high_water_field']
+    if field in mark:
+        return json.dumps({field: {'$gt': mark[field]}})
+    return None
+
+
+class _KoboRedirectHandler(HTTPRedirectHandler):
+    """Sigue las redirecciones sin enviar el token de KoBo a otro servidor."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new_request = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new_request is not None and urlsplit(newurl)[:2] != urlsplit(req.full_url)[:2]:
+            new_request.remove_header('Authorization')
+        return new_request
+
+
+_opener = build_opener(_KoboRedirectHandler)
+
+
+def _request(url: str, timeout: float) -> tuple:
+    """Descarga una URL y devuelve (cuerpo, content-type)."""
+    headers = {'Accept': 'application/json'}
+    if API_KEYS.get('kobo'):
+        headers['Authorization'] = f"Token {API_KEYS['kobo']}"
+    with _opener.open(Request(url, headers=headers), timeout=timeout) as response:
+        return response.read(), response.headers.get('Content-Type', '')
+
+
+def _parse_page(body: bytes) -> Tuple[List[Dict], Optional[str]]:
+    """Convierte una página de respuesta en (envíos, url siguiente o None)."""
+    if not body.strip():
+        return [], None
+    payload = json.loads(body.decode('utf-8'))
+    if isinstance(payload, list):
+        return payload, None
+    return payload.get('results', []), payload.get('next')
+
+
+def fetch_new_submissions(sync_url: str, mark: Dict) -> List[Dict]:
+    """
+    Descarga, página por página, los envíos posteriores a la marca de agua.
+
+    Args:
+        sync_url: Endpoint paginado de datos
+        mark: Marca de agua actual ({'_id': ..., '_submission_time': ...})
+
+    Returns:
+        List[Dict]: Envíos nuevos con los nombres de campo del formulario (vacía si no hay)
+    """
+    page_size = SYNC_CONFIG['page_size']
+    timeout = SYNC_CONFIG['timeout_seconds']
+    params = {'format': 'json', 'sort': json.dumps({SYNC_CONFIG['high_water_field']: 1}), 'limit': page_size}
+    query = _build_query(mark)
+    if query:
+        params['query'] = query
+
+    submissions: List[Dict] = []
+    next_url = f"{sync_url}?{urlencode({**params, 'start': 0})}"
+    while next_url:
+        body, _ = _request(next_url, timeout)
+        page, next_url = _parse_page(body)
+        submissions.extend(page)
+    return submissions
+
+
+def _asset_url(sync_url: str) -> str:
+    """URL de la definición del formulario a partir del endpoint de datos (.../assets/<uid>/data/)."""
+    base = sync_url.split('?', 1)[0].rstrip('/')
+    if base.endswith('/data'):
+        base = base[:-len('/data')]
+    return f"{base}/?{urlencode({'format': 'json'})}"
+
+
+def _label(item: Dict) -> str:
+    """Primera etiqueta (idioma por defecto) de una pregunta u opción; su nombre si no tiene."""
+    label = item.get('label')
+    if isinstance(label, list):
+        label = next((text for text in label if text), None)
+    return label or item.get('name', '')
+
+
+def form_fields(content: Dict) -> Dict[str, Tuple[str, str, Dict[str, str]]]:
+    """
+    Preguntas del formulario por nombre de campo.
+
+    Args:
+        content: 'content' de la definición del formulario (survey + choices)
+
+    Returns:
+        Dict: Campo (xpath, p. ej. 'grupo/Sede') -> (tipo, etiqueta, {código de opción: etiqueta})
+    """
+    choices: Dict[str, Dict[str, str]] = {}
+    for choice in content.get('choices', []):
+        choices.setdefault(choice.get('list_name'), {})[str(choice.get('name'))] = _label(choice)
+
+    fields = {}
+    for row in content.get('survey', []):
+        type_parts = (row.get('type') or '').split()
+        if not type_parts or 'name' not in row or type_parts[0] in ('begin_group', 'end_group',
+                                                                   'begin_repeat', 'end_repeat', 'note'):
+            continue
+        list_name = row.get('select_from_list_name') or (type_parts[1] if len(type_parts) > 1 else None)
+        fields[row.get('$xpath') or row['name']] = (type_parts[0], _label(row), choices.get(list_name, {}))
+    return fields
+
+
+def fetch_form_fields(sync_url: str) -> Dict[str, Tuple[str, str, Dict[str, str]]]:
+    """Descarga la definición del formulario del endpoint de datos y devuelve sus preguntas (ver form_fields)."""
+    body, _ = _request(_asset_url(sync_url), SYNC_CONFIG['timeout_seconds'])
+    return form_fields(json.loads(body.decode('utf-8')).get('content', {}))
+
+
+def export_header(fields: Dict[str, Tuple[str, str, Dict[str, str]]]) -> List[str]:
+    """Columnas de la exportación CSV para las preguntas del formulario (ver form_fields), en su orden."""
+    header = []
+    for kind, label, options in fields.values():
+        header.append(label)
+        if kind == 'select_multiple':
+            header.extend(f"{label}/{option_label}" for option_label in options.values())
+        elif kind == 'geopoint':
+            header.extend(f"_{label}_{part}" for part in GEOPOINT_PARTS)
+        elif kind in ATTACHMENT_TYPES:
+            header.append(f"{label}_URL")
+    header.extend(column for column in EXPORT_META_COLUMNS if column not in header)
+    return header
+
+
+def _attachment_url(submission: Dict, filename: str) -> str:
+    """URL de descarga del adjunto `filename` de un envío ('' si no está)."""
+    for attachment in submission.get('_attachments') or []:
+        name = str(attachment.get('filename', ''))
+        if filename and (name == filename or name.endswith(f"/{filename}")):
+            return str(attachment.get('download_url', ''))
+    return ''
+
+
+def _cell(value) -> str:
+    """Valor de un envío como texto de la exportación CSV."""
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        # _validation_status: {'uid': ..., 'label': 'Aprobado'}
+        return str(value.get('label', '')) if value else ''
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+def label_submission(submission: Dict, fields: Dict[str, Tuple[str, str, Dict[str, str]]]) -> Dict[str, str]:
+    """
+    Traduce un envío de la API (nombres de campo y códigos) a las columnas de la exportación CSV.
+
+    Los campos que no son preguntas del formulario (_id, _uuid, _submission_time, ...)
+    conservan su nombre.
+    """
+    row = {}
+    for key, value in submission.items():
+        if key not in fields:
+            row[key] = _cell(value)
+            continue
+        kind, label, options = fields[key]
+        value = _cell(value)
+        if kind == 'select_one':
+            row[label] = options.get(value, value)
+        elif kind == 'select_multiple':
+            selected = value.split()
+            row[label] = ' '.join(options.get(code, code) for code in selected)
+            for code, option_label in options.items():
+                row[f"{label}/{option_label}"] = '1' if code in selected else '0'
+        elif kind == 'geopoint':
+            row[label] = value
+            for suffix, part in zip(GEOPOINT_PARTS, value.split()):
+                row[f"_{label}_{suffix}"] = part
+        elif kind in ATTACHMENT_TYPES:
+            row[label] = value
+            row[f"{label}_URL"] = _attachment_url(submission, value)
+        else:
+            row[label] = value
+    return row
+
+
+def _read_header(local_path: str) -> Tuple[List[str], str]:
+    """Columnas de la cabecera del CSV local y su fin de línea."""
+    with open(local_path, 'r', encoding='utf-8', newline='') as file:
+        first_line = file.readline()
+    header = next(csv.reader([first_line], delimiter=';'), [])
+    return header, '\r\n' if first_line.endswith('\r\n') else '\n'
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() == 0:
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b'\n'
+
+
+def _stored_submissions(local_path: str) -> pd.DataFrame:
+    """Solo las columnas del CSV local que la sincronización necesita (marca de agua, _uuid, _index)."""
+    wanted = ('_id', '_uuid', '_submission_time', '_index')
+    return pd.read_csv(local_path, sep=';', usecols=lambda column: column in wanted, low_memory=False)
+
+
+def append_submissions(local_path: str, rows: List[Dict[str, str]], header: Optional[List[str]] = None) -> int:
+    """
+    Añade filas al final del CSV local, en el orden de columnas de su cabecera.
+
+    Las filas ya guardadas no se reescriben: el archivo solo crece. Si el CSV no
+    existe se crea con `header` (ver export_header) o, sin ella, con las columnas
+    de las filas (más `_index`).
+
+    Returns:
+        int: Cantidad de filas añadidas
+    """
+    if not rows:
+        return 0
+    exists = os.path.exists(local_path)
+    if exists:
+        header, line_end = _read_header(local_path)
+    else:
+        if header is None:
+            header = list(dict.fromkeys(column for row in rows for column in row if column != '_index')) + ['_index']
+        line_end = '\r\n'
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', quoting=csv.QUOTE_ALL, lineterminator=line_end)
+    if not exists:
+        writer.writerow(header)
+    elif not _ends_with_newline(local_path):
+        buffer.write(line_end)
+    writer.writerows([row.get(column, '') for column in header] for row in rows)
+
+    os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+    # Una sola escritura: el CSV no queda con filas a medias si algo falla antes
+    with open(local_path, 'a', encoding='utf-8', newline='') as file:
+        file.write(buffer.getvalue())
+    return len(rows)
+
+
+def sync_kobo_export(local_path: str, sync_url: str) -> int:
+    """
+    Sincroniza incrementalmente el CSV local con el endpoint de KoBoToolbox.
+
+    Lee la marca de agua guardada (o la deriva del CSV local), descarga solo los
+    envíos nuevos, los traduce a las columnas de la exportación CSV y los añade al
+    final del archivo, numerando `_index` a continuación del último. Los envíos cuyo
+    `_uuid` ya está guardado se ignoran (un envío editado en KoBo requiere volver a
+    descargar la exportación completa). Si el CSV local no existe se crea con las
+    columnas del formulario (export_header). Si no hay envíos nuevos el archivo no
+    se toca, así la caché columnar sigue siendo válida.
+
+    Args:
+        local_path: Ruta del CSV local que actúa como almacén
+        sync_url: Endpoint paginado de datos de KoBoToolbox (/api/v2/assets/<uid>/data/)
+
+    Returns:
+        int: Cantidad de envíos nuevos añadidos
+    """
+    stored = _stored_submissions(local_path) if os.path.exists(local_path) else None
+    stored_header = _read_header(local_path)[0] if stored is not None else []
+    state = load_sync_state(local_path)
+    # Sin histórico local la marca guardada no sirve: se descarga todo (paginado)
+    mark = (state.get('high_water_mark') if stored is not None else None) or high_water_mark(stored)
+
+    print(f"🔄 Sincronización incremental: {os.path.basename(local_path)} (marca de agua: {mark or 'ninguna'})")
+    submissions = fetch_new_submissions(sync_url, mark)
+
+    added = 0
+    if submissions:
+        known_uuids = set(stored['_uuid'].dropna()) if stored is not None and '_uuid' in stored else set()
+        submissions = [item for item in submissions if item.get('_uuid') not in known_uuids]
+        submissions.sort(key=lambda item: item.get('_id', 0))
+
+    if submissions:
+        fields = fetch_form_fields(sync_url)
+        header = export_header(fields)
+        if stored is not None:
+            missing = [column for column in header if column not in stored_header]
+            if missing:
+                print(f"⚠️  {len(missing)} columnas del formulario no están en el CSV local y no se guardan "
+                      f"({', '.join(missing[:5])}{', ...' if len(missing) > 5 else ''}); "
+                      f"descarga la exportación completa para incluirlas")
+        rows = [label_submission(item, fields) for item in submissions]
+        last_index = 0
+        if stored is not None and '_index' in stored and stored['_index'].notna().any():
+            last_index = int(stored['_index'].max())
+        for offset, row in enumerate(rows, start=1):
+            row['_index'] = str(last_index + offset)
+
+        added = append_submissions(local_path, rows, header)
+        mark = {**mark, **high_water_mark(pd.DataFrame(submissions))}
+
+    save_sync_state(local_path, {
+        'high_water_mark': mark,
+        'last_sync': datetime.now().isoformat(),
+        'last_added': added,
+        'sync_url': sync_url
+    })
+    print(f"   ✅ {added} envíos nuevos añadidos")
+    return added
@@ -0,0 +1,383 @@
+"""
+Cubo de agregados mensuales por (sede, mes, métrica).
+
+Todas las gráficas mensuales de Preventivos, Roedores y Lámparas resumen el mismo
+frame por mes. En lugar de que cada función repita su propio groupby (y de que
+los reportes lo repitan por cada sede), el cubo se construye una sola vez por
+dataset con un único groupby por (Sede, Mes_key). Las gráficas toman de él sus tablas,
+cuyo tamaño depende de la cantidad de meses y sedes, no de la cantidad de filas.
+
+Los meses se agrupan y ordenan por la llave entera yyyymm ('Mes_key'); la etiqueta
+'Mon YYYY' solo se genera al armar cada tabla.
+
+MonthlyCubeAccumulator arma el mismo cubo por partes (p. ej. bloque a bloque al
+leer una exportación en streaming): las sumas se acumulan y de las métricas de
+conteo distinto solo se guardan los valores distintos por (sede, mes).
+
+Para los reportes por rango de meses (trimestre, ciclo, año hasta la fecha) cada
+cubo arma una vez las sumas acumuladas por mes de sus métricas sumables
+(MonthlyPrefixSums): el total de cualquier rango es la resta de dos filas.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_processing.data_cleaner import month_label
+from data_processing.report_periods import month_index
+
+PREVENTIVOS_PLAGA_COLUMNS = [
+    'Cantidad de Cucaracha Americana',
+    'Cantidad de Cucaracha Alemana ',  # Note the trailing space
+    'Cantidad de Hormigas',
+    'Cantidad de Moscas',
+    'Cantidad de Mosquitos',
+    'Cantidad de Zancudos',
+    'Cantidad de Ratón casero',
+    'Cantidad de Rata Noruega',
+    'Cantidad de Ratón de tejado',
+    'Cantidad de Otras plagas'
+]
+
+ROEDORES_ESTADO_COLUMNS = [
+    'Consumido', 'Instalación', 'Sin novedad', 'Presencia de roedores',
+    'Presencia de bioindicador', 'Cambio de cebo por deterioro', 'Desaparecida',
+    'Estación dañada', 'Estación bloqueada'
+]
+
+LAMPARAS_ESTADO_COLUMNS = [
+    'Buena potencia', 'Deteriorada', 'Apagada', 'Bombillo averiado',
+    'Desconectada', 'Faltante', 'Lámina saturada', 'Obstruida', 'Baja potencia'
+]
+
+LAMPARAS_ESPECIE_COLUMNS = [
+    'mariposas', 'moscas', 'mosquitos', 'polillas', 'zancudos',
+    'avispas', 'abejas', 'grillos', 'coleópteros', 'Otras especies'
+]
+
+# Indicadores del informe del Hospital San Vicente (calculate_dynamic_variables), como
+# sumas por (sede, mes) para poder totalizarlos en cualquier rango de meses
+ROWS_METRIC = 'Registros'
+HOSPITAL_PLAGA_COLUMNS = ['Cucarachas Alemanas', 'Cucarachas Americanas', 'Moscas', 'Zancudos',
+                          'Ratas', 'Ratones', 'Hormigas']
+
+
+def areas_metric(col: str) -> str:
+    """Métrica de registros con la plaga `col` (> 0)."""
+    return f"Áreas con {col}"
+
+
+def total_metric(col: str) -> str:
+    """Métrica de la suma de la columna `col`."""
+    return f"Total {col}"
+
+
+class MonthlyAggregateCube:
+    """
+    Agregados mensuales de un dataset, indexados por (Sede, Mes_key) con una columna por métrica.
+
+    `by_sede` guarda el nivel por sede y `total` el nivel de todas las sedes juntas
+    (las métricas de conteo distinto no son sumables entre sedes, por eso el total
+    se guarda aparte en lugar de derivarse al consultar).
+    """
+
+    def __init__(self, by_sede: pd.DataFrame, total: pd.DataFrame, additive: Optional[List[str]] = None):
+        self.by_sede = by_sede
+        self.total = total
+        # Métricas sumables entre meses (las de conteo distinto no lo son)
+        self.additive = list(total.columns) if additive is None else list(additive)
+        self._prefix_sums = None
+
+    @property
+    def sedes(self) -> List[str]:
+        """Sedes presentes en el cubo."""
+        return [sede for sede in self.by_sede.index.unique(level='Sede') if pd.notna(sede)]
+
+    def table(self, metrics: List[str], sede: Optional[str] = None) -> pd.DataFrame:
+        """
+        Tabla mensual con las métricas pedidas, una fila por mes en orden cronológico.
+
+        Equivale a `df.groupby('Mes_key').agg(...)` sobre el frame
+        completo (sede=None) o sobre las filas de una sede.
+
+        Args:
+            metrics: Métricas (columnas) a incluir, en el orden deseado
+            sede: Sede a consultar; None para todas las sedes
+
+        Returns:
+            pd.DataFrame: Columna 'Mes' (categórica ordenada) seguida de las métricas
+        """
+        if sede is None:
+            frame = self.total
+        elif sede in self.sedes:
+            frame = self.by_sede.xs(sede, level='Sede')
+        else:
+            frame = self.total.iloc[0:0]
+        table = frame[list(metrics)].reset_index(drop=True)
+        table.insert(0, 'Mes', month_label(frame.index))
+        return table
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> 'MonthlyAggregateCube':
+        """Cubo con solo los meses entre `start` y `end` (yyyymm, incluidos)."""
+        def _months(frame: pd.DataFrame) -> pd.DataFrame:
+            keys = frame.index.get_level_values('Mes_key')
+            mask = np.ones(len(frame), dtype=bool)
+            if start is not None:
+                mask &= np.asarray(keys >= start)
+            if end is not None:
+                mask &= np.asarray(keys <= end)
+            return frame[mask]
+
+        return MonthlyAggregateCube(_months(self.by_sede), _months(self.total), self.additive)
+
+    def prefix_sums(self) -> 'MonthlyPrefixSums':
+        """Sumas acumuladas por mes de las métricas sumables (se arman una vez por cubo)."""
+        if self._prefix_sums is None:
+            frames = {None: self.total}
+            frames.update({sede: self.by_sede.xs(sede, level='Sede') for sede in self.sedes})
+            self._prefix_sums = MonthlyPrefixSums(frames, self.additive)
+        return self._prefix_sums
+
+    def range_totals(self, metrics: List[str], start: Optional[int] = None, end: Optional[int] = None,
+                     sede: Optional[str] = None) -> pd.Series:
+        """
+        Total de las métricas en los meses entre `start` y `end` (yyyymm, incluidos).
+
+        Equivale a sumar las filas de esos meses (de una sede o de todas), pero con las
+        sumas acumuladas: dos filas y una resta, sin importar el largo del rango.
+
+        Raises:
+            ValueError: Si se pide una métrica no sumable (conteo distinto)
+        """
+        not_additive = [metric for metric in metrics if metric not in self.additive]
+        if not_additive:
+            raise ValueError(f"Métricas no sumables entre meses: {not_additive}")
+        return self.prefix_sums().total(metrics, start, end, sede)
+
+    def __getstate__(self):
+        # Las sumas acumuladas se rearman al usarlas; no viajan en la caché ni a los trabajadores
+        return {**self.__dict__, '_prefix_sums': None}
+
+
+class MonthlyPrefixSums:
+    """
+    Sumas acumuladas por mes de las métricas sumables de un cubo, por sede y total.
+
+    Los meses van en un eje denso (una fila por mes calendario entre el primero y el
+    último del cubo, con ceros en los meses sin datos): la fila de un mes se calcula
+    desde su llave yyyymm y el total de [desde, hasta] es acumulado[hasta] - acumulado[desde - 1].
+    """
+
+    def __init__(self, frames: Dict[Optional[str], pd.DataFrame], metrics: List[str]):
+        self.metrics = list(metrics)
+        keys = [int(key) for frame in frames.values() for key in frame.index]
+        self.first = month_index(min(keys)) if keys else 0
+        self.length = month_index(max(keys)) - self.first + 1 if keys else 0
+        self._cumulative = {}
+        for sede, frame in frames.items():
+            # Fila 0 en ceros: el acumulado antes del primer mes
+            dense = np.zeros((self.length + 1, len(self.metrics)), dtype=np.int64)
+            rows = np.array([month_index(int(key)) - self.first + 1 for key in frame.index], dtype=np.int64)
+            if len(rows):
+                dense[rows] = frame[self.metrics].to_numpy(dtype=np.int64)
+            self._cumulative[sede] = dense.cumsum(axis=0)
+
+    def _row(self, key: int) -> int:
+        """Fila del acumulado hasta el mes `key` incluido, limitada al eje."""
+        return min(max(month_index(key) - self.first + 1, 0), self.length)
+
+    def _row_before(self, key: int) -> int:
+        """Fila del acumulado hasta el mes anterior a `key`, limitada al eje."""
+        return min(max(month_index(key) - self.first, 0), self.length)
+
+    def total(self, metrics: List[str], start: Optional[int] = None, end: Optional[int] = None,
+              sede: Optional[str] = None) -> pd.Series:
+        """Total de `metrics` entre `start` y `end` (yyyymm); ceros si la sede o los meses no tienen datos."""
+        columns = [self.metrics.index(metric) for metric in metrics]
+        cumulative = self._cumulative.get(sede)
+        low = 0 if start is None else self._row_before(start)
+        high = self.length if end is None else self._row(end)
+        if cumulative is None or high <= low:
+            return pd.Series(0, index=list(metrics), dtype='int64')
+        return pd.Series(cumulative[high, columns] - cumulative[low, columns], index=list(metrics))
+
+
+def build_monthly_cube(df: pd.DataFrame, sums: Dict[str, str],
+                       distinct: Optional[Dict[str, str]] = None) -> MonthlyAggregateCube:
+    """
+    Construye el cubo de un dataset con un único groupby por (Sede, Mes_key).
+
+    Args:
+        df: DataFrame transformado con columnas 'Sede' y 'Mes_key'
+        sums: Métrica -> columna a sumar
+        distinct: Métrica -> columna cuyos valores distintos se cuentan
+
+    Returns:
+        MonthlyAggregateCube: Cubo con niveles por sede y total
+    """
+    distinct = distinct or {}
+    named_aggs = {metric: (col, 'sum') for metric, col in sums.items()}
+    named_aggs.update({metric: (col, 'nunique') for metric, col in distinct.items()})
+
+    # dropna=False conserva las filas sin sede para el total, como el groupby por mes original;
+    # observed=True evita el producto cartesiano cuando 'Sede' es categórica
+    by_sede = df.groupby(['Sede', 'Mes_key'], dropna=False, observed=True).agg(**named_aggs)
+    by_sede = by_sede[by_sede.index.get_level_values('Mes_key').notna()]
+    # Con entradas compactas (UInt8, Int32, ver CSV_SCHEMAS) pandas devuelve las sumas en el tipo
+    # de entrada cuando caben; los agregados son conteos y se guardan siempre como int64
+    by_sede = by_sede.astype('int64')
+
+    # Las sumas del total se derivan del nivel por sede; los conteos distintos se recalculan
+    total = by_sede[list(sums)].groupby(level='Mes_key').sum()
+    if distinct:
+        distinct_total = df.groupby('Mes_key').agg(**{metric: (col, 'nunique') for metric, col in distinct.items()})
+        total = total.join(distinct_total)
+
+    return MonthlyAggregateCube(by_sede, total[list(named_aggs)], additive=list(sums))
+
+
+# Valor de las filas sin sede mientras se acumula (los índices con NaN no se alinean al sumar)
+_NO_SEDE = '\x00sin sede'
+
+
+class MonthlyCubeAccumulator:
+    """
+    Construye un MonthlyAggregateCube por partes, con el mismo resultado que
+    `build_monthly_cube` sobre todas las partes concatenadas.
+
+    La memoria depende de la cantidad de (sede, mes) y de valores distintos, no de filas.
+    """
+
+    def __init__(self, sums: Dict[str, str], distinct: Optional[Dict[str, str]] = None):
+        self.sums = sums
+        self.distinct = distinct or {}
+        self._totals = None
+        self._values = {metric: None for metric in self.distinct}
+        self._sede_categories = None
+
+    def add(self, df: pd.DataFrame):
+        """Acumula una parte (mismas columnas que recibe build_monthly_cube)."""
+        sede = df['Sede']
+        if isinstance(sede.dtype, pd.CategoricalDtype):
+            categories = set(sede.cat.categories)
+            self._sede_categories = categories | (self._sede_categories or set())
+        frame = df.assign(Sede=sede.astype(object).fillna(_NO_SEDE))
+        frame = frame[frame['Mes_key'].notna()]
+
+        partial = frame.groupby(['Sede', 'Mes_key']).agg(
+            **{metric: (col, 'sum') for metric, col in self.sums.items()}
+        ).astype('int64')
+        self._totals = partial if self._totals is None else self._totals.add(partial, fill_value=0)
+
+        for metric, col in self.distinct.items():
+            values = frame[['Sede', 'Mes_key', col]].dropna(subset=[col]).astype({col: object}).drop_duplicates()
+            previous = self._values[metric]
+            if previous is not None:
+                values = pd.concat([previous, values], ignore_index=True).drop_duplicates()
+            self._values[metric] = values
+
+    def result(self) -> MonthlyAggregateCube:
+        """El cubo de todas las partes acumuladas."""
+        if self._totals is None:
+            raise ValueError("No se acumuló ninguna parte")
+        by_sede = self._totals.astype('int64')
+        for metric, col in self.distinct.items():
+            counts = self._values[metric].groupby(['Sede', 'Mes_key']).size()
+            by_sede[metric] = counts.reindex(by_sede.index, fill_value=0).astype('int64')
+
+        # Mismo índice que el groupby por (Sede, Mes_key): sede categórica si lo era, filas sin sede al final
+        sedes = by_sede.index.get_level_values('Sede').to_numpy(dtype=object)
+        sedes = np.where(sedes == _NO_SEDE, np.nan, sedes)
+        if self._sede_categories is not None:
+            sedes = pd.Categorical(sedes, categories=sorted(self._sede_categories))
+        months = by_sede.index.get_level_values('Mes_key')
+        by_sede.index = pd.MultiIndex.from_arrays([sedes, months], names=['Sede', 'Mes_key'])
+        by_sede = by_sede.sort_index(na_position='last')
+
+        total = by_sede[list(self.sums)].groupby(level='Mes_key').sum()
+        for metric, col in self.distinct.items():
+            total[metric] = self._values[metric].groupby('Mes_key')[col].nunique().reindex(total.index, fill_value=0)
+        return MonthlyAggregateCube(by_sede, total[list(by_sede.columns)], additive=list(self.sums))
+
+
+def preventivos_cube_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], Dict[str, str]]:
+    """Entrada del cubo de Preventivos: órdenes y áreas distintas, áreas con plaga, cantidades por plaga
+    e indicadores del informe hospitalario (registros y, por plaga, áreas con plaga y total)."""
+    plagas = [col for col in HOSPITAL_PLAGA_COLUMNS if col in df.columns]
+    frame = df[['Sede', 'Mes_key', 'Código', 'Área'] + PREVENTIVOS_PLAGA_COLUMNS].assign(
+        **{'Áreas con plaga': df['Plagas evidenciadas'] != 'Sin evidencia', ROWS_METRIC: 1},
+        **{areas_metric(col): (df[col] > 0).fillna(False) for col in plagas},
+        **{total_metric(col): df[col] for col in plagas}
+    )
+    sums = {col: col for col in PREVENTIVOS_PLAGA_COLUMNS + ['Áreas con plaga', ROWS_METRIC]}
+    sums.update({metric: metric for col in plagas for metric in (areas_metric(col), total_metric(col))})
+    distinct = {'Cantidad de órdenes': 'Código', 'Cantidad de áreas': 'Área'}
+    return frame, sums, distinct
+
+
+def roedores_cube_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], Dict[str, str]]:
+    """Entrada del cubo de Roedores: cantidad de estaciones en cada estado, registros y consumo."""
+    frame = df[['Sede', 'Mes_key'] + ROEDORES_ESTADO_COLUMNS].assign(**{ROWS_METRIC: 1})
+    sums = {col: col for col in ROEDORES_ESTADO_COLUMNS + [ROWS_METRIC]}
+    if 'Consumo' in df.columns:
+        frame = frame.assign(**{total_metric('Consumo'): df['Consumo']})
+        sums[total_metric('Consumo')] = total_metric('Consumo')
+    return frame, sums, {}
+
+
+def lamparas_cube_input(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], Dict[str, str]]:
+    """Entrada del cubo de Lámparas: estados de las lámparas, capturas por especie, registros,
+    lámparas saturadas y capturas totales."""
+    columns = LAMPARAS_ESTADO_COLUMNS + LAMPARAS_ESPECIE_COLUMNS
+    frame = df[['Sede', 'Mes_key'] + columns].assign(
+        # 'Otras especies' mezcla texto y números en la exportación
+        **{'Otras especies': pd.to_numeric(df['Otras especies'], errors='coerce').fillna(0).astype(int)},
+        **{ROWS_METRIC: 1}
+    )
+    sums = {col: col for col in columns + [ROWS_METRIC]}
+    if 'Estado' in df.columns:
+        frame = frame.assign(**{'Lámparas saturadas': df['Estado'] == 'Saturada'})
+        sums['Lámparas saturadas'] = 'Lámparas saturadas'
+    if 'Capturas' in df.columns:
+        frame = frame.assign(**{total_metric('Capturas'): df['Capturas']})
+        sums[total_metric('Capturas')] = total_metric('Capturas')
+    return frame, sums, {}
+
+
+# Entrada del cubo de cada dataset a partir de su frame transformado (o de una parte)
+CUBE_INPUTS: Dict[str, Callable[[pd.DataFrame], Tuple[pd.DataFrame, Dict[str, str], Dict[str, str]]]] = {
+    'preventivos': preventivos_cube_input,
+    'roedores': roedores_cube_input,
+    'lamparas': lamparas_cube_input,
+}
+
+
+def build_preventivos_cube(df: pd.DataFrame) -> MonthlyAggregateCube:
+    """Cubo de Preventivos: órdenes y áreas distintas, áreas con plaga y cantidades por plaga."""
+    return build_monthly_cube(*preventivos_cube_input(df))
+
+
+def build_roedores_cube(df: pd.DataFrame) -> MonthlyAggregateCube:
+    """Cubo de Roedores: cantidad de estaciones en cada estado."""
+    return build_monthly_cube(*roedores_cube_input(df))
+
+
+def build_lamparas_cube(df: pd.DataFrame) -> MonthlyAggregateCube:
+    """Cubo de Lámparas: estados de las lámparas y capturas por especie."""
+    return build_monthly_cube(*lamparas_cube_input(df))
+
+
+def build_monthly_cubes(df_preventivo: pd.DataFrame, df_roedores: pd.DataFrame,
+                        df_lamparas: pd.DataFrame) -> Dict[str, MonthlyAggregateCube]:
+    """
+    Construye los cubos de los tres datasets, para compartirlos entre reportes y sedes.
+
+    Returns:
+        Dict[str, MonthlyAggregateCube]: Cubos por dataset ('preventivos', 'roedores', 'lamparas')
+    """
+    return {
+        'preventivos': build_preventivos_cube(df_preventivo),
+        'roedores': build_roedores_cube(df_roedores),
+        'lamparas': build_lamparas_cube(df_lamparas),
+    }
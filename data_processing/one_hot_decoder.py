@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def decode_one_hot(df: pd.DataFrame, prefix: str, sep: str = ', ') -> pd.Series:
+    """
+    Decode a KoBo "select_multiple" one-hot block into a joined label Series.
+
+    Every column starting with `prefix` (e.g. 'Técnicos/') is a 0/1 flag whose
+    label is the rest of the column name. The whole block is read as a uint8
+    matrix, each row is reduced to a pattern code, and the labels are joined
+    once per distinct pattern, so the string work does not grow with the row count.
+
+    Args:
+        df: Raw DataFrame containing the one-hot columns
+        prefix: Column prefix of the block, including the trailing '/'
+        sep: Separator placed between the selected labels
+
+    Returns:
+        pd.Series: Joined labels per row ('' when nothing is selected)
+    """
+    columns = [col for col in df.columns if col.startswith(prefix)]
+    if not columns or df.empty:
+        return pd.Series('', index=df.index, dtype=object)
+
+    labels = np.array([col[len(prefix):] for col in columns], dtype=object)
+    # Blank flags (nullable UInt8 from the CSV schemas) count as not selected
+    block = (df[columns] == 1).to_numpy(dtype=bool, na_value=False).astype(np.uint8)
+
+    patterns, inverse = _unique_patterns(block)
+    joined = np.array([sep.join(labels[pattern.astype(bool)]) for pattern in patterns], dtype=object)
+
+    return pd.Series(joined[inverse], index=df.index, dtype=object)
+
+
+def _unique_patterns(block: np.ndarray):
+    """Return the distinct rows of a 0/1 matrix and the row -> pattern index."""
+    n_cols = block.shape[1]
+    if n_cols < 64:
+        # Pack each row into one integer with a matrix product over bit weights
+        weights = np.left_shift(np.uint64(1), np.arange(n_cols, dtype=np.uint64))
+        codes = block.astype(np.uint64) @ weights
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        return block[first], inverse
+
+    patterns, inverse = np.unique(block, axis=0, return_inverse=True)
+    return patterns, inverse.reshape(-1)
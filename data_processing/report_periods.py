@@ -0,0 +1,113 @@
+"""
+Períodos de reporte: rangos de meses [desde, hasta] en llaves yyyymm ('Mes_key').
+
+Además del mes en curso, un reporte puede cubrir el trimestre, el ciclo de contrato
+de 12 meses (REPORT_RANGE_CONFIG['cycle_start_month']), el año hasta la fecha o un
+rango explícito ('2025-01:2025-03'). Los totales de un período salen de las sumas
+acumuladas de los cubos mensuales (MonthlyAggregateCube.range_totals), no de las filas.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from config.settings import REPORT_RANGE_CONFIG
+
+# Períodos relativos al mes en curso (--range)
+RANGE_KINDS = ('month', 'quarter', 'cycle', 'ytd')
+
+
+def month_key(date: Optional[datetime] = None) -> int:
+    """Llave yyyymm de un mes (por defecto el mes en curso)."""
+    date = date or datetime.now()
+    return date.year * 100 + date.month
+
+
+def month_index(key: int) -> int:
+    """Número de meses desde el año 0 de una llave yyyymm (para restar meses entre sí)."""
+    return (key // 100) * 12 + key % 100 - 1
+
+
+def shift_month(key: int, months: int) -> int:
+    """Suma `months` meses (negativos para retroceder) a una llave yyyymm."""
+    index = month_index(key) + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def cycle_month(key: int, cycle_start_month: Optional[int] = None) -> int:
+    """Número (1-12) del mes `key` dentro del ciclo de contrato."""
+    cycle_start_month = cycle_start_month or REPORT_RANGE_CONFIG['cycle_start_month']
+    return (key % 100 - cycle_start_month) % 12 + 1
+
+
+def _parse_month(text: str) -> int:
+    try:
+        date = datetime.strptime(text.strip(), '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Mes inválido '{text}': se espera AAAA-MM")
+    return month_key(date)
+
+
+class ReportPeriod:
+    """Rango de meses de un reporte, ambos extremos incluidos."""
+
+    def __init__(self, start: int, end: int, kind: str = 'range'):
+        if start > end:
+            raise ValueError(f"Período inválido: {start} es posterior a {end}")
+        self.start = start
+        self.end = end
+        self.kind = kind
+
+    @property
+    def months(self) -> int:
+        """Cantidad de meses del período."""
+        return month_index(self.end) - month_index(self.start) + 1
+
+    @property
+    def end_date(self) -> datetime:
+        """Primer día del último mes del período."""
+        return datetime(self.end // 100, self.end % 100, 1)
+
+    @property
+    def slug(self) -> str:
+        """Identificador del período para nombres de archivo ('2025-01_2025-03')."""
+        start, end = f"{self.start // 100}-{self.start % 100:02d}", f"{self.end // 100}-{self.end % 100:02d}"
+        return start if self.start == self.end else f"{start}_{end}"
+
+    def contains(self, key: int) -> bool:
+        return self.start <= key <= self.end
+
+    def __repr__(self) -> str:
+        return f"ReportPeriod({self.start}, {self.end}, kind={self.kind!r})"
+
+
+def resolve_period(spec: str, today: Optional[datetime] = None) -> ReportPeriod:
+    """
+    Convierte la opción --range en un período.
+
+    Args:
+        spec: 'month' (mes en curso), 'quarter' (trimestre en curso), 'cycle' (ciclo de
+            contrato en curso), 'ytd' (año hasta la fecha), 'AAAA-MM' o 'AAAA-MM:AAAA-MM'
+        today: Fecha de referencia de los períodos relativos (por defecto hoy)
+
+    Returns:
+        ReportPeriod: Rango de meses; los relativos terminan en el mes en curso
+
+    Raises:
+        ValueError: Si la opción no es válida
+    """
+    current = month_key(today)
+    if spec == 'month':
+        return ReportPeriod(current, current, spec)
+    if spec == 'quarter':
+        return ReportPeriod(current - (current % 100 - 1) % 3, current, spec)
+    if spec == 'cycle':
+        return ReportPeriod(shift_month(current, -(cycle_month(current) - 1)), current, spec)
+    if spec == 'ytd':
+        return ReportPeriod((current // 100) * 100 + 1, current, spec)
+    if ':' in spec:
+        start, end = spec.split(':', 1)
+        return ReportPeriod(_parse_month(start), _parse_month(end))
+    if spec and spec[0].isdigit():
+        key = _parse_month(spec)
+        return ReportPeriod(key, key)
+    raise ValueError(f"Período inválido '{spec}': use {', '.join(RANGE_KINDS)}, AAAA-MM o AAAA-MM:AAAA-MM")
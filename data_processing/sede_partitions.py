@@ -0,0 +1,91 @@
+"""
+Particiones por sede de los datasets transformados.
+
+Los generadores de reportes filtraban cada dataset con `df[df['Sede'] == sede]`
+(y a veces `.copy()`): por cada sede y tipo de reporte se recorría y copiaba el
+frame completo. Aquí se arma una sola vez, por dataset, una copia ordenada por
+sede (orden estable, así cada sede conserva el orden original de sus filas) con
+'Sede' como categórica, y se guardan los límites de cada bloque. La parte de una
+sede es un corte `iloc[inicio:fin]` de esa copia: una vista sin copia, de costo
+constante sin importar cuántas sedes haya en SEDES. El dataset original no se
+modifica ni se reemplaza: conserva el orden de sus filas para todo lo que lo usa
+completo (cubos, historial, caché por etapas).
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SedePartitions:
+    """
+    Las partes por sede de un dataset.
+
+    Guarda una copia del dataset con las mismas filas (e índice) agrupadas por sede;
+    las filas sin sede quedan al final y no pertenecen a ninguna parte. Las partes
+    que entrega `get` son vistas de esa copia: no deben modificarse.
+    """
+
+    def __init__(self, frame: pd.DataFrame, bounds: Dict[str, Tuple[int, int]]):
+        self._frame = frame
+        self._bounds = bounds
+
+    @property
+    def sedes(self) -> List[str]:
+        """Sedes con al menos una fila."""
+        return list(self._bounds)
+
+    def get(self, sede: str) -> pd.DataFrame:
+        """Filas de una sede (vista sin copia; vacía si la sede no tiene datos)."""
+        start, stop = self._bounds.get(sede, (0, 0))
+        return self._frame.iloc[start:stop]
+
+
+def partition_by_sede(df: pd.DataFrame) -> SedePartitions:
+    """
+    Agrupa por sede una copia del dataset y calcula el bloque de filas de cada una.
+
+    Args:
+        df: DataFrame transformado con columna 'Sede' (no se modifica)
+
+    Returns:
+        SedePartitions: Copia agrupada por sede y límites de cada bloque
+    """
+    sede = df['Sede'].array
+    if not isinstance(sede, pd.Categorical):
+        sede = pd.Categorical(sede)
+    categories = sede.categories
+
+    # Los códigos de las filas sin sede (-1) se mueven al final para que no corten los bloques
+    codes = sede.codes.astype(np.int64)
+    codes[codes < 0] = len(categories)
+    order = np.argsort(codes, kind='stable')
+
+    frame = df.take(order)
+    frame['Sede'] = sede.take(order)
+
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(categories)), side='left')
+    stops = np.searchsorted(sorted_codes, np.arange(len(categories)), side='right')
+    bounds = {
+        category: (int(start), int(stop))
+        for category, start, stop in zip(categories, starts, stops)
+        if stop > start
+    }
+    return SedePartitions(frame, bounds)
+
+
+def build_sede_partitions(df_preventivo: pd.DataFrame, df_roedores: pd.DataFrame,
+                          df_lamparas: pd.DataFrame) -> Dict[str, SedePartitions]:
+    """
+    Particiona los tres datasets por sede, para compartirlos entre reportes.
+
+    Returns:
+        Dict[str, SedePartitions]: Particiones por dataset ('preventivos', 'roedores', 'lamparas')
+    """
+    return {
+        'preventivos': partition_by_sede(df_preventivo),
+        'roedores': partition_by_sede(df_roedores),
+        'lamparas': partition_by_sede(df_lamparas),
+    }
@@ -0,0 +1,162 @@
+"""
+Carga y transformación por bloques de exportaciones grandes.
+
+La carga normal lee el CSV completo y cada transform_*_df empieza con `df.copy()`:
+con años de historia el pico de memoria es el doble de la exportación cruda antes
+de podar columnas. En modo streaming el CSV se lee en bloques de `chunksize` filas
+(con los tipos de CSV_SCHEMAS), cada bloque se transforma por separado (las
+transformaciones son por fila) y se suma al cubo mensual con
+MonthlyCubeAccumulator. La exportación cruda nunca está completa en memoria: el
+pico es un bloque crudo más el frame transformado, que tiene muchas menos columnas.
+Con keep_frame=False solo se construye el cubo y la memoria no depende de la
+cantidad de filas.
+
+Al unir los bloques, las columnas categóricas ('Sede', 'Código') toman la unión
+ordenada de categorías, como el lector completo, y 'Mes' se recalcula con todos
+los meses. Las columnas sin tipo en el esquema se leen como texto en todos los
+bloques (inferidas por bloque, un valor numérico en un bloque y texto en otro
+cambiaría el resultado de las transformaciones).
+
+El frame leído por bloques no se escribe en la caché columnar: el lector de
+pandas no infiere igual que el de pyarrow (p. ej. las categorías de 'Código'
+quedan como texto), y la caché debe tener el mismo contenido que la carga completa.
+"""
+
+import os
+from typing import Callable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import CACHE_CONFIG, STREAMING_CONFIG
+from data_processing.columnar_cache import read_cached_frame
+from data_processing.data_cleaner import month_label
+from data_processing.data_loader import load_data, resolve_schema, transformed_frame_key
+from data_processing.kobo_sync import sync_kobo_export
+from data_processing.monthly_aggregates import (
+    CUBE_INPUTS,
+    MonthlyAggregateCube,
+    MonthlyCubeAccumulator,
+    build_monthly_cube
+)
+from instrumentation import span
+
+
+def iter_csv_chunks(source: str, schema: Optional[str] = None,
+                    chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lee un CSV local en bloques de `chunksize` filas (por defecto STREAMING_CONFIG['chunksize']).
+
+    Con `schema` solo se leen sus columnas, con sus tipos, como read_csv_with_schema; las
+    columnas sin tipo se leen como texto para que todos los bloques tengan los mismos tipos.
+    """
+    options = {'sep': ';', 'chunksize': chunksize or STREAMING_CONFIG['chunksize']}
+    usecols = None
+    if schema is not None:
+        header = pd.read_csv(source, sep=';', nrows=0).columns
+        usecols, dtype, parse_dates = resolve_schema(list(header), schema)
+        dtype.update({col: str for col in usecols if col not in dtype and col not in parse_dates})
+        options.update(usecols=usecols, dtype=dtype, parse_dates=parse_dates)
+
+    with pd.read_csv(source, **options) as reader:
+        for chunk in reader:
+            yield chunk[usecols] if usecols is not None else chunk
+
+
+def concat_transformed_chunks(parts: list) -> pd.DataFrame:
+    """Une los bloques transformados: categorías unidas y ordenadas, y 'Mes' recalculado con todos los meses."""
+    categorical = [col for col, dtype in parts[0].dtypes.items()
+                   if isinstance(dtype, pd.CategoricalDtype) and col != 'Mes']
+    categories = {col: sorted(set().union(*(part[col].cat.categories for part in parts))) for col in categorical}
+
+    frame = pd.concat(parts) if len(parts) > 1 else parts[0]
+    for col in categorical:
+        frame[col] = pd.Categorical(frame[col], categories=categories[col])
+    if 'Mes_key' in frame.columns and 'Mes' in frame.columns:
+        frame['Mes'] = month_label(frame['Mes_key'])
+    return frame
+
+
+def stream_transform(source: str, transform: Callable[[pd.DataFrame], pd.DataFrame],
+                     schema: Optional[str] = None, chunksize: Optional[int] = None,
+                     keep_frame: bool = True) -> Tuple[Optional[pd.DataFrame], Optional[MonthlyAggregateCube]]:
+    """
+    Lee y transforma un CSV local bloque a bloque, acumulando su cubo mensual.
+
+    Args:
+        source: Ruta al CSV local
+        transform: Transformación por filas (p. ej. transform_lamparas_df)
+        schema: Esquema de CSV_SCHEMAS; también elige el cubo ('preventivos', 'roedores', 'lamparas')
+        chunksize: Filas por bloque (por defecto STREAMING_CONFIG['chunksize'])
+        keep_frame: Con False no se guarda el frame transformado, solo el cubo
+
+    Returns:
+        Tuple: (frame transformado o None, cubo mensual o None si el esquema no tiene cubo)
+    """
+    cube_input = CUBE_INPUTS.get(schema)
+    accumulator = None
+    parts = []
+
+    for chunk in iter_csv_chunks(source, schema, chunksize):
+        transformed = transform(chunk)
+        del chunk
+        if cube_input is not None:
+            frame, sums, distinct = cube_input(transformed)
+            if accumulator is None:
+                accumulator = MonthlyCubeAccumulator(sums, distinct)
+            accumulator.add(frame)
+        if keep_frame:
+            parts.append(transformed)
+
+    if accumulator is None:
+        # Exportación sin filas: se transforma el encabezado para obtener las columnas finales
+        empty = transform(load_data(source, use_cache=False, schema=schema))
+        return empty if keep_frame else None, None
+
+    frame = concat_transformed_chunks(parts) if keep_frame else None
+    return frame, accumulator.result()
+
+
+def load_streaming_with_fallback(local_path: str, url_fallback: str,
+                                 transform: Callable[[pd.DataFrame], pd.DataFrame], schema: str,
+                                 sync_url: Optional[str] = None,
+                                 chunksize: Optional[int] = None) -> Tuple[pd.DataFrame, MonthlyAggregateCube]:
+    """
+    Como load_data_with_fallback con `transform`, pero leyendo el archivo local por bloques.
+
+    Devuelve también el cubo mensual del dataset, acumulado durante la lectura (o construido
+    del frame completo si viene de la caché columnar o de la URL de fallback).
+
+    Returns:
+        Tuple[pd.DataFrame, MonthlyAggregateCube]: Frame transformado y su cubo
+    """
+    if sync_url:
+        try:
+            with span('sincronizacion', dataset=schema):
+                sync_kobo_export(local_path, sync_url)
+        except Exception as e:
+            print(f"⚠️  Sincronización incremental fallida: {e}")
+
+    def _with_cube(df: pd.DataFrame) -> Tuple[pd.DataFrame, MonthlyAggregateCube]:
+        return df, build_monthly_cube(*CUBE_INPUTS[schema](df))
+
+    variant = transform.__name__
+    code_key = transformed_frame_key(transform, schema)
+    if CACHE_CONFIG.get('cache_transformed', False):
+        cached = read_cached_frame(local_path, variant=variant, extra_key=code_key)
+        if cached is not None:
+            print(f"⚡ Datos transformados desde caché columnar: {local_path}")
+            return _with_cube(cached)
+
+    if os.path.exists(local_path):
+        print(f"📁 Cargando datos por bloques desde archivo: {local_path}")
+        try:
+            with span('transformacion_por_bloques', dataset=schema):
+                df, cube = stream_transform(local_path, transform, schema, chunksize)
+        except Exception as e:
+            print(f"⚠️  Lectura por bloques fallida, se carga el archivo completo: {e}")
+            return _with_cube(transform(load_data(local_path, schema=schema)))
+        return df, cube
+
+    print(f"⚠️  No se pudo cargar archivo local: Archivo no encontrado: {local_path}")
+    print(f"🔄 Intentando cargar desde URL fallback...")
+    return _with_cube(transform(load_data(url_fallback, schema=schema)))
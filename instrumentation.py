@@ -0,0 +1,259 @@
+"""
+Instrumentación por etapas del pipeline de reportes.
+
+`span(nombre, **atributos)` es un context manager que mide una etapa (carga,
+transformación, gráficas, guardado del .docx, limpieza...) y, por cada una, escribe
+una línea JSON en LOGGING_CONFIG['file_path'] con:
+    - wall_s / cpu_s: tiempo real y de CPU del proceso durante la etapa
+    - rss_peak_mb: pico de memoria residente del proceso ('pid') al terminar la etapa
+      (no disponible en Windows, donde no existe el módulo `resource`)
+    - tracemalloc_peak_mb: pico de memoria asignada por Python dentro de la etapa,
+      solo con LOGGING_CONFIG['trace_memory'] (tracemalloc hace todo más lento; su
+      pico es del proceso, e incluye lo que asignen otros hilos en ese lapso)
+Las etapas se anidan dentro de cada hilo: 'path' indica la cadena de etapas que la contienen.
+
+Deshabilitada (por defecto), `span` devuelve siempre el mismo context manager
+vacío: el costo es una comparación por etapa. Al final de la ejecución
+`print_span_summary` muestra una tabla con el total de cada etapa.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import LOGGING_CONFIG
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Atributos que distinguen las filas del resumen (el resto solo va al registro JSON)
+SUMMARY_ATTRIBUTES = ('dataset', 'kind', 'sede')
+
+_NULL_SPAN = contextlib.nullcontext()
+
+_state = {
+    'enabled': False,
+    'trace_memory': False,
+    'run_id': None,
+    'file_path': None,
+    'records': [],
+}
+
+# Pila de etapas abiertas de cada hilo (p. ej. la carga concurrente de las exportaciones)
+_local = threading.local()
+_records_lock = threading.Lock()
+
+
+def enable_instrumentation(file_path: Optional[str] = None, trace_memory: Optional[bool] = None,
+                           run_id: Optional[str] = None, to_file: bool = True):
+    """
+    Activa la instrumentación para el resto de la ejecución.
+
+    Args:
+        file_path: Archivo de líneas JSON (por defecto LOGGING_CONFIG['file_path'])
+        trace_memory: Medir también el pico de memoria de Python con tracemalloc
+            (por defecto LOGGING_CONFIG['trace_memory'])
+        run_id: Identificador de la ejecución en el registro (por defecto uno nuevo)
+        to_file: Con False los registros solo se acumulan en memoria (ver drain_spans)
+    """
+    if trace_memory is None:
+        trace_memory = LOGGING_CONFIG.get('trace_memory', False)
+    _state.update(
+        enabled=True,
+        trace_memory=trace_memory,
+        run_id=run_id or uuid.uuid4().hex[:12],
+        file_path=(file_path or LOGGING_CONFIG.get('file_path')) if to_file else None,
+        records=[],
+    )
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if _state['file_path']:
+        directory = os.path.dirname(_state['file_path'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+
+def disable_instrumentation():
+    """Desactiva la instrumentación (y tracemalloc, si la instrumentación lo inició)."""
+    if _state['trace_memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.update(enabled=False, trace_memory=False)
+
+
+def is_instrumentation_enabled() -> bool:
+    return _state['enabled']
+
+
+def instrumentation_settings() -> Optional[Dict]:
+    """Configuración activa (para activarla igual en los procesos trabajadores), o None."""
+    if not _state['enabled']:
+        return None
+    return {'trace_memory': _state['trace_memory'], 'run_id': _state['run_id']}
+
+
+def _stack() -> list:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB y macOS en bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+class _Span:
+    """Etapa en curso: se mide al salir y se registra."""
+
+    __slots__ = ('name', 'attributes', 'started', 'wall_start', 'cpu_start', 'traced_peak')
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.traced_peak = 0
+
+    def __enter__(self):
+        stack = _stack()
+        if _state['trace_memory']:
+            # El pico de tracemalloc es global: se acumula en la etapa que contiene
+            # a esta antes de reiniciarlo para medir solo esta
+            if stack:
+                stack[-1].traced_peak = max(stack[-1].traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.started = datetime.now().isoformat(timespec='milliseconds')
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        stack = _stack()
+        stack.pop()
+
+        record = {
+            'run_id': _state['run_id'],
+            'pid': os.getpid(),
+            'ts': self.started,
+            'span': self.name,
+            'path': '/'.join([parent.name for parent in stack] + [self.name]),
+            **self.attributes,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rss_peak_mb': _peak_rss_mb(),
+            'status': 'ok' if exc_type is None else 'error',
+        }
+        if exc_type is not None:
+            record['error'] = f"{exc_type.__name__}: {exc}"
+        if _state['trace_memory'] and tracemalloc.is_tracing():
+            self.traced_peak = max(self.traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            if stack:
+                stack[-1].traced_peak = max(stack[-1].traced_peak, self.traced_peak)
+            record['tracemalloc_peak_mb'] = round(self.traced_peak / (1024 * 1024), 1)
+
+        record_spans([record])
+        return False
+
+
+def span(name: str, **attributes):
+    """
+    Mide una etapa del pipeline.
+
+    Uso:
+        with span('carga', dataset='preventivos'):
+            ...
+
+    Args:
+        name: Nombre de la etapa
+        **attributes: Atributos del registro (p. ej. dataset, kind, sede); deben ser serializables en JSON
+
+    Returns:
+        Context manager (vacío si la instrumentación está desactivada)
+    """
+    if not _state['enabled']:
+        return _NULL_SPAN
+    return _Span(name, attributes)
+
+
+def record_spans(records: List[Dict]):
+    """Agrega registros de etapas al resumen y al archivo (p. ej. los de un proceso trabajador)."""
+    if not records:
+        return
+    with _records_lock:
+        _state['records'].extend(records)
+        if not _state['file_path']:
+            return
+        try:
+            with open(_state['file_path'], 'a', encoding='utf-8') as log_file:
+                for record in records:
+                    log_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"⚠️  No se pudo escribir la instrumentación en {_state['file_path']}: {e}")
+            _state['file_path'] = None
+
+
+def drain_spans() -> List[Dict]:
+    """Devuelve y descarta los registros acumulados en este proceso."""
+    with _records_lock:
+        records = _state['records']
+        _state['records'] = []
+    return records
+
+
+def get_span_summary() -> List[Dict]:
+    """Totales por etapa (y dataset, tipo de reporte y sede), en el orden en que empezaron."""
+    summary = {}
+    # Una etapa y las que contiene pueden empezar en el mismo milisegundo: primero la externa
+    for record in sorted(_state['records'], key=lambda r: (r['ts'], r['path'].count('/'))):
+        label = record['span']
+        details = [str(record[attribute]) for attribute in SUMMARY_ATTRIBUTES if attribute in record]
+        if details:
+            label = f"{label} [{', '.join(details)}]"
+        row = summary.setdefault(label, {'etapa': label, 'n': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                         'rss_peak_mb': None, 'tracemalloc_peak_mb': None, 'errores': 0})
+        row['n'] += 1
+        row['wall_s'] += record['wall_s']
+        row['cpu_s'] += record['cpu_s']
+        row['errores'] += record['status'] != 'ok'
+        for key in ('rss_peak_mb', 'tracemalloc_peak_mb'):
+            if record.get(key) is not None:
+                row[key] = max(row[key] or 0.0, record[key])
+    return list(summary.values())
+
+
+def print_span_summary():
+    """Imprime la tabla de tiempos y memoria por etapa (nada si la instrumentación está desactivada)."""
+    if not _state['enabled']:
+        return
+    rows = get_span_summary()
+    if not rows:
+        return
+
+    def _mb(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    width = max(len(row['etapa']) for row in rows)
+    print(f"\n⏱️  INSTRUMENTACIÓN POR ETAPA (ejecución {_state['run_id']})")
+    print("-" * (width + 52))
+    print(f"   {'Etapa':<{width}} {'n':>4} {'Real (s)':>9} {'CPU (s)':>9} {'RSS MB':>8} {'Py MB':>7} {'Err':>4}")
+    for row in rows:
+        print(f"   {row['etapa']:<{width}} {row['n']:>4} {row['wall_s']:>9.2f} {row['cpu_s']:>9.2f} "
+              f"{_mb(row['rss_peak_mb']):>8} {_mb(row['tracemalloc_peak_mb']):>7} {row['errores']:>4}")
+    if _state['file_path']:
+        print(f"📄 Detalle por etapa (líneas JSON): {_state['file_path']}")
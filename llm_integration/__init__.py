@@ -5,12 +5,17 @@ This package provides LLM integration capabilities including:
 - Prompt generation from data tables
 - Configurable YAML-based prompt templates
 - Integration with report generation workflow
+- Concurrent, rate-limited analysis of a report's prompts (async_client)
 """
 
 from .prompt_generator import LLMPromptGenerator, print_prompt_with_separator
+from .async_client import AsyncLLMClient, analyze_report_prompts, run_prompt_analysis
 
 __version__ = "1.0.0"
 __all__ = [
     "LLMPromptGenerator",
-    "print_prompt_with_separator"
+    "print_prompt_with_separator",
+    "AsyncLLMClient",
+    "analyze_report_prompts",
+    "run_prompt_analysis"
 ]
\ No newline at end of file
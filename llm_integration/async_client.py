@@ -0,0 +1,327 @@
+"""
+Cliente asíncrono para analizar los prompts de un reporte en paralelo.
+
+`LLMAPIIntegration.analyze_table` hace una petición bloqueante por prompt. Aquí las
+peticiones HTTP (API de chat de OpenAI, de mensajes de Anthropic o un servidor
+local compatible con OpenAI) se lanzan con asyncio, con:
+    - un límite de peticiones simultáneas (LLM_CONFIG['max_concurrency'])
+    - un token bucket que limita el ritmo (LLM_CONFIG['requests_per_second'], ['burst'])
+    - reintentos con backoff exponencial ante 429, errores 5xx, de red o tiempo agotado
+    - un tiempo máximo de espera del socket por petición (LLM_CONFIG['timeout_seconds'])
+Antes de cada petición se consulta la caché persistente de respuestas (response_cache).
+
+`analyze_report_prompts` recibe los prompts de `ReportDataManager.get_all_prompts()`:
+los de tablas se envían todos a la vez, el resumen de cada sección espera solo a
+las tablas de su sección y el resumen general espera a los de sección. Los
+análisis previos se añaden como contexto al prompt que depende de ellos.
+
+Con LLM_CONFIG['base_url'] se puede apuntar a un servidor local (ver
+benchmarks/bench_llm_async.py, que levanta uno de prueba).
+"""
+
+import asyncio
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config.settings import LLM_CONFIG
+from llm_integration.llm_api import LLMAPIIntegration
+
+# Endpoints por defecto de cada proveedor ('local' exige LLM_CONFIG['base_url'])
+DEFAULT_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'anthropic': 'https://api.anthropic.com/v1'
+}
+
+SYSTEM_PROMPT = "Eres un experto analista de datos de control de plagas."
+
+
+class TokenBucket:
+    """Limitador de ritmo: `rate` fichas por segundo, hasta `capacity` acumuladas."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Espera hasta que haya una ficha disponible y la consume."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryableError(Exception):
+    """Error transitorio de la API (429, 5xx, red o tiempo agotado)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AsyncLLMClient(LLMAPIIntegration):
+    """Cliente LLM con concurrencia limitada, rate limiting, reintentos y timeout."""
+
+    def __init__(self, config: Optional[Dict] = None):
+        super().__init__()
+        config = {**LLM_CONFIG, **(config or {})}
+        self.enabled = config['enabled']
+        self.provider = config['provider']
+        self.model = config['model']
+        self.max_tokens = config['max_tokens']
+        self.temperature = config['temperature']
+        self.api_key = self._get_api_key()
+
+        self.base_url = (config.get('base_url') or DEFAULT_BASE_URLS.get(self.provider, '')).rstrip('/')
+        self.max_concurrency = max(int(config.get('max_concurrency', 4)), 1)
+        self.requests_per_second = float(config.get('requests_per_second', 0) or 0)
+        self.burst = config.get('burst', self.max_concurrency)
+        self.max_retries = int(config.get('max_retries', 3))
+        self.backoff_seconds = float(config.get('backoff_seconds', 1.0))
+        self.timeout_seconds = float(config.get('timeout_seconds', 60))
+
+        # Las peticiones HTTP (bloqueantes) corren en hilos propios, uno por petición simultánea.
+        # El tiempo agotado lo aplica el socket (timeout de urlopen): así el hilo queda libre
+        # cuando la petición vence y los reintentos no esperan en la cola del executor
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix='llm-http')
+        self._loop = None
+        self._semaphore = None
+        self._bucket = None
+        self.stats = {'requests': 0, 'cached': 0, 'retries': 0, 'failures': 0}
+
+    def is_available(self) -> bool:
+        """Un servidor local no necesita clave API, solo `base_url`."""
+        if self.provider == 'local':
+            return self.enabled and bool(self.base_url)
+        return super().is_available()
+
+    def close(self):
+        """Libera los hilos de las peticiones HTTP."""
+        self._executor.shutdown(wait=False)
+
+    def _limits(self):
+        # El semáforo y el token bucket pertenecen al event loop en el que se usan
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.requests_per_second, self.burst)
+        return self._semaphore, self._bucket
+
+    def _build_request(self, prompt: str) -> urllib.request.Request:
+        """Petición HTTP según el formato del proveedor."""
+        headers = {'Content-Type': 'application/json'}
+        if self.provider == 'anthropic':
+            url = f"{self.base_url}/messages"
+            headers.update({'x-api-key': self.api_key or '', 'anthropic-version': '2023-06-01'})
+            body = {
+                'model': self.model,
+                'max_tokens': self.max_tokens,
+                'temperature': self.temperature,
+                'system': SYSTEM_PROMPT,
+                'messages': [{'role': 'user', 'content': prompt}]
+            }
+        else:
+            # OpenAI y servidores locales compatibles con su API de chat
+            url = f"{self.base_url}/chat/completions"
+            if self.api_key:
+                headers['Authorization'] = f"Bearer {self.api_key}"
+            body = {
+                'model': self.model,
+                'max_tokens': self.max_tokens,
+                'temperature': self.temperature,
+                'messages': [
+                    {'role': 'system', 'content': SYSTEM_PROMPT},
+                    {'role': 'user', 'content': prompt}
+                ]
+            }
+        return urllib.request.Request(url, data=json.dumps(body).encode('utf-8'),
+                                      headers=headers, method='POST')
+
+    def _parse_response(self, payload: Dict) -> str:
+        if self.provider == 'anthropic':
+            return payload['content'][0]['text'].strip()
+        return payload['choices'][0]['message']['content'].strip()
+
+    def _post(self, prompt: str) -> str:
+        """Petición bloqueante (corre en un hilo del executor)."""
+        request = self._build_request(prompt)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+                payload = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get('Retry-After') if e.headers else None
+                try:
+                    retry_after = float(retry_after) if retry_after is not None else None
+                except ValueError:
+                    retry_after = None
+                raise RetryableError(f"HTTP {e.code}", retry_after)
+            raise
+        except TimeoutError:
+            raise RetryableError(f"tiempo agotado ({self.timeout_seconds:g}s)")
+        except (urllib.error.URLError, ConnectionError) as e:
+            raise RetryableError(str(e))
+        return self._parse_response(payload)
+
+    async def complete(self, prompt: str) -> Optional[str]:
+        """
+        Envía un prompt respetando los límites configurados.
+
+        Returns:
+            Optional[str]: Texto generado, o None si el LLM no está disponible o
+            la petición falló después de todos los reintentos
+        """
+        if not self.is_available():
+            return None
+        cached = self.get_cached_response(prompt)
+        if cached is not None:
+            self.stats['cached'] += 1
+            return cached
+        semaphore, bucket = self._limits()
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with semaphore:
+                await bucket.acquire()
+                self.stats['requests'] += 1
+                try:
+                    response = await loop.run_in_executor(self._executor, self._post, prompt)
+                    self.store_response(prompt, response)
+                    return response
+                except RetryableError as e:
+                    error, retry_after = str(e), e.retry_after
+                except Exception as e:
+                    print(f"❌ Error en API {self.provider}: {e}")
+                    self.stats['failures'] += 1
+                    return None
+
+            if attempt == self.max_retries:
+                break
+            # Backoff exponencial con un poco de azar (fuera del semáforo para no bloquear a otros)
+            delay = self.backoff_seconds * (2 ** attempt)
+            delay = max(delay + random.uniform(0, delay * 0.1), retry_after or 0)
+            self.stats['retries'] += 1
+            print(f"⚠️  LLM {error}; reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        print(f"❌ Error en API {self.provider}: {error} tras {self.max_retries} reintentos")
+        self.stats['failures'] += 1
+        return None
+
+    async def analyze_async(self, prompt: str) -> str:
+        """Versión asíncrona de `analyze_table`: análisis o texto de fallback."""
+        result = await self.complete(prompt)
+        return result if result is not None else self._fallback_analysis(prompt)
+
+
+def _with_context(prompt: str, heading: str, analyses: List[tuple]) -> str:
+    """Añade al prompt los análisis de los que depende (se omiten los fallidos)."""
+    lines = [f"- {title}: {text}" for title, text in analyses if text]
+    if not lines:
+        return prompt
+    return f"{prompt}\n\n{heading}:\n" + "\n".join(lines)
+
+
+async def analyze_report_prompts(prompts: Dict, client: Optional[AsyncLLMClient] = None) -> Dict[str, str]:
+    """
+    Analiza los prompts de un reporte respetando sus dependencias.
+
+    Args:
+        prompts: Prompts de `ReportDataManager.get_all_prompts()`
+        client: Cliente a usar (por defecto uno nuevo con LLM_CONFIG)
+
+    Returns:
+        Dict[str, str]: Análisis por id de prompt (id de la tabla, 'section_<sección>'
+        y 'general', los mismos de `ReportDataManager.update_prompt`)
+    """
+    client = client or AsyncLLMClient()
+
+    # Todas las tablas a la vez; el semáforo y el token bucket regulan el envío
+    table_tasks = {
+        prompt_data['id']: asyncio.create_task(client.complete(prompt_data['prompt']))
+        for prompt_data in prompts.get('table_prompts', [])
+    }
+
+    async def analyze_section(section: str, prompt_data: Dict) -> Optional[str]:
+        deps = [p for p in prompts.get('table_prompts', []) if p['section'] == section]
+        results = await asyncio.gather(*(table_tasks[p['id']] for p in deps))
+        prompt = _with_context(prompt_data['prompt'], "ANÁLISIS PREVIOS DE LAS TABLAS DE LA SECCIÓN",
+                               [(p['title'], text) for p, text in zip(deps, results)])
+        return await client.complete(prompt)
+
+    section_tasks = {
+        section: asyncio.create_task(analyze_section(section, prompt_data))
+        for section, prompt_data in prompts.get('section_prompts', {}).items()
+    }
+
+    general_task = None
+    general_data = prompts.get('general_prompt')
+    if general_data:
+        async def analyze_general() -> Optional[str]:
+            results = await asyncio.gather(*section_tasks.values())
+            titles = [prompts['section_prompts'][section]['title'] for section in section_tasks]
+            prompt = _with_context(general_data['prompt'], "RESÚMENES PREVIOS POR SECCIÓN",
+                                   list(zip(titles, results)))
+            return await client.complete(prompt)
+        general_task = asyncio.create_task(analyze_general())
+
+    analyses = {}
+    for prompt_id, task in table_tasks.items():
+        analyses[prompt_id] = await task
+    for section, task in section_tasks.items():
+        analyses[f"section_{section}"] = await task
+    if general_task is not None:
+        analyses['general'] = await general_task
+
+    # Los prompts sin respuesta reciben el mismo texto de fallback que el cliente síncrono
+    return {
+        prompt_id: text if text is not None else client._fallback_analysis('')
+        for prompt_id, text in analyses.items()
+    }
+
+
+def run_prompt_analysis(prompts: Dict, client: Optional[AsyncLLMClient] = None) -> Dict[str, str]:
+    """
+    Función de conveniencia (síncrona) para `analyze_report_prompts`.
+
+    No se puede llamar con un event loop en marcha (notebooks, código asíncrono):
+    ahí se usa `await analyze_report_prompts(prompts, client)`.
+
+    Args:
+        prompts: Prompts de `ReportDataManager.get_all_prompts()`
+        client: Cliente a usar (por defecto uno nuevo con LLM_CONFIG)
+
+    Returns:
+        Dict[str, str]: Análisis por id de prompt
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("run_prompt_analysis no se puede usar con un event loop en marcha; "
+                           "usa 'await analyze_report_prompts(prompts, client)'")
+    owns_client = client is None
+    client = client or AsyncLLMClient()
+    try:
+        return asyncio.run(analyze_report_prompts(prompts, client))
+    finally:
+        if owns_client:
+            client.close()
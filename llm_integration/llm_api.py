@@ -21,6 +21,11 @@ class LLMAPIIntegration:
         # Verificar si hay claves API disponibles
         self.api_key = self._get_api_key()
         
+        # Caché persistente de respuestas (None si está deshabilitada). Se importa aquí
+        # para que `python -m llm_integration.response_cache` no la cargue dos veces.
+        from llm_integration.response_cache import get_response_cache
+        self.response_cache = get_response_cache()
+        
     def _get_api_key(self) -> Optional[str]:
         """Obtiene la clave API según el proveedor configurado."""
         if self.provider == 'openai':
@@ -46,20 +51,41 @@ class LLMAPIIntegration:
         if not self.is_available():
             return self._fallback_analysis(prompt)
         
+        cached = self.get_cached_response(prompt)
+        if cached is not None:
+            return cached
+        
         try:
             if self.provider == 'openai':
-                return self._call_openai(prompt)
+                response = self._call_openai(prompt)
             elif self.provider == 'anthropic':
-                return self._call_anthropic(prompt)
+                response = self._call_anthropic(prompt)
             else:
-                return self._fallback_analysis(prompt)
+                response = None
                 
         except Exception as e:
             print(f"❌ Error llamando a LLM: {e}")
+            response = None
+        
+        if response is None:
             return self._fallback_analysis(prompt)
+        self.store_response(prompt, response)
+        return response
+    
+    def get_cached_response(self, prompt: str) -> Optional[str]:
+        """Respuesta guardada en la caché para este prompt y esta configuración, si existe."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(self.provider, self.model, self.temperature, self.max_tokens, prompt)
+    
+    def store_response(self, prompt: str, response: str):
+        """Guarda en la caché una respuesta real del LLM (nunca el texto de fallback)."""
+        if self.response_cache is not None:
+            self.response_cache.put(self.provider, self.model, self.temperature, self.max_tokens,
+                                    prompt, response)
     
-    def _call_openai(self, prompt: str) -> str:
-        """Llama a la API de OpenAI."""
+    def _call_openai(self, prompt: str) -> Optional[str]:
+        """Llama a la API de OpenAI (None si la llamada falla)."""
         try:
             import openai
             
@@ -79,13 +105,13 @@ class LLMAPIIntegration:
             
         except ImportError:
             print("⚠️  Biblioteca openai no instalada. Instalar con: pip install openai")
-            return self._fallback_analysis(prompt)
+            return None
         except Exception as e:
             print(f"❌ Error en API OpenAI: {e}")
-            return self._fallback_analysis(prompt)
+            return None
     
-    def _call_anthropic(self, prompt: str) -> str:
-        """Llama a la API de Anthropic (Claude)."""
+    def _call_anthropic(self, prompt: str) -> Optional[str]:
+        """Llama a la API de Anthropic (Claude) (None si la llamada falla)."""
         try:
             import anthropic
             
@@ -104,10 +130,10 @@ class LLMAPIIntegration:
             
         except ImportError:
             print("⚠️  Biblioteca anthropic no instalada. Instalar con: pip install anthropic")
-            return self._fallback_analysis(prompt)
+            return None
         except Exception as e:
             print(f"❌ Error en API Anthropic: {e}")
-            return self._fallback_analysis(prompt)
+            return None
     
     def _fallback_analysis(self, prompt: str) -> str:
         """Análisis de fallback cuando no hay LLM disponible."""
@@ -7,7 +7,10 @@ de datos dinámicamente para insertar en las plantillas.
 import pandas as pd
 import yaml
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import PROMPT_CONFIG
+from llm_integration.table_serializer import estimate_tokens, serialize_table
 
 
 class LLMPromptGenerator:
@@ -63,8 +66,10 @@ class LLMPromptGenerator:
             template = self._get_default_table_template()
             description = f"Datos de {table_type} - {table_subtype}"
         
-        # Convertir DataFrame a string para incluir en el prompt
-        table_str = table_data.to_string(index=False)
+        # Serializar la tabla con el presupuesto que deja la plantilla
+        overhead = estimate_tokens(template.format(sede=sede, description=description, table_data=''))
+        budget = PROMPT_CONFIG['table_prompt_max_tokens'] - overhead
+        table_str = serialize_table(table_data, token_budget=budget)
         
         # Reemplazar variables en la plantilla
         prompt = template.format(
@@ -118,8 +123,11 @@ class LLMPromptGenerator:
             # Plantilla por defecto si no existe la configuración
             template = self._get_default_section_template()
         
-        # Crear resumen de todas las tablas de la sección
-        section_data = self._format_section_data(section_tables)
+        # Crear resumen de todas las tablas de la sección, repartiendo el presupuesto entre ellas
+        overhead = estimate_tokens(template.format(sede=sede, section_data=''))
+        section_data = self._format_section_data(
+            section_tables, PROMPT_CONFIG['section_prompt_max_tokens'] - overhead
+        )
         
         # Reemplazar variables en la plantilla
         prompt = template.format(
@@ -129,12 +137,16 @@ class LLMPromptGenerator:
         
         return prompt.strip()
     
-    def _format_section_data(self, section_tables: Dict[str, pd.DataFrame]) -> str:
+    def _format_section_data(self, section_tables: Dict[str, pd.DataFrame],
+                             token_budget: Optional[int] = None) -> str:
         """Formatea los datos de una sección para incluir en el prompt."""
         section_data = ""
+        table_budget = token_budget // max(len(section_tables), 1) if token_budget is not None else None
         for table_name, table_data in section_tables.items():
-            section_data += f"\n--- {table_name.upper()} ---\n"
-            section_data += table_data.to_string(index=False)
+            heading = f"\n--- {table_name.upper()} ---\n"
+            section_data += heading
+            budget = table_budget - estimate_tokens(heading) if table_budget is not None else None
+            section_data += serialize_table(table_data, token_budget=budget)
             section_data += "\n"
         return section_data
     
@@ -178,7 +190,10 @@ class LLMPromptGenerator:
             template = self._get_default_general_template()
         
         # Crear un resumen compacto de todos los datos
-        all_data_formatted = self._format_all_data(all_data)
+        overhead = estimate_tokens(template.format(sede=sede, all_data=''))
+        all_data_formatted = self._format_all_data(
+            all_data, PROMPT_CONFIG['general_prompt_max_tokens'] - overhead
+        )
         
         # Reemplazar variables en la plantilla
         prompt = template.format(
@@ -188,9 +203,12 @@ class LLMPromptGenerator:
         
         return prompt.strip()
     
-    def _format_all_data(self, all_data: Dict[str, Dict[str, pd.DataFrame]]) -> str:
+    def _format_all_data(self, all_data: Dict[str, Dict[str, pd.DataFrame]],
+                         token_budget: Optional[int] = None) -> str:
         """Formatea todos los datos para el resumen general."""
         data_summary = ""
+        n_tables = sum(len(section_tables) for section_tables in all_data.values())
+        table_budget = token_budget // max(n_tables, 1) if token_budget is not None else None
         section_names = {
             'preventivos': 'SERVICIOS PREVENTIVOS',
             'roedores': 'CONTROL DE ROEDORES', 
@@ -203,13 +221,13 @@ class LLMPromptGenerator:
             for table_name, table_data in section_tables.items():
                 # Solo incluir un resumen de cada tabla para no sobrecargar el prompt
                 if not table_data.empty:
-                    data_summary += f"\n{table_name}:\n"
-                    # Incluir solo las primeras y últimas filas para un resumen
-                    if len(table_data) > 4:
-                        summary_data = pd.concat([table_data.head(2), table_data.tail(2)])
-                    else:
-                        summary_data = table_data
-                    data_summary += summary_data.to_string(index=False)
+                    heading = f"\n{table_name}:\n"
+                    data_summary += heading
+                    # Solo los meses más recientes textuales; los anteriores resumidos
+                    budget = table_budget - estimate_tokens(heading) if table_budget is not None else None
+                    data_summary += serialize_table(
+                        table_data, max_rows=PROMPT_CONFIG['general_recent_months'], token_budget=budget
+                    )
                     data_summary += "\n"
         
         return data_summary
@@ -0,0 +1,256 @@
+"""
+Caché persistente (SQLite) de las respuestas del LLM.
+
+Los prompts de los meses históricos se regeneran idénticos en cada ejecución, así
+que su respuesta se guarda en disco con una clave derivada del proveedor, el
+modelo, la temperatura, el máximo de tokens y el SHA-256 del prompt. Las entradas
+vencen a los LLM_CACHE_CONFIG['ttl_days'] días y, si la base supera
+LLM_CACHE_CONFIG['max_size_mb'], se eliminan las usadas hace más tiempo (LRU).
+
+Inspección desde la línea de comandos:
+    python -m llm_integration.response_cache stats
+    python -m llm_integration.response_cache list --limit 20
+    python -m llm_integration.response_cache show <clave>
+    python -m llm_integration.response_cache purge    # elimina las entradas vencidas
+    python -m llm_integration.response_cache clear    # vacía la caché
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import LLM_CACHE_CONFIG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    temperature REAL,
+    max_tokens INTEGER,
+    prompt_sha256 TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def prompt_sha256(prompt: str) -> str:
+    """SHA-256 del texto del prompt."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def response_cache_key(provider: str, model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+    """Clave de una respuesta: parámetros de la llamada + hash del prompt."""
+    parts = [provider, model, repr(float(temperature)), str(max_tokens), prompt_sha256(prompt)]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Caché de respuestas del LLM en una base SQLite (segura entre hilos y procesos)."""
+
+    def __init__(self, path: Optional[str] = None, ttl_days: Optional[float] = None,
+                 max_size_mb: Optional[float] = None):
+        self.path = path or LLM_CACHE_CONFIG['path']
+        ttl_days = LLM_CACHE_CONFIG['ttl_days'] if ttl_days is None else ttl_days
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        max_size_mb = LLM_CACHE_CONFIG['max_size_mb'] if max_size_mb is None else max_size_mb
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Una conexión por operación: el cliente asíncrono usa la caché desde varios hilos
+        if not self._initialized:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Conexión en una transacción (commit al salir) que se cierra siempre."""
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, provider: str, model: str, temperature: float, max_tokens: int, prompt: str) -> Optional[str]:
+        """Respuesta guardada para el prompt, o None si no existe o venció."""
+        key = response_cache_key(provider, model, temperature, max_tokens, prompt)
+        now = time.time()
+        try:
+            with self._transaction() as connection:
+                row = connection.execute('SELECT response, created_at FROM responses WHERE key = ?',
+                                         (key,)).fetchone()
+                if row is None:
+                    return None
+                if self._expired(row[1], now):
+                    connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    return None
+                connection.execute('UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?',
+                                   (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"⚠️  No se pudo leer la caché de respuestas LLM: {e}")
+            return None
+
+    def put(self, provider: str, model: str, temperature: float, max_tokens: int, prompt: str, response: str):
+        """Guarda una respuesta y aplica la expiración y el límite de tamaño."""
+        key = response_cache_key(provider, model, temperature, max_tokens, prompt)
+        now = time.time()
+        try:
+            with self._transaction() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO responses '
+                    '(key, provider, model, temperature, max_tokens, prompt_sha256, response, size, '
+                    ' created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                    (key, provider, model, temperature, max_tokens, prompt_sha256(prompt), response,
+                     len(response.encode('utf-8')), now, now)
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            print(f"⚠️  No se pudo escribir la caché de respuestas LLM: {e}")
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        """Elimina las entradas vencidas y luego las menos usadas hasta caber en `max_bytes`."""
+        if self.ttl_seconds is not None:
+            connection.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+        if self.max_bytes is None:
+            return
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in connection.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    def purge_expired(self) -> int:
+        """Elimina las entradas vencidas. Retorna cuántas se eliminaron."""
+        if self.ttl_seconds is None:
+            return 0
+        with self._transaction() as connection:
+            cursor = connection.execute('DELETE FROM responses WHERE created_at < ?',
+                                        (time.time() - self.ttl_seconds,))
+            return cursor.rowcount
+
+    def clear(self) -> int:
+        """Vacía la caché. Retorna cuántas entradas se eliminaron."""
+        with self._transaction() as connection:
+            return connection.execute('DELETE FROM responses').rowcount
+
+    def stats(self) -> Dict:
+        """Resumen de la caché: entradas, tamaño, aciertos y antigüedad."""
+        with self._transaction() as connection:
+            entries, size, hits, oldest, newest = connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), '
+                'MIN(created_at), MAX(created_at) FROM responses'
+            ).fetchone()
+            by_model = connection.execute(
+                'SELECT provider, model, COUNT(*) FROM responses GROUP BY provider, model ORDER BY 3 DESC'
+            ).fetchall()
+        return {'path': self.path, 'entries': entries, 'size_bytes': size, 'hits': hits,
+                'oldest': oldest, 'newest': newest, 'by_model': by_model}
+
+    def entries(self, limit: int = 20) -> List[Dict]:
+        """Las `limit` entradas usadas más recientemente."""
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT key, provider, model, temperature, size, created_at, last_used, hits, '
+                'substr(response, 1, 80) FROM responses ORDER BY last_used DESC LIMIT ?', (limit,)
+            ).fetchall()
+        columns = ['key', 'provider', 'model', 'temperature', 'size', 'created_at', 'last_used', 'hits', 'preview']
+        return [dict(zip(columns, row)) for row in rows]
+
+    def show(self, key_prefix: str) -> Optional[Dict]:
+        """Entrada completa cuya clave empieza por `key_prefix`."""
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT key, provider, model, temperature, max_tokens, prompt_sha256, response, '
+                'created_at, last_used, hits FROM responses WHERE key LIKE ? LIMIT 1', (f"{key_prefix}%",)
+            ).fetchone()
+        if row is None:
+            return None
+        columns = ['key', 'provider', 'model', 'temperature', 'max_tokens', 'prompt_sha256', 'response',
+                   'created_at', 'last_used', 'hits']
+        return dict(zip(columns, row))
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Caché configurada en LLM_CACHE_CONFIG, o None si está deshabilitada."""
+    if not LLM_CACHE_CONFIG.get('enabled', False):
+        return None
+    return LLMResponseCache()
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspección de la caché de respuestas LLM")
+    parser.add_argument('command', choices=['stats', 'list', 'show', 'purge', 'clear'])
+    parser.add_argument('key', nargs='?', help="Clave (o prefijo) para 'show'")
+    parser.add_argument('--limit', type=int, default=20, help="Entradas a mostrar con 'list'")
+    parser.add_argument('--path', default=None, help="Base SQLite (por defecto LLM_CACHE_CONFIG['path'])")
+    args = parser.parse_args()
+
+    cache = LLMResponseCache(path=args.path)
+    if args.command == 'stats':
+        stats = cache.stats()
+        print("📦 CACHÉ DE RESPUESTAS LLM")
+        print("=" * 60)
+        print(f"📁 Base: {stats['path']}")
+        print(f"📊 Entradas: {stats['entries']} ({stats['size_bytes'] / 1024:.1f} KB)")
+        print(f"⚡ Aciertos acumulados: {stats['hits']}")
+        print(f"🕒 Más antigua: {_format_time(stats['oldest'])} | más reciente: {_format_time(stats['newest'])}")
+        for provider, model, count in stats['by_model']:
+            print(f"   • {provider}/{model}: {count}")
+    elif args.command == 'list':
+        for entry in cache.entries(args.limit):
+            preview = entry['preview'].replace('\n', ' ')
+            print(f"{entry['key'][:12]}  {entry['provider']}/{entry['model']}  t={entry['temperature']}  "
+                  f"{entry['size']:>6} B  hits={entry['hits']:<3} usado {_format_time(entry['last_used'])}  "
+                  f"{preview}")
+    elif args.command == 'show':
+        if not args.key:
+            parser.error("'show' requiere una clave")
+        entry = cache.show(args.key)
+        if entry is None:
+            print(f"❌ No hay entradas con clave {args.key}")
+            return
+        for field in ['key', 'provider', 'model', 'temperature', 'max_tokens', 'prompt_sha256', 'hits']:
+            print(f"{field}: {entry[field]}")
+        print(f"creada: {_format_time(entry['created_at'])} | usada: {_format_time(entry['last_used'])}")
+        print("-" * 60)
+        print(entry['response'])
+    elif args.command == 'purge':
+        print(f"🧹 Entradas vencidas eliminadas: {cache.purge_expired()}")
+    elif args.command == 'clear':
+        print(f"🗑️  Entradas eliminadas: {cache.clear()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Serialización compacta de tablas para los prompts, con presupuesto de tokens.
+
+`DataFrame.to_string()` alinea columnas con espacios y crece con cada mes que se
+acumula. Aquí las tablas se escriben como CSV o markdown compactos y:
+    - las tablas mensuales (primera columna 'Mes', en orden cronológico) conservan
+      textuales los últimos N meses (PROMPT_CONFIG['max_table_rows_display']) y los
+      meses anteriores se resumen en dos filas: total y promedio mensual
+    - las demás tablas se escriben completas si caben en el presupuesto de tokens (sin
+      presupuesto, hasta N filas); si no, se conservan las primeras filas que quepan y una
+      línea aparte, después de la tabla, indica cuántas se omitieron
+    - si se indica un presupuesto de tokens, N se reduce hasta que la tabla quepa
+
+Los tokens se estiman con la regla de ~4 caracteres por token (no depende del tokenizador
+del proveedor; sirve para acotar el tamaño, no para facturar).
+"""
+
+import math
+from typing import Callable, Optional
+
+import pandas as pd
+
+from config.settings import PROMPT_CONFIG
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens estimados de un texto (~4 caracteres por token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.1f}" if not value.is_integer() else str(int(value))
+    return '' if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+
+def _quote(text: str) -> str:
+    if any(char in text for char in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _to_csv(table: pd.DataFrame) -> str:
+    lines = [','.join(_quote(str(column)) for column in table.columns)]
+    lines.extend(','.join(_quote(_format_value(value)) for value in row)
+                 for row in table.itertuples(index=False, name=None))
+    return '\n'.join(lines)
+
+
+def _to_markdown(table: pd.DataFrame) -> str:
+    lines = ['| ' + ' | '.join(str(column) for column in table.columns) + ' |',
+             '|' + '---|' * len(table.columns)]
+    lines.extend('| ' + ' | '.join(_format_value(value).replace('|', '/') for value in row) + ' |'
+                 for row in table.itertuples(index=False, name=None))
+    return '\n'.join(lines)
+
+
+def _is_monthly(table: pd.DataFrame) -> bool:
+    return len(table.columns) > 0 and table.columns[0] == 'Mes'
+
+
+def summarize_older_months(table: pd.DataFrame, keep_months: int) -> pd.DataFrame:
+    """
+    Conserva los últimos `keep_months` meses y resume los anteriores en dos filas.
+
+    Las filas de resumen llevan en 'Mes' el rango resumido; las columnas numéricas
+    tienen el total y el promedio mensual del rango, las demás quedan vacías.
+    """
+    keep_months = max(keep_months, 1)
+    if len(table) <= keep_months:
+        return table
+    older, recent = table.iloc[:-keep_months], table.iloc[-keep_months:]
+    numeric = older.select_dtypes('number').columns
+    period = f"{older['Mes'].iloc[0]} a {older['Mes'].iloc[-1]} ({len(older)} meses)"
+
+    total = {column: '' for column in table.columns}
+    mean = dict(total)
+    total['Mes'] = f"{period} total"
+    mean['Mes'] = f"{period} promedio"
+    for column in numeric:
+        total[column] = older[column].sum()
+        mean[column] = round(float(older[column].mean()), 1)
+    summary = pd.DataFrame([total, mean], columns=table.columns)
+    return pd.concat([summary.astype(object), recent.astype(object)], ignore_index=True)
+
+
+def _truncate_rows(table: pd.DataFrame, rows: int, writer: Callable[[pd.DataFrame], str]) -> str:
+    """Primeras `rows` filas; las omitidas se indican en una línea aparte, fuera del cuerpo de la tabla."""
+    rows = max(rows, 1)
+    if len(table) <= rows:
+        return writer(table)
+    return f"{writer(table.head(rows))}\n... ({len(table) - rows} filas más, omitidas)"
+
+
+def serialize_table(table: pd.DataFrame, max_rows: Optional[int] = None,
+                    token_budget: Optional[int] = None, fmt: Optional[str] = None) -> str:
+    """
+    Serializa una tabla para un prompt.
+
+    Args:
+        table: Tabla a serializar
+        max_rows: Meses a conservar textuales (o filas, en tablas no mensuales sin
+            presupuesto); por defecto PROMPT_CONFIG['max_table_rows_display']
+        token_budget: Tokens máximos de la tabla serializada (opcional). Si no cabe
+            se reducen las filas textuales; con una sola fila se devuelve aunque exceda.
+            Las tablas no mensuales que caben se escriben completas.
+        fmt: 'csv' o 'markdown'; por defecto PROMPT_CONFIG['table_format']
+
+    Returns:
+        str: Tabla serializada
+    """
+    if table.empty:
+        return "(sin datos)"
+    max_rows = max_rows or PROMPT_CONFIG.get('max_table_rows_display', 20)
+    writer = _to_markdown if (fmt or PROMPT_CONFIG.get('table_format', 'csv')) == 'markdown' else _to_csv
+    if _is_monthly(table):
+        def reduce(rows: int) -> str:
+            return writer(summarize_older_months(table, rows))
+        rows = min(max_rows, len(table))
+    else:
+        def reduce(rows: int) -> str:
+            return _truncate_rows(table, rows, writer)
+        # Sin filas de resumen, las filas solo se omiten si la tabla no cabe en el presupuesto
+        rows = len(table) if token_budget is not None else min(max_rows, len(table))
+
+    text = reduce(rows)
+    while token_budget is not None and rows > 1 and estimate_tokens(text) > token_budget:
+        rows -= 1
+        text = reduce(rows)
+    return text
@@ -1,85 +1,207 @@
-from data_processing.data_loader import load_data_with_fallback
+import argparse
+from functools import partial
+
+from data_processing.concurrent_loader import EXECUTORS, load_concurrently
+from data_processing.data_loader import load_data_with_fallback, transformed_frame_key
 from data_processing.data_cleaner import (
     transform_preventivos_df, 
     transform_roedores_df, 
     transform_lamparas_df
 )
-from reports.report_builder import generate_enhanced_report
-from reports.hospital_san_vicente_generator import generate_hospital_san_vicente_report
+from data_processing.monthly_aggregates import build_monthly_cubes
+from data_processing.sede_partitions import build_sede_partitions
+from data_processing.kobo_sync import sync_kobo_export
+from data_processing.streaming import load_streaming_with_fallback
+from data_processing.history_store import refresh_history
+from data_processing.report_periods import RANGE_KINDS, resolve_period
+from pipeline_cache import build_report_graph, load_stage_data, restore_cached_reports, store_report_result
+from reports.report_jobs import REPORT_KINDS, run_report_job, run_report_jobs
 from system_cleaner import perform_system_cleanup
-from config.settings import API_URLS, LOCAL_FILES, SEDES
+from instrumentation import enable_instrumentation, print_span_summary, span
+from config.settings import (
+    API_URLS, HISTORY_CONFIG, LOCAL_FILES, LOGGING_CONFIG, PIPELINE_CACHE_CONFIG, RENDER_PROFILES,
+    REPORT_RANGE_CONFIG, SEDES, STREAMING_CONFIG, SYNC_CONFIG, SYNC_URLS
+)
 
-def main():
+def main(workers: int = 1, include_figures: bool = True, render_profile: str = None,
+         instrument: bool = None, trace_memory: bool = None, stream: bool = None,
+         load_executor: str = None, stage_cache: bool = None, history: bool = None,
+         report_range: str = None):
     """
     Función principal mejorada para generar reportes de Serviplagas.
     Ahora genera tanto reportes estándar como reportes específicos del Hospital San Vicente.
     Al final realiza limpieza automática del sistema.
+    
+    Args:
+        workers: Procesos para generar los reportes en paralelo (1 = en serie)
+        include_figures: Con False los reportes llevan solo tablas y prompts (no se dibujan gráficas)
+        render_profile: Perfil de las gráficas: 'draft', 'final' o 'vector' (por defecto el de DOCUMENT_CONFIG)
+        instrument: Medir tiempo y memoria de cada etapa en LOGGING_CONFIG['file_path']
+            (por defecto LOGGING_CONFIG['instrumentation'])
+        trace_memory: Medir también el pico de memoria de Python con tracemalloc
+            (por defecto LOGGING_CONFIG['trace_memory'])
+        stream: Leer y transformar las exportaciones por bloques, acumulando los cubos mensuales
+            durante la lectura (por defecto STREAMING_CONFIG['enabled'])
+        load_executor: Cómo se cargan las tres exportaciones: 'threads', 'processes' o 'serial'
+            (por defecto LOADING_CONFIG['executor'])
+        stage_cache: Reutilizar las etapas (frames, cubos, documentos) cuyas entradas no cambiaron
+            (por defecto PIPELINE_CACHE_CONFIG['enabled'])
+        history: Guardar los registros limpios en el historial particionado por sede / año / mes y
+            generar los reportes desde él: métricas del mes en curso y tendencias de los últimos
+            HISTORY_CONFIG['trend_months'] meses (por defecto HISTORY_CONFIG['enabled'])
+        report_range: Período de los reportes del hospital: 'month', 'quarter', 'cycle', 'ytd',
+            'AAAA-MM' o 'AAAA-MM:AAAA-MM'; los totales salen de las sumas acumuladas de los
+            cubos mensuales (por defecto REPORT_RANGE_CONFIG['default']: mes en curso con toda la historia)
     """
+    if stream is None:
+        stream = STREAMING_CONFIG['enabled']
+    if stage_cache is None:
+        stage_cache = PIPELINE_CACHE_CONFIG.get('enabled', False)
+    if history is None:
+        history = HISTORY_CONFIG.get('enabled', False)
+    if report_range is None:
+        report_range = REPORT_RANGE_CONFIG.get('default')
+    period = resolve_period(report_range) if report_range else None
+    if instrument is None:
+        instrument = LOGGING_CONFIG.get('instrumentation', False)
+    if instrument:
+        enable_instrumentation(trace_memory=trace_memory)
+    
     print("🏥 SISTEMA DE REPORTES SERVIPLAGAS - HOSPITAL SAN VICENTE")
     print("=" * 65)
     print("📋 Generando reportes automatizados con plantilla oficial")
+    if period is not None:
+        print(f"🗓️  Período de los reportes del hospital: {period.slug}")
     print("=" * 65)
     
     # Cargar y transformar datos con fallback
     print("\n📊 CARGA DE DATOS")
     print("-" * 30)
     
-    df_preventivo = transform_preventivos_df(
-        load_data_with_fallback(LOCAL_FILES['preventivos'], API_URLS['preventivos'])
-    )
+    # Sincronización incremental opcional (solo envíos nuevos) antes de cargar
+    sync_urls = SYNC_URLS if SYNC_CONFIG['enabled'] else {}
     
-    df_roedores = transform_roedores_df(
-        load_data_with_fallback(LOCAL_FILES['roedores'], API_URLS['roedores'])
-    )
+    transforms = {
+        'preventivos': transform_preventivos_df,
+        'roedores': transform_roedores_df,
+        'lamparas': transform_lamparas_df,
+    }
+    jobs = [(kind, sede) for kind in REPORT_KINDS for sede in SEDES]
     
-    df_lamparas = transform_lamparas_df(
-        load_data_with_fallback(LOCAL_FILES['lamparas'], API_URLS['lamparas'])
-    )
-
-    print("✅ Datos cargados y transformados exitosamente")
+    # Con la caché por etapas, las claves se calculan sobre los CSV ya sincronizados
+    # y los documentos cuyas entradas no cambiaron se restauran sin cargar datos
+    graph = None
+    cached_results = {}
+    if stage_cache:
+        for name, sync_url in sync_urls.items():
+            try:
+                with span('sincronizacion', dataset=name):
+                    sync_kobo_export(LOCAL_FILES[name], sync_url)
+            except Exception as e:
+                print(f"⚠️  Sincronización incremental fallida: {e}")
+        sync_urls = {}
+        graph = build_report_graph(jobs, transforms, include_figures, render_profile, stream, history, period)
+        cached_results = restore_cached_reports(graph, jobs)
+    pending_jobs = [job for job in jobs if job not in cached_results]
+    
+    if pending_jobs:
+        # Las tres exportaciones se cargan en paralelo; cada una se transforma apenas está lista.
+        # Con --stream cada exportación se lee por bloques y su cubo mensual se acumula durante la lectura
+        if stream:
+            tasks = {name: partial(load_streaming_with_fallback, LOCAL_FILES[name], API_URLS[name], transform,
+                                   schema=name, sync_url=sync_urls.get(name))
+                     for name, transform in transforms.items()}
+        else:
+            tasks = {name: partial(load_data_with_fallback, LOCAL_FILES[name], API_URLS[name], transform=transform,
+                                   sync_url=sync_urls.get(name), schema=name)
+                     for name, transform in transforms.items()}
+        
+        if graph is not None:
+            # Solo se cargan los datasets cuya transformación no está en la caché por etapas
+            loaded, cubes = load_stage_data(graph, tasks, executor=load_executor, stream=stream)
+        else:
+            loaded = load_concurrently(tasks, executor=load_executor)
+            streamed_cubes = {}
+            if stream:
+                streamed_cubes = {name: cube for name, (_, cube) in loaded.items()}
+                loaded = {name: df for name, (df, _) in loaded.items()}
+        df_preventivo = loaded['preventivos']
+        df_roedores = loaded['roedores']
+        df_lamparas = loaded['lamparas']
+        
+        print("✅ Datos cargados y transformados exitosamente")
+        
+        # Con el historial, los registros se guardan por (sede, año, mes) y los reportes usan
+        # solo las particiones de la ventana de tendencias (los meses cerrados quedan congelados)
+        if history:
+            with span('historial'):
+                windowed = refresh_history(
+                    {'preventivos': df_preventivo, 'roedores': df_roedores, 'lamparas': df_lamparas},
+                    {name: transformed_frame_key(transform, name) for name, transform in transforms.items()},
+                    SEDES
+                )
+            df_preventivo = windowed['preventivos']
+            df_roedores = windowed['roedores']
+            df_lamparas = windowed['lamparas']
+        
+        # Cada dataset se agrupa por sede una sola vez: los reportes toman la parte de su
+        # sede como vista sin copia (los frames completos conservan su orden)
+        with span('particiones'):
+            partitions = build_sede_partitions(df_preventivo, df_roedores, df_lamparas)
+        
+        # Agregados mensuales por (sede, mes, métrica): un solo groupby por dataset,
+        # compartido por todas las gráficas de todos los reportes (con la caché por
+        # etapas ya vienen de load_stage_data; con el historial se agrega solo la ventana)
+        if history:
+            with span('cubos'):
+                cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
+        elif graph is None:
+            if stream:
+                cubes = streamed_cubes
+            else:
+                with span('cubos'):
+                    cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
+    else:
+        print("♻️  Todos los reportes vienen de la caché por etapas: no se cargan los datos")
+    
+    # Con --workers > 1 los trabajos (tipo de reporte, sede) se generan en un pool de procesos;
+    # los resultados se muestran después, en el mismo orden que la ejecución en serie
+    parallel_results = {}
+    if workers > 1 and len(pending_jobs) > 1:
+        with span('reportes_en_paralelo', workers=workers):
+            results = run_report_jobs(pending_jobs, df_preventivo, df_roedores, df_lamparas, workers, cubes=cubes,
+                                      include_figures=include_figures, render_profile=render_profile,
+                                      history=history, period=period)
+        for result in results:
+            parallel_results[(result['kind'], result['sede'])] = result
+    
+    def _report_paths(kind: str) -> list:
+        paths = []
+        for sede in SEDES:
+            result = cached_results.get((kind, sede))
+            if result is None:
+                result = parallel_results.get((kind, sede))
+                if result is None:
+                    result = run_report_job(kind, sede, df_preventivo, df_roedores, df_lamparas, cubes=cubes,
+                                            partitions=partitions, include_figures=include_figures,
+                                            render_profile=render_profile, history=history,
+                                            period=period)
+                if graph is not None:
+                    store_report_result(graph, result)
+            print(result['log'], end='')
+            if result['path']:
+                paths.append(result['path'])
+        return paths
     
     # Generar reportes mejorados para Hospital San Vicente
     print("\n🏥 GENERACIÓN DE REPORTES HOSPITAL SAN VICENTE")
     print("-" * 50)
-    
-    hospital_reports = []
-    for sede in SEDES:
-        print(f"\n🏢 Procesando sede: {sede}")
-        try:
-            # Generar reporte específico del Hospital San Vicente
-            hospital_report_path = generate_hospital_san_vicente_report(
-                df_preventivo, df_roedores, df_lamparas, sede
-            )
-            hospital_reports.append(hospital_report_path)
-            
-        except Exception as e:
-            print(f"❌ Error generando reporte para {sede}: {e}")
-            continue
+    hospital_reports = _report_paths('hospital')
     
     # También generar reportes estándar con prompts LLM (para comparación)
     print("\n📊 GENERACIÓN DE REPORTES ESTÁNDAR CON LLM")
     print("-" * 50)
-    
-    standard_reports = []
-    for sede in SEDES:
-        print(f"\n🔧 Procesando sede estándar: {sede}")
-        try:
-            report_path, data_manager = generate_enhanced_report(
-                df_preventivo, df_roedores, df_lamparas, sede=sede
-            )
-            standard_reports.append(report_path)
-            
-            # Mostrar resumen de prompts generados
-            all_prompts = data_manager.get_all_prompts()
-            table_count = len(all_prompts['table_prompts'])
-            section_count = len(all_prompts['section_prompts'])
-            general_count = 1 if all_prompts['general_prompt'] else 0
-            
-            print(f"   📊 Prompts LLM: {table_count} tablas, {section_count} secciones, {general_count} general")
-            
-        except Exception as e:
-            print(f"❌ Error generando reporte estándar para {sede}: {e}")
-            continue
+    standard_reports = _report_paths('estandar')
     
     # Resumen final
     print("\n" + "=" * 65)
@@ -94,6 +216,9 @@ def main():
     print(f"\n   🔧 Reportes Estándar LLM: {len(standard_reports)} reportes")  
     for report in standard_reports:
         print(f"      📄 {report}")
+    
+    if graph is not None:
+        graph.print_summary()
         
     print(f"\n💡 Los reportes del Hospital San Vicente están listos para producción.")
     print(f"📁 Los archivos están disponibles en la carpeta 'outputs/'")
@@ -103,17 +228,50 @@ def main():
     print("-" * 40)
     
     try:
-        cleanup_summary = perform_system_cleanup(create_backup=True)
+        with span('limpieza'):
+            cleanup_summary = perform_system_cleanup(create_backup=True)
         print(f"✅ Limpieza completada. Archivos eliminados: {len(cleanup_summary['files_removed'])}")
         print(f"📦 Backup disponible: {cleanup_summary.get('backup_created', 'No creado')}")
     except Exception as e:
         print(f"⚠️  Error durante la limpieza: {e}")
         print(f"💡 El sistema continúa funcionando normalmente")
     
+    print_span_summary()
+    
     print(f"\n🚀 SISTEMA LISTO PARA PRODUCCIÓN")
     
     return hospital_reports, standard_reports
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sistema de reportes Serviplagas")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Procesos para generar los reportes (sede, tipo) en paralelo (por defecto: 1, en serie)")
+    parser.add_argument('--tables-only', action='store_true',
+                        help="Generar los reportes solo con tablas y prompts, sin dibujar las gráficas "
+                             "(se guardan con el sufijo _tablas y no reemplazan los reportes con gráficas)")
+    parser.add_argument('--render-profile', choices=sorted(RENDER_PROFILES),
+                        help="Perfil de las gráficas: draft (96 dpi), final (300 dpi) o vector (SVG + PNG de respaldo)")
+    parser.add_argument('--instrument', action='store_true', default=None,
+                        help="Registrar tiempo real, CPU y memoria de cada etapa y sede (líneas JSON en LOGGING_CONFIG['file_path'])")
+    parser.add_argument('--trace-memory', action='store_true', default=None,
+                        help="Con --instrument, medir también el pico de memoria de Python con tracemalloc (más lento)")
+    parser.add_argument('--stream', action='store_true', default=None,
+                        help="Leer y transformar las exportaciones por bloques (STREAMING_CONFIG['chunksize'] filas) "
+                             "para acotar la memoria con historias de varios años")
+    parser.add_argument('--load-executor', choices=EXECUTORS,
+                        help="Carga de las exportaciones: threads (por defecto), processes o serial")
+    parser.add_argument('--no-stage-cache', dest='stage_cache', action='store_false', default=None,
+                        help="Recalcular todas las etapas (carga, transformación, agregados y documentos) "
+                             "sin usar la caché por etapas")
+    parser.add_argument('--history', action='store_true', default=None,
+                        help="Guardar los registros limpios en el historial Parquet (sede / año / mes, meses cerrados "
+                             "congelados) y generar los reportes leyendo solo las particiones necesarias")
+    parser.add_argument('--range', dest='report_range', metavar='PERIODO',
+                        help=f"Reportes del hospital para un rango de meses: {', '.join(RANGE_KINDS)} "
+                             "(mes, trimestre, ciclo de contrato y año hasta la fecha), AAAA-MM o AAAA-MM:AAAA-MM")
+    args = parser.parse_args()
+    main(workers=args.workers, include_figures=not args.tables_only, render_profile=args.render_profile,
+         instrument=args.instrument, trace_memory=args.trace_memory, stream=args.stream,
+         load_executor=args.load_executor, stage_cache=args.stage_cache, history=args.history,
+         report_range=args.report_range)
\ No newline at end of file
@@ -0,0 +1,452 @@
+"""
+Caché por etapas del pipeline de reportes.
+
+El pipeline se declara como un grafo explícito de etapas:
+
+    carga:<dataset> → transformacion:<dataset> → agregados:<dataset> ─┐
+                                     └───────────────────────────────┴→ documento:<tipo>:<sede>
+                                                          (graficas: caché de render por gráfica)
+
+La clave de cada etapa es un hash de su nombre, la versión de su código, sus
+parámetros y las claves de sus entradas; la de una etapa de carga es el hash del
+contenido del CSV local. Una etapa cuya clave no cambió se lee del almacén
+(PIPELINE_CACHE_CONFIG['directory']) en lugar de recalcularse, y como las claves se
+encadenan, si solo cambió la exportación de Lámparas solo se recalculan las
+etapas que dependen de ella. Las etapas se evalúan bajo demanda: si todos los
+documentos están en caché no se carga ningún dato.
+
+Cada etapa guarda su salida con un formato propio:
+    - 'frame': DataFrame en Feather (como la caché columnar; pickle sin pyarrow)
+    - 'pickle': objetos como los cubos mensuales
+    - 'files': archivos generados (.docx, prompts), que se restauran en su ruta original
+    - None: la etapa no se guarda aquí (la carga ya usa la caché columnar)
+Las gráficas no son una etapa del grafo: cada una ya tiene su caché por contenido
+(visualisations.render_cache) y el resumen solo cuenta sus aciertos.
+Al final `print_summary` muestra qué etapas salieron de la caché.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from config.settings import DOCUMENT_CONFIG, HISTORY_CONFIG, LOCAL_FILES, PIPELINE_CACHE_CONFIG
+from data_processing.columnar_cache import (
+    file_sha256,
+    is_pyarrow_available,
+    read_feather_frame,
+    transform_cache_key,
+    write_feather_frame
+)
+from data_processing.concurrent_loader import load_concurrently
+from data_processing.data_loader import schema_cache_key, transformed_frame_key
+from data_processing.history_store import history_fingerprint
+from data_processing.report_periods import ReportPeriod
+from data_processing.monthly_aggregates import CUBE_INPUTS, build_monthly_cube
+from instrumentation import span
+
+CODECS = ('frame', 'pickle', 'files', None)
+
+# Archivos de código y configuración cuyo contenido forma parte de la versión del código
+CODE_EXTENSIONS = ('.py', '.yaml')
+
+# Estado de cada etapa en el resumen
+STATUS_LABELS = {
+    'hit': '✅ caché',
+    'miss': '🔄 recalculada',
+    'volatile': '⚠️  sin caché',
+    'skipped': '⏭️  no requerida',
+    'unchanged': '= sin cambios',
+    'changed': '✏️  cambió',
+    'new': '🆕 nueva',
+}
+
+
+def code_version(*parts) -> str:
+    """
+    Versión del código de una etapa: hash de funciones (código de su módulo) o de
+    archivos y carpetas (contenido de sus archivos .py / .yaml, o del archivo indicado).
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if callable(part):
+            digest.update(transform_cache_key(part).encode('utf-8'))
+        elif os.path.isdir(part):
+            for root, dirs, files in os.walk(part):
+                dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+                for name in sorted(files):
+                    if name.endswith(CODE_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        digest.update(path.encode('utf-8'))
+                        digest.update(file_sha256(path).encode('utf-8'))
+        elif os.path.exists(part):
+            digest.update(part.encode('utf-8'))
+            digest.update(file_sha256(part).encode('utf-8'))
+        else:
+            digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class Stage:
+    """Una etapa del grafo: entradas, versión del código, parámetros y formato de su salida."""
+
+    def __init__(self, name: str, inputs: Sequence[str] = (), code: str = '', params: Optional[Dict] = None,
+                 codec: Optional[str] = 'pickle', compute: Optional[Callable[..., Any]] = None,
+                 source: Optional[str] = None):
+        if codec not in CODECS:
+            raise ValueError(f"Formato de etapa desconocido: {codec}")
+        self.name = name
+        self.inputs = list(inputs)
+        self.code = code
+        self.params = params or {}
+        self.codec = codec
+        self.compute = compute
+        self.source = source
+
+
+class StageGraph:
+    """
+    Grafo de etapas con almacén por contenido.
+
+    `get(nombre)` devuelve la salida de una etapa: de la caché si su clave ya está
+    guardada y, si no, calculándola a partir de sus entradas (recursivamente) y
+    guardándola. `lookup` y `put` permiten a quien llama calcular la etapa por su
+    cuenta (p. ej. los documentos, que se generan en lote y en paralelo).
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or PIPELINE_CACHE_CONFIG['directory']
+        self.stages: Dict[str, Stage] = {}
+        self.status: Dict[str, str] = {}
+        self.render_stats = {'charts': 0, 'cached': 0}
+        self._keys: Dict[str, Optional[str]] = {}
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._sources = self._read_json(self._sources_path())
+
+    # ----- Declaración y claves -----
+
+    def add(self, name: str, **options) -> Stage:
+        """Declara una etapa (ver Stage); sus entradas deben estar declaradas antes."""
+        stage = Stage(name, **options)
+        missing = [dep for dep in stage.inputs if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Etapa '{name}': entradas no declaradas {missing}")
+        self.stages[name] = stage
+        return stage
+
+    def key(self, name: str) -> Optional[str]:
+        """Clave de una etapa; None si depende de una entrada sin huella (p. ej. una URL)."""
+        if name in self._keys:
+            return self._keys[name]
+        stage = self.stages[name]
+        if stage.source is not None:
+            content = self._source_digest(stage.source)
+            parts = None if content is None else [content]
+        else:
+            input_keys = [self.key(dep) for dep in stage.inputs]
+            parts = None if None in input_keys else input_keys
+        key = None
+        if parts is not None:
+            payload = json.dumps([name, stage.code, stage.params, parts], sort_keys=True, ensure_ascii=False,
+                                 default=str)
+            key = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+        self._keys[name] = key
+        if stage.source is not None:
+            self._record_source(name, key)
+        return key
+
+    def _source_digest(self, path: str) -> Optional[str]:
+        """Hash del contenido de un archivo de entrada (se reutiliza si tamaño y mtime no cambiaron)."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        saved = self._sources.get('files', {}).get(os.path.abspath(path), {})
+        if saved.get('size') == stat.st_size and saved.get('mtime_ns') == stat.st_mtime_ns:
+            return saved['sha256']
+        sha256 = file_sha256(path)
+        self._sources.setdefault('files', {})[os.path.abspath(path)] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256
+        }
+        return sha256
+
+    def _record_source(self, name: str, key: Optional[str]):
+        """Compara la clave de una entrada con la de la ejecución anterior (para el resumen)."""
+        previous = self._sources.setdefault('keys', {}).get(name)
+        if key is None:
+            self.status[name] = 'volatile'
+        elif previous is None:
+            self.status[name] = 'new'
+        else:
+            self.status[name] = 'unchanged' if previous == key else 'changed'
+        self._sources['keys'][name] = key
+        self._write_json(self._sources_path(), self._sources)
+
+    # ----- Almacén -----
+
+    def _sources_path(self) -> str:
+        return os.path.join(self.directory, 'sources.json')
+
+    def _entry_base(self, name: str, key: str) -> str:
+        slug = name.replace(':', '-').replace(os.sep, '_')
+        return os.path.join(self.directory, slug, key)
+
+    @staticmethod
+    def _read_json(path: str) -> Dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path: str, payload: Dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(payload, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+
+    def _load(self, stage: Stage, base: str) -> Any:
+        manifest = self._read_json(f"{base}.json")
+        if not manifest:
+            return None
+        if manifest['codec'] == 'frame':
+            return read_feather_frame(f"{base}.feather", manifest)
+        if manifest['codec'] == 'files':
+            for stored, target in manifest['files']:
+                os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                shutil.copyfile(os.path.join(f"{base}.files", stored), target)
+            return [target for _, target in manifest['files']]
+        with open(f"{base}.pkl", 'rb') as file:
+            return pickle.load(file)
+
+    def _store(self, stage: Stage, base: str, value: Any):
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        manifest = {'stage': stage.name, 'created': datetime.now().isoformat()}
+        if stage.codec == 'frame' and isinstance(value, pd.DataFrame) and is_pyarrow_available():
+            manifest.update(codec='frame', **write_feather_frame(value, f"{base}.feather"))
+        elif stage.codec == 'files':
+            files_dir = f"{base}.files"
+            os.makedirs(files_dir, exist_ok=True)
+            manifest['codec'] = 'files'
+            manifest['files'] = []
+            for index, path in enumerate(value):
+                stored = f"{index}-{os.path.basename(path)}"
+                shutil.copyfile(path, os.path.join(files_dir, stored))
+                manifest['files'].append([stored, path])
+        else:
+            tmp_path = f"{base}.pkl.tmp"
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, f"{base}.pkl")
+            manifest['codec'] = 'pickle'
+        # El manifiesto se escribe al final: una entrada sin manifiesto no se lee nunca
+        self._write_json(f"{base}.json", manifest)
+        self._evict(os.path.dirname(base))
+
+    def _evict(self, directory: str):
+        """Conserva solo las PIPELINE_CACHE_CONFIG['max_entries_per_stage'] entradas más recientes de una etapa."""
+        limit = PIPELINE_CACHE_CONFIG.get('max_entries_per_stage', 3)
+        manifests = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+                           key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in manifests[limit:]:
+            base = entry.path[:-len('.json')]
+            try:
+                os.remove(entry.path)
+                for suffix in ('.feather', '.pkl'):
+                    if os.path.exists(base + suffix):
+                        os.remove(base + suffix)
+                shutil.rmtree(f"{base}.files", ignore_errors=True)
+            except OSError:
+                pass
+
+    # ----- Evaluación -----
+
+    def lookup(self, name: str) -> Any:
+        """Salida guardada de una etapa, o None si su clave no está en la caché."""
+        if name in self._values:
+            return self._values[name]
+        stage = self.stages[name]
+        key = self.key(name)
+        if key is None or stage.codec is None:
+            return None
+        try:
+            value = self._load(stage, self._entry_base(name, key))
+        except Exception as e:
+            print(f"⚠️  Caché de la etapa '{name}' ilegible: {e}")
+            value = None
+        if value is not None:
+            self._values[name] = value
+            self.status[name] = 'hit'
+        return value
+
+    def put(self, name: str, value: Any):
+        """Registra la salida calculada de una etapa y la guarda si tiene clave."""
+        stage = self.stages[name]
+        self._values[name] = value
+        if stage.source is None:
+            self.status[name] = 'miss' if self.key(name) is not None else 'volatile'
+        key = self.key(name)
+        if key is None or stage.codec is None or value is None:
+            return
+        try:
+            self._store(stage, self._entry_base(name, key), value)
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar la etapa '{name}' en la caché: {e}")
+
+    def get(self, name: str) -> Any:
+        """Salida de una etapa: de la caché o calculada a partir de sus entradas."""
+        value = self.lookup(name)
+        if value is not None:
+            return value
+        stage = self.stages[name]
+        if stage.compute is None:
+            raise ValueError(f"La etapa '{name}' no está en caché y no tiene cómo calcularse")
+        value = stage.compute(*[self.get(dep) for dep in stage.inputs])
+        self.put(name, value)
+        return value
+
+    def add_render_stats(self, stats: Dict[str, Dict[str, float]]):
+        """Suma las gráficas dibujadas y las leídas de la caché de render (get_render_stats de un reporte)."""
+        with self._lock:
+            for profile_stats in stats.values():
+                self.render_stats['charts'] += profile_stats.get('charts', 0)
+                self.render_stats['cached'] += profile_stats.get('cached', 0)
+
+    # ----- Resumen -----
+
+    def summary_rows(self) -> List[Dict]:
+        """Una fila por etapa declarada: estado ('hit', 'miss', ...) y clave."""
+        return [{'etapa': name, 'estado': self.status.get(name, 'skipped'), 'clave': self._keys.get(name)}
+                for name in self.stages]
+
+    def print_summary(self):
+        """Imprime el estado de cada etapa en esta ejecución."""
+        rows = self.summary_rows()
+        width = max([len(row['etapa']) for row in rows] + [len('graficas')])
+        counts = {}
+        for row in rows:
+            counts[row['estado']] = counts.get(row['estado'], 0) + 1
+
+        print(f"\n🧩 CACHÉ POR ETAPAS ({self.directory})")
+        print("-" * (width + 40))
+        for row in rows:
+            key = row['clave'][:12] if row['clave'] else '-'
+            print(f"   {row['etapa']:<{width}} {STATUS_LABELS[row['estado']]:<16} {key}")
+        charts = self.render_stats
+        if charts['charts'] or charts['cached']:
+            print(f"   {'graficas':<{width}} ✅ {charts['cached']} desde caché, 🔄 {charts['charts']} dibujadas")
+        print(f"   Etapas desde caché: {counts.get('hit', 0)}, recalculadas: {counts.get('miss', 0)}, "
+              f"no requeridas: {counts.get('skipped', 0)}")
+
+
+def stage_names(prefix: str, names: Iterable[str]) -> List[str]:
+    """Nombres de las etapas '<prefijo>:<nombre>'."""
+    return [f"{prefix}:{name}" for name in names]
+
+
+def build_report_graph(jobs: Sequence[tuple], transforms: Dict[str, Callable[[pd.DataFrame], pd.DataFrame]],
+                       include_figures: Optional[bool] = None, render_profile: Optional[str] = None,
+                       stream: bool = False, history: bool = False,
+                       period: Optional[ReportPeriod] = None) -> StageGraph:
+    """
+    Declara el grafo de etapas de una ejecución de main.py.
+
+    Args:
+        jobs: Trabajos (tipo de reporte, sede), un documento por trabajo
+        transforms: Dataset -> transformación (p. ej. {'preventivos': transform_preventivos_df})
+        include_figures, render_profile: Opciones de los documentos (por defecto las de DOCUMENT_CONFIG)
+        stream: Si los frames se leen por bloques (el frame no es idéntico al de la carga completa)
+        history: Si los documentos se generan desde el historial particionado (su contenido,
+            con los meses congelados, también es una entrada de los documentos)
+        period: Rango de meses de los reportes (--range); None para el mes en curso
+
+    Returns:
+        StageGraph: Grafo con las etapas de carga, transformación, agregados y documentos
+    """
+    graph = StageGraph()
+    for name, transform in transforms.items():
+        graph.add(f"carga:{name}", source=LOCAL_FILES[name], params={'schema': schema_cache_key(name)}, codec=None)
+        graph.add(f"transformacion:{name}", inputs=[f"carga:{name}"], code=transformed_frame_key(transform, name),
+                  params={'lector': 'bloques' if stream else 'completo'}, codec='frame')
+        graph.add(f"agregados:{name}", inputs=[f"transformacion:{name}"], code=code_version(CUBE_INPUTS[name]),
+                  codec='pickle', compute=lambda df, name=name: build_monthly_cube(*CUBE_INPUTS[name](df)))
+
+    data_stages = stage_names('transformacion', transforms) + stage_names('agregados', transforms)
+    document_code = code_version(*PIPELINE_CACHE_CONFIG['document_code_paths'], DOCUMENT_CONFIG['logo_path'])
+    params = {
+        'include_figures': DOCUMENT_CONFIG.get('include_figures', True) if include_figures is None else include_figures,
+        'render_profile': render_profile or DOCUMENT_CONFIG.get('render_profile'),
+        # El reporte del Hospital San Vicente es del mes en curso o del período pedido
+        'periodo': period.slug if period is not None else datetime.now().strftime('%Y-%m'),
+        'historial': [HISTORY_CONFIG['trend_months'], history_fingerprint(list(transforms))] if history else None,
+    }
+    for kind, sede in jobs:
+        graph.add(f"documento:{kind}:{sede}", inputs=data_stages, code=document_code,
+                  params={**params, 'kind': kind, 'sede': sede}, codec='files')
+    return graph
+
+
+def restore_cached_reports(graph: StageGraph, jobs: Sequence[tuple]) -> Dict[tuple, Dict]:
+    """
+    Restaura desde la caché los documentos cuyas entradas no cambiaron.
+
+    Returns:
+        Dict: (tipo, sede) -> resultado con la forma de run_report_job, solo de los restaurados
+    """
+    restored = {}
+    for kind, sede in jobs:
+        files = graph.lookup(f"documento:{kind}:{sede}")
+        if files:
+            restored[(kind, sede)] = {
+                'kind': kind, 'sede': sede, 'path': files[0], 'files': files, 'render_stats': {}, 'error': None,
+                'log': f"\n♻️  {kind} / {sede}: entradas sin cambios, documento restaurado desde la caché: {files[0]}\n"
+            }
+    return restored
+
+
+def store_report_result(graph: StageGraph, result: Dict):
+    """Guarda en la caché los archivos de un reporte recién generado (si no hubo error)."""
+    graph.add_render_stats(result.get('render_stats') or {})
+    if result.get('error') is None and result.get('files'):
+        graph.put(f"documento:{result['kind']}:{result['sede']}", result['files'])
+
+
+def load_stage_data(graph: StageGraph, tasks: Dict[str, Callable[[], Any]], executor: Optional[str] = None,
+                    stream: bool = False) -> tuple:
+    """
+    Frames transformados y cubos mensuales de cada dataset a través del grafo.
+
+    Solo los datasets cuya transformación no está en caché se cargan (en paralelo, con
+    load_concurrently); los cubos salen de la caché o se construyen de su frame.
+
+    Args:
+        tasks: Dataset -> tarea de carga y transformación (como en main.py)
+        executor: 'threads', 'processes' o 'serial' (ver load_concurrently)
+        stream: Las tareas devuelven (frame, cubo), como load_streaming_with_fallback
+
+    Returns:
+        Tuple[Dict, Dict]: (frames por dataset, cubos por dataset)
+    """
+    frames = {name: graph.lookup(f"transformacion:{name}") for name in tasks}
+    pending = {name: task for name, task in tasks.items() if frames[name] is None}
+    for name in tasks:
+        if name not in pending:
+            print(f"⚡ {name}: frame transformado desde la caché de etapas")
+    if pending:
+        for name, value in load_concurrently(pending, executor=executor).items():
+            frame, cube = value if stream else (value, None)
+            graph.put(f"transformacion:{name}", frame)
+            if cube is not None:
+                graph.put(f"agregados:{name}", cube)
+            frames[name] = frame
+    with span('cubos'):
+        cubes = {name: graph.get(f"agregados:{name}") for name in tasks}
+    return frames, cubes
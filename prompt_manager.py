@@ -217,9 +217,9 @@ def generate_report_with_prompts(sede: str = "Rionegro") -> PromptManager:
         load_data_with_fallback(LOCAL_FILES['lamparas'], API_URLS['lamparas'])
     )
     
-    # Generar reporte y obtener data_manager
+    # Generar reporte y obtener data_manager (los prompts solo necesitan las tablas)
     report_path, data_manager = generate_enhanced_report(
-        df_preventivo, df_roedores, df_lamparas, sede
+        df_preventivo, df_roedores, df_lamparas, sede, include_figures=False
     )
     
     # Crear PromptManager
@@ -0,0 +1,65 @@
+"""
+Inserción de las gráficas codificadas (ChartImage) en documentos de Word.
+
+Las imágenes PNG se agregan con `doc.add_picture`, como siempre. python-docx no
+reconoce SVG, así que con el perfil 'vector' se agrega el PNG de respaldo y el
+SVG se anexa como una parte más del paquete, referenciada desde la imagen con la
+extensión `asvg:svgBlip` de Office: Word 2016+ y LibreOffice muestran el SVG y
+los visores antiguos el PNG.
+"""
+
+from io import BytesIO
+from typing import Optional, Union
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Inches
+
+from config.settings import DOCUMENT_CONFIG
+from visualisations.render_profiles import ChartImage
+
+# Extensión de Office 2016 para imágenes SVG dentro de <a:blip>
+SVG_BLIP_EXT_URI = '{96DAC541-7B7A-43D3-8B79-37D633B846F1}'
+SVG_NAMESPACE = 'http://schemas.microsoft.com/office/drawing/2016/SVG/main'
+
+
+def _attach_svg(doc, picture, svg: bytes):
+    """Anexa `svg` al paquete y lo enlaza desde el <a:blip> de la imagen insertada."""
+    document_part = doc.part
+    package = document_part.package
+    svg_part = Part(package.next_partname('/word/media/image%d.svg'), 'image/svg+xml', svg, package)
+    r_id = document_part.relate_to(svg_part, RT.IMAGE)
+
+    blip = picture._inline.xpath('.//a:blip')[0]
+    blip.append(parse_xml(
+        f'<a:extLst {nsdecls("a", "r")}>'
+        f'<a:ext uri="{SVG_BLIP_EXT_URI}">'
+        f'<asvg:svgBlip xmlns:asvg="{SVG_NAMESPACE}" r:embed="{r_id}"/>'
+        f'</a:ext></a:extLst>'
+    ))
+
+
+def add_chart_image(doc, image: Union[ChartImage, bytes], width_inches: Optional[float] = None):
+    """
+    Agrega una gráfica codificada al documento.
+
+    Args:
+        doc: Documento de python-docx
+        image: ChartImage (o bytes PNG ya codificados)
+        width_inches: Ancho de la imagen (por defecto DOCUMENT_CONFIG['figure_width_inches'])
+
+    Returns:
+        InlineShape: La imagen insertada
+    """
+    if isinstance(image, bytes):
+        image = ChartImage(image)
+    width = Inches(width_inches or DOCUMENT_CONFIG.get('figure_width_inches', 5.5))
+
+    if image.format == 'png':
+        return doc.add_picture(BytesIO(image.data), width=width)
+
+    picture = doc.add_picture(BytesIO(image.fallback), width=width)
+    _attach_svg(doc, picture, image.data)
+    return picture
@@ -0,0 +1,86 @@
+"""
+Escritura en bloque de tablas de pandas en documentos de Word.
+
+Llenar una tabla con `table.cell(i, j).text = ...` o `table.add_row().cells` en
+python-docx recorre la rejilla XML de la tabla en cada llamada, así que el costo
+crece más rápido que la cantidad de celdas. Aquí el XML de todas las filas
+(`<w:tr>`) se arma como texto en una sola pasada sobre el DataFrame, se analiza
+una única vez y se anexa a la tabla creada por python-docx, que conserva el estilo,
+la alineación y los anchos de columna de siempre.
+"""
+
+import re
+from typing import List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.table import Table
+
+# Saltos de línea y tabulaciones se escriben como <w:br/> y <w:tab/>, igual que python-docx
+_BREAKS = re.compile(r'([\t\n])')
+
+_BOLD_RPR = '<w:rPr><w:b/></w:rPr>'
+
+
+def _run_xml(text: str, bold: bool = False) -> str:
+    """XML de un run (`<w:r>`) con el texto de una celda."""
+    content = []
+    for piece in _BREAKS.split(text):
+        if piece == '\n':
+            content.append('<w:br/>')
+        elif piece == '\t':
+            content.append('<w:tab/>')
+        elif piece:
+            content.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return f"<w:r>{_BOLD_RPR if bold else ''}{''.join(content)}</w:r>"
+
+
+def _row_xml(values: Sequence[str], cell_props: List[str], bold: bool = False) -> str:
+    """XML de una fila (`<w:tr>`): una celda por valor, con el ancho de su columna."""
+    cells = ''.join(
+        f'<w:tc>{props}<w:p>{_run_xml(value, bold)}</w:p></w:tc>'
+        for value, props in zip(values, cell_props)
+    )
+    return f'<w:tr>{cells}</w:tr>'
+
+
+def add_dataframe_table(doc, table_data: pd.DataFrame, style: Optional[str] = 'Table Grid',
+                        bold_header: bool = False, alignment=None) -> Table:
+    """
+    Añade un DataFrame como tabla de Word: una fila de encabezados y una fila por registro.
+
+    Los valores se escriben como `str(valor)` columna por columna, en el orden
+    de las filas del DataFrame (el índice no se incluye).
+
+    Args:
+        doc: Documento (o contenedor) de python-docx
+        table_data: Datos de la tabla
+        style: Estilo de tabla de Word
+        bold_header: Si los encabezados van en negrita
+        alignment: Alineación de la tabla (WD_TABLE_ALIGNMENT), opcional
+
+    Returns:
+        Table: La tabla insertada
+    """
+    table = doc.add_table(rows=0, cols=len(table_data.columns))
+    if style is not None:
+        table.style = style
+    if alignment is not None:
+        table.alignment = alignment
+
+    # Mismas propiedades de celda que python-docx asigna al agregar filas
+    cell_props = [
+        f'<w:tcPr><w:tcW w:type="dxa" w:w="{grid_col.w.twips}"/></w:tcPr>'
+        for grid_col in table._tbl.tblGrid.gridCol_lst
+    ]
+
+    rows = [_row_xml([str(column) for column in table_data.columns], cell_props, bold=bold_header)]
+    values = table_data.astype(str).to_numpy()
+    rows.extend(_row_xml(row, cell_props) for row in values)
+
+    # Un solo análisis del XML de todas las filas; las filas se mueven a la tabla real
+    parsed = parse_xml(f'<w:tbl {nsdecls("w")}>{"".join(rows)}</w:tbl>')
+    table._tbl.extend(list(parsed))
+    return table
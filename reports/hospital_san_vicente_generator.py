@@ -12,8 +12,6 @@ from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.enum.section import WD_SECTION
-from io import BytesIO
-import matplotlib.pyplot as plt
 from typing import Dict, Any, Tuple, Optional
 import os
 import calendar
@@ -34,6 +32,23 @@ from visualisations.Lamparas import (
     plot_capturas_especies_por_mes,
     plot_tendencia_total_capturas
 )
+from visualisations.render_cache import render_chart
+from visualisations.render_profiles import ChartImage, encode_figure, print_render_stats, reset_render_stats
+from data_processing.monthly_aggregates import (
+    HOSPITAL_PLAGA_COLUMNS,
+    ROWS_METRIC,
+    MonthlyAggregateCube,
+    areas_metric,
+    build_monthly_cubes,
+    total_metric
+)
+from data_processing.sede_partitions import SedePartitions, build_sede_partitions
+from data_processing.history_store import read_history
+from data_processing.report_periods import ReportPeriod, cycle_month, month_key
+from reports.docx_images import add_chart_image
+from reports.docx_tables import add_dataframe_table
+from config.settings import DOCUMENT_CONFIG, HISTORY_CONFIG
+from instrumentation import span
 
 class HospitalSanVicenteReportGenerator:
     """
@@ -41,9 +56,22 @@ class HospitalSanVicenteReportGenerator:
     Implementa la plantilla oficial con variables dinámicas automatizadas
     """
     
-    def __init__(self):
+    def __init__(self, include_figures: Optional[bool] = None, render_profile: Optional[str] = None,
+                 history: Optional[bool] = None, period: Optional[ReportPeriod] = None):
         self.template_config = self._load_template_config()
-        self.current_date = datetime.now()
+        # Con un período (--range) el reporte cubre sus meses y se fecha en el último
+        self.period = period
+        self.current_date = period.end_date if period is not None else datetime.now()
+        # Sin gráficas el reporte lleva solo las tablas y matplotlib no se importa
+        if include_figures is None:
+            include_figures = DOCUMENT_CONFIG.get('include_figures', True)
+        self.include_figures = include_figures
+        # Perfil de codificación de las gráficas (None = DOCUMENT_CONFIG['render_profile'])
+        self.render_profile = render_profile
+        # Con el historial, las métricas del mes salen solo de las particiones (sede, mes actual)
+        if history is None:
+            history = HISTORY_CONFIG.get('enabled', False)
+        self.history = history
         
     def _load_template_config(self) -> Dict[str, Any]:
         """Carga la configuración de la plantilla desde el archivo YAML."""
@@ -59,37 +87,52 @@ class HospitalSanVicenteReportGenerator:
     def calculate_dynamic_variables(self, df_preventivo: pd.DataFrame, 
                                   df_roedores: pd.DataFrame, 
                                   df_lamparas: pd.DataFrame, 
-                                  sede: str) -> Dict[str, Any]:
+                                  sede: str,
+                                  partitions: Dict[str, SedePartitions] = None,
+                                  cubes: Dict[str, MonthlyAggregateCube] = None) -> Dict[str, Any]:
         """
         Calcula todas las variables dinámicas basadas en los datos reales
         Según la GUIA_PRACTICA_ELABORACION_INFORMES_MENSUALES
+        
+        Args:
+            partitions: Datasets particionados por sede (se construyen si no se reciben)
+            cubes: Cubos de agregados mensuales; con un período (--range) las métricas son los
+                totales del período tomados de sus sumas acumuladas (se construyen si no se reciben)
         """
         # Obtener configuración de la sede
         sede_config = self.template_config['sedes'][sede]
         
-        # Filtrar datos por sede
-        df_preventivo_filtered = df_preventivo[df_preventivo['Sede'] == sede]
-        df_roedores_filtered = df_roedores[df_roedores['Sede'] == sede]
-        df_lamparas_filtered = df_lamparas[df_lamparas['Sede'] == sede]
+        if self.period is not None:
+            # Totales del período: dos filas de las sumas acumuladas por métrica, sin recorrer filas
+            if cubes is None:
+                cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
+            metricas = self._range_metrics(cubes, sede)
+        else:
+            # Datos de la sede: vistas sin copia de los datasets particionados por sede
+            if partitions is None:
+                partitions = build_sede_partitions(df_preventivo, df_roedores, df_lamparas)
+            df_preventivo_filtered = partitions['preventivos'].get(sede)
+            df_roedores_filtered = partitions['roedores'].get(sede)
+            df_lamparas_filtered = partitions['lamparas'].get(sede)
+            if self.history:
+                df_preventivo_filtered, df_roedores_filtered, df_lamparas_filtered = self._read_month_from_history(
+                    sede, (df_preventivo_filtered, df_roedores_filtered, df_lamparas_filtered)
+                )
+            metricas = self._row_metrics(df_preventivo_filtered, df_roedores_filtered, df_lamparas_filtered)
         
         # Variables temporales
         mes_actual = self.current_date.month
         año_actual = self.current_date.year
         ultimo_dia_mes = calendar.monthrange(año_actual, mes_actual)[1]
         fecha_elaboracion = f"{ultimo_dia_mes:02d}/{mes_actual:02d}/{año_actual}"
+        meses = self.template_config['configuracion_temporal']['meses_español']
+        if self.period is not None and self.period.months > 1:
+            inicio = self.period.start
+            periodo_texto = f"{meses[inicio % 100]} {inicio // 100} a {meses[mes_actual]} {año_actual}"
+        else:
+            periodo_texto = f"{meses[mes_actual]} {año_actual}"
         
-        # Calcular métricas principales de preventivos
-        total_ordenes = len(df_preventivo_filtered) if not df_preventivo_filtered.empty else 0
-        areas_con_plagas = 0
-        total_plagas = 0
-        
-        if not df_preventivo_filtered.empty:
-            # Contar áreas con evidencia de plagas
-            plagas_columns = ['Cucarachas Alemanas', 'Cucarachas Americanas', 'Moscas', 'Zancudos', 'Ratas', 'Ratones', 'Hormigas']
-            for col in plagas_columns:
-                if col in df_preventivo_filtered.columns:
-                    areas_con_plagas += (df_preventivo_filtered[col] > 0).sum()
-                    total_plagas += df_preventivo_filtered[col].sum()
+        total_plagas = metricas['total_plagas']
         
         # Determinar grado de infestación
         grado_infestacion = self._determinar_grado_infestacion(total_plagas)
@@ -97,33 +140,15 @@ class HospitalSanVicenteReportGenerator:
         # Calcular porcentaje de cumplimiento basado en el grado de infestación
         porcentaje_cumplimiento = self._calcular_porcentaje_cumplimiento(grado_infestacion, total_plagas)
         
-        # Análisis de roedores
-        estaciones_activas = 0
-        consumo_total = 0
-        if not df_roedores_filtered.empty:
-            estaciones_activas = len(df_roedores_filtered)
-            if 'Consumo' in df_roedores_filtered.columns:
-                consumo_total = df_roedores_filtered['Consumo'].sum()
-        
-        # Análisis de lámparas  
-        lamparas_funcionales = 0
-        lamparas_saturadas = 0
-        total_capturas = 0
-        if not df_lamparas_filtered.empty:
-            lamparas_funcionales = len(df_lamparas_filtered)
-            if 'Estado' in df_lamparas_filtered.columns:
-                lamparas_saturadas = (df_lamparas_filtered['Estado'] == 'Saturada').sum()
-            if 'Capturas' in df_lamparas_filtered.columns:
-                total_capturas = df_lamparas_filtered['Capturas'].sum()
-        
-        # Número de mes del ciclo (asumimos que empezó en enero)
-        numero_mes_ciclo = mes_actual
+        # Número de mes del ciclo de contrato (REPORT_RANGE_CONFIG['cycle_start_month'])
+        numero_mes_ciclo = cycle_month(month_key(self.current_date))
         
         return {
             # Variables temporales
             'fecha_elaboracion': fecha_elaboracion,
-            'mes_nombre': self.template_config['configuracion_temporal']['meses_español'][mes_actual],
+            'mes_nombre': meses[mes_actual],
             'año': año_actual,
+            'periodo_texto': periodo_texto,
             'numero_mes_texto': self.template_config['configuracion_temporal']['numeros_ordinales'][numero_mes_ciclo],
             'numero_mes_ciclo': numero_mes_ciclo,
             
@@ -136,33 +161,130 @@ class HospitalSanVicenteReportGenerator:
             'numero_bloques': sede_config['numero_bloques'],
             
             # Métricas principales (dinámicas)
-            'ordenes_solicitadas': total_ordenes,
-            'ordenes_realizadas': total_ordenes,  # Usualmente igual según guía
+            'ordenes_solicitadas': metricas['total_ordenes'],
+            'ordenes_realizadas': metricas['total_ordenes'],  # Usualmente igual según guía
             'porcentaje_cumplimiento': porcentaje_cumplimiento,
-            'total_areas_controladas': len(df_preventivo_filtered) if not df_preventivo_filtered.empty else 0,
-            'areas_con_plagas': areas_con_plagas,
+            'total_areas_controladas': metricas['total_ordenes'],
+            'areas_con_plagas': metricas['areas_con_plagas'],
             'total_plagas': total_plagas,
             'grado_infestacion': grado_infestacion,
             
             # Métricas de roedores
-            'numero_estaciones_roedores': estaciones_activas,
-            'consumo_total_roedores': consumo_total,
+            'numero_estaciones_roedores': metricas['estaciones_activas'],
+            'consumo_total_roedores': metricas['consumo_total'],
             
             # Métricas de lámparas
-            'numero_lamparas': lamparas_funcionales,
-            'lamparas_saturadas': lamparas_saturadas,
-            'total_capturas_insectos': total_capturas,
+            'numero_lamparas': metricas['lamparas_funcionales'],
+            'lamparas_saturadas': metricas['lamparas_saturadas'],
+            'total_capturas_insectos': metricas['total_capturas'],
             
             # Análisis por especies
+            'tiene_cucarachas': metricas['tiene_cucarachas'],
+            'tiene_voladores': metricas['tiene_voladores'],
+            'tiene_roedores': metricas['tiene_roedores'],
+            'tiene_hormigas': metricas['tiene_hormigas'],
+            
+            # Páginas del informe
+            'total_paginas': sede_config['paginas_informe']
+        }
+    
+    def _row_metrics(self, df_preventivo_filtered: pd.DataFrame, df_roedores_filtered: pd.DataFrame,
+                     df_lamparas_filtered: pd.DataFrame) -> Dict[str, Any]:
+        """Métricas del informe a partir de las filas de la sede."""
+        # Calcular métricas principales de preventivos
+        total_ordenes = len(df_preventivo_filtered) if not df_preventivo_filtered.empty else 0
+        areas_con_plagas = 0
+        total_plagas = 0
+        
+        if not df_preventivo_filtered.empty:
+            # Contar áreas con evidencia de plagas; las columnas UInt8 suman en uint64 y
+            # 0 + uint64 da float64, por eso se acumula en int como en _range_metrics
+            for col in HOSPITAL_PLAGA_COLUMNS:
+                if col in df_preventivo_filtered.columns:
+                    areas_con_plagas += int((df_preventivo_filtered[col] > 0).sum())
+                    total_plagas += int(df_preventivo_filtered[col].sum())
+        
+        # Análisis de roedores
+        estaciones_activas = 0
+        consumo_total = 0
+        if not df_roedores_filtered.empty:
+            estaciones_activas = len(df_roedores_filtered)
+            if 'Consumo' in df_roedores_filtered.columns:
+                consumo_total = int(df_roedores_filtered['Consumo'].sum())
+        
+        # Análisis de lámparas  
+        lamparas_funcionales = 0
+        lamparas_saturadas = 0
+        total_capturas = 0
+        if not df_lamparas_filtered.empty:
+            lamparas_funcionales = len(df_lamparas_filtered)
+            if 'Estado' in df_lamparas_filtered.columns:
+                lamparas_saturadas = int((df_lamparas_filtered['Estado'] == 'Saturada').sum())
+            if 'Capturas' in df_lamparas_filtered.columns:
+                total_capturas = int(df_lamparas_filtered['Capturas'].sum())
+        
+        return {
+            'total_ordenes': total_ordenes,
+            'areas_con_plagas': areas_con_plagas,
+            'total_plagas': total_plagas,
+            'estaciones_activas': estaciones_activas,
+            'consumo_total': consumo_total,
+            'lamparas_funcionales': lamparas_funcionales,
+            'lamparas_saturadas': lamparas_saturadas,
+            'total_capturas': total_capturas,
             'tiene_cucarachas': self._tiene_especie(df_preventivo_filtered, ['Cucarachas Alemanas', 'Cucarachas Americanas']),
             'tiene_voladores': self._tiene_especie(df_preventivo_filtered, ['Moscas', 'Zancudos']),
             'tiene_roedores': self._tiene_especie(df_preventivo_filtered, ['Ratas', 'Ratones']),
             'tiene_hormigas': self._tiene_especie(df_preventivo_filtered, ['Hormigas']),
-            
-            # Páginas del informe
-            'total_paginas': sede_config['paginas_informe']
         }
     
+    def _range_metrics(self, cubes: Dict[str, MonthlyAggregateCube], sede: str) -> Dict[str, Any]:
+        """Las mismas métricas que _row_metrics, como totales del período desde las sumas acumuladas."""
+        def total(dataset: str, metric: str) -> int:
+            cube = cubes[dataset]
+            if metric not in cube.additive:
+                return 0
+            return int(cube.range_totals([metric], self.period.start, self.period.end, sede).iloc[0])
+        
+        def tiene(columnas: list) -> bool:
+            return any(total('preventivos', total_metric(col)) > 0 for col in columnas)
+        
+        return {
+            'total_ordenes': total('preventivos', ROWS_METRIC),
+            'areas_con_plagas': sum(total('preventivos', areas_metric(col)) for col in HOSPITAL_PLAGA_COLUMNS),
+            'total_plagas': sum(total('preventivos', total_metric(col)) for col in HOSPITAL_PLAGA_COLUMNS),
+            'estaciones_activas': total('roedores', ROWS_METRIC),
+            'consumo_total': total('roedores', total_metric('Consumo')),
+            'lamparas_funcionales': total('lamparas', ROWS_METRIC),
+            'lamparas_saturadas': total('lamparas', 'Lámparas saturadas'),
+            'total_capturas': total('lamparas', total_metric('Capturas')),
+            'tiene_cucarachas': tiene(['Cucarachas Alemanas', 'Cucarachas Americanas']),
+            'tiene_voladores': tiene(['Moscas', 'Zancudos']),
+            'tiene_roedores': tiene(['Ratas', 'Ratones']),
+            'tiene_hormigas': tiene(['Hormigas']),
+        }
+    
+    def _read_month_from_history(self, sede: str, fallback: Tuple[pd.DataFrame, ...]) -> Tuple[pd.DataFrame, ...]:
+        """
+        Lee del historial las filas de la sede en el mes del reporte (solo esas particiones).
+        
+        Si un dataset aún no tiene historial se usan los datos recibidos.
+        """
+        key = month_key(self.current_date)
+        frames = []
+        for name, df in zip(('preventivos', 'roedores', 'lamparas'), fallback):
+            month_df = read_history(name, sedes=[sede], start=key, end=key)
+            if month_df is None:
+                print(f"⚠️  Sin historial de {name}: las métricas usan todos los datos de la sede")
+                month_df = df
+            frames.append(month_df)
+        return tuple(frames)
+    
+    def _period_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Filas de los meses del período (para las gráficas que se dibujan desde las filas)."""
+        mask = df['Mes_key'].between(self.period.start, self.period.end).fillna(False).to_numpy(dtype=bool)
+        return df[mask]
+    
     def _determinar_grado_infestacion(self, total_plagas: int) -> str:
         """Determina el grado de infestación según los rangos de la guía práctica."""
         grados = self.template_config['grados_infestacion']
@@ -247,6 +369,8 @@ class HospitalSanVicenteReportGenerator:
             ("MES DE ANÁLISIS:", variables['mes_nombre']),
             ("AÑO DE ANÁLISIS:", str(variables['año']))
         ]
+        if self.period is not None:
+            client_data[6] = ("PERÍODO DE ANÁLISIS:", variables['periodo_texto'])
         
         for i, (key, value) in enumerate(client_data):
             table.cell(i, 0).text = key
@@ -306,7 +430,7 @@ class HospitalSanVicenteReportGenerator:
     
     def _add_analysis_sections(self, doc: Document, df_preventivo: pd.DataFrame, 
                              df_roedores: pd.DataFrame, df_lamparas: pd.DataFrame, 
-                             variables: Dict[str, Any]):
+                             variables: Dict[str, Any], cubes: Dict[str, MonthlyAggregateCube]):
         """Añade las secciones de análisis con gráficas y tablas."""
         
         # SECCIÓN 1: CONTROL DE INSECTOS RASTREROS
@@ -330,7 +454,7 @@ class HospitalSanVicenteReportGenerator:
         
         # Gráficas de preventivos
         if not df_preventivo.empty:
-            self._add_preventivos_charts(doc, df_preventivo)
+            self._add_preventivos_charts(doc, df_preventivo, cubes['preventivos'])
         
         # SECCIÓN 2: CONTROL DE ROEDORES  
         doc.add_heading("2. REGISTRO CONTROL DE ROEDORES - CONSOLIDADO MENSUAL", level=2)
@@ -340,7 +464,7 @@ class HospitalSanVicenteReportGenerator:
         
         # Gráficas de roedores
         if not df_roedores.empty:
-            self._add_roedores_charts(doc, df_roedores)
+            self._add_roedores_charts(doc, df_roedores, cubes['roedores'])
         
         # SECCIÓN 3: CONTROL DE INSECTOS VOLADORES
         doc.add_heading("3. REGISTRO CONTROL DE INSECTOS VOLADORES - LÁMPARAS", level=2)
@@ -350,105 +474,113 @@ class HospitalSanVicenteReportGenerator:
         
         # Gráficas de lámparas
         if not df_lamparas.empty:
-            self._add_lamparas_charts(doc, df_lamparas)
+            self._add_lamparas_charts(doc, df_lamparas, cubes['lamparas'])
     
-    def _add_preventivos_charts(self, doc: Document, df_preventivo: pd.DataFrame):
+    def _add_preventivos_charts(self, doc: Document, df_preventivo: pd.DataFrame,
+                                cube: MonthlyAggregateCube):
         """Añade gráficas de la sección preventivos."""
         try:
             # Gráfica 1: Órdenes vs Áreas
-            table_data, figure = generate_order_area_plot(df_preventivo)
-            if figure:
+            table_data, image = render_chart(generate_order_area_plot, df_preventivo, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Gráfica #1: Cantidad de órdenes vs cantidad de áreas", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Gráfica 2: Especies de plagas
-            table_data, figure = generate_plagas_timeseries_facet(df_preventivo)
-            if figure:
+            table_data, image = render_chart(generate_plagas_timeseries_facet, df_preventivo, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Gráfica #2: Relación por especie encontrada", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Gráfica 3: Tendencia total
-            table_data, figure = generate_total_plagas_trend_plot(df_preventivo)
-            if figure:
+            table_data, image = render_chart(generate_total_plagas_trend_plot, df_preventivo, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Gráfica #3: Tendencia de eliminación mensual", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
                 
         except Exception as e:
             print(f"⚠️  Error generando gráficas de preventivos: {e}")
     
-    def _add_roedores_charts(self, doc: Document, df_roedores: pd.DataFrame):
+    def _add_roedores_charts(self, doc: Document, df_roedores: pd.DataFrame,
+                             cube: MonthlyAggregateCube):
         """Añade gráficas de la sección roedores."""
         try:
             # Estado de estaciones
-            table_data, figure = generate_roedores_station_status_plot(df_roedores)
-            if figure:
+            table_data, image = render_chart(generate_roedores_station_status_plot, df_roedores, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Estado de las estaciones portacebos", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Tendencia de eliminación
-            table_data, figure = plot_tendencia_eliminacion_mensual(df_roedores)
-            if figure:
+            table_data, image = render_chart(plot_tendencia_eliminacion_mensual, df_roedores, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Tendencia de consumo mensual", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
                 
         except Exception as e:
             print(f"⚠️  Error generando gráficas de roedores: {e}")
     
-    def _add_lamparas_charts(self, doc: Document, df_lamparas: pd.DataFrame):
+    def _add_lamparas_charts(self, doc: Document, df_lamparas: pd.DataFrame,
+                             cube: MonthlyAggregateCube):
         """Añade gráficas de la sección lámparas."""
         try:
             # Estado mensual
-            table_data, figure = plot_estado_lamparas_por_mes(df_lamparas)
-            if figure:
+            table_data, image = render_chart(plot_estado_lamparas_por_mes, df_lamparas, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Estado de las lámparas por mes", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Estado con leyenda
-            table_data, figure = plot_estado_lamparas_con_leyenda(df_lamparas)
-            if figure:
+            table_data, figure = plot_estado_lamparas_con_leyenda(df_lamparas, lazy=True)
+            image = figure.to_image(self.render_profile) if self.include_figures else None
+            if image or not self.include_figures:
                 doc.add_paragraph("Estado detallado de las lámparas", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Capturas por especies
-            table_data, figure = plot_capturas_especies_por_mes(df_lamparas)
-            if figure:
+            table_data, image = render_chart(plot_capturas_especies_por_mes, df_lamparas, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Capturas por especies", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
             
             # Tendencia de capturas
-            table_data, figure = plot_tendencia_total_capturas(df_lamparas)
-            if figure:
+            table_data, image = render_chart(plot_tendencia_total_capturas, df_lamparas, cube=cube,
+                                             draw=self.include_figures, profile=self.render_profile)
+            if image or not self.include_figures:
                 doc.add_paragraph("Tendencia total de capturas", style='Intense Quote')
-                self._add_plot_to_doc(doc, figure)
+                self._add_plot_to_doc(doc, image)
                 self._add_table_to_doc(doc, table_data)
                 
         except Exception as e:
             print(f"⚠️  Error generando gráficas de lámparas: {e}")
     
     def _add_plot_to_doc(self, doc: Document, fig):
-        """Añade una gráfica de matplotlib al documento."""
+        """Añade una gráfica de matplotlib (codificada con el perfil del generador) o una imagen ya codificada."""
         if fig is None:
             return False
         
         try:
-            with BytesIO() as image_stream:
-                fig.savefig(image_stream, format='png', bbox_inches='tight', dpi=300)
-                image_stream.seek(0)
-                doc.add_picture(image_stream, width=Inches(5.5))
-            plt.close(fig)
+            if not isinstance(fig, (ChartImage, bytes)):
+                fig = encode_figure(fig, self.render_profile)
+            add_chart_image(doc, fig)
             return True
         except Exception as e:
             print(f"Error añadiendo gráfica: {e}")
-            if fig is not None:
-                plt.close(fig)
             return False
     
     def _add_table_to_doc(self, doc: Document, table_data: pd.DataFrame):
@@ -457,21 +589,9 @@ class HospitalSanVicenteReportGenerator:
             return
         
         try:
-            # Crear tabla en Word
-            table = doc.add_table(rows=len(table_data) + 1, cols=len(table_data.columns))
-            table.style = 'Table Grid'
-            table.alignment = WD_TABLE_ALIGNMENT.CENTER
-            
-            # Añadir encabezados
-            for i, column in enumerate(table_data.columns):
-                cell = table.cell(0, i)
-                cell.text = str(column)
-                cell.paragraphs[0].runs[0].bold = True
-            
-            # Añadir datos
-            for i, row in table_data.iterrows():
-                for j, value in enumerate(row):
-                    table.cell(i + 1, j).text = str(value)
+            # Crear tabla en Word con encabezados en negrita (un solo bloque XML)
+            add_dataframe_table(doc, table_data, style='Table Grid', bold_header=True,
+                                alignment=WD_TABLE_ALIGNMENT.CENTER)
                     
         except Exception as e:
             print(f"Error añadiendo tabla: {e}")
@@ -531,19 +651,28 @@ class HospitalSanVicenteReportGenerator:
     def generate_complete_report(self, df_preventivo: pd.DataFrame, 
                                df_roedores: pd.DataFrame, 
                                df_lamparas: pd.DataFrame, 
-                               sede: str) -> str:
+                               sede: str,
+                               cubes: Dict[str, MonthlyAggregateCube] = None,
+                               partitions: Dict[str, SedePartitions] = None) -> str:
         """
         Genera un reporte completo usando la nueva plantilla del Hospital San Vicente.
         
+        Args:
+            cubes: Cubos de agregados mensuales por dataset (se construyen si no se reciben)
+            partitions: Datasets particionados por sede (se construyen si no se reciben)
+        
         Returns:
             str: Ruta del archivo generado
         """
         print(f"\n🏥 Generando reporte Hospital San Vicente para {sede}")
         print("=" * 60)
+        if cubes is None:
+            cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
         
         # Calcular variables dinámicas
         print("📊 Calculando variables dinámicas...")
-        variables = self.calculate_dynamic_variables(df_preventivo, df_roedores, df_lamparas, sede)
+        variables = self.calculate_dynamic_variables(df_preventivo, df_roedores, df_lamparas, sede, partitions,
+                                                     cubes)
         
         # Crear documento
         print("📄 Creando documento...")
@@ -560,7 +689,14 @@ class HospitalSanVicenteReportGenerator:
         self._add_program_description(doc, variables)
         
         print("📊 Procesando análisis y gráficas...")
-        self._add_analysis_sections(doc, df_preventivo, df_roedores, df_lamparas, variables)
+        reset_render_stats()
+        if self.period is not None:
+            # Las gráficas muestran solo los meses del período
+            cubes = {name: cube.window(self.period.start, self.period.end) for name, cube in cubes.items()}
+            df_preventivo, df_roedores, df_lamparas = (
+                self._period_rows(df) for df in (df_preventivo, df_roedores, df_lamparas)
+            )
+        self._add_analysis_sections(doc, df_preventivo, df_roedores, df_lamparas, variables, cubes)
         
         print("💡 Añadiendo recomendaciones...")
         self._add_recommendations(doc, variables)
@@ -568,15 +704,21 @@ class HospitalSanVicenteReportGenerator:
         print("📞 Añadiendo información de contacto...")
         self._add_footer_contact(doc)
         
-        # Guardar documento
-        output_path = f"outputs/informe_hospital_san_vicente_{sede.lower()}_{variables['año']}_{variables['mes_nombre'].lower()}.docx"
-        doc.save(output_path)
+        # Guardar documento (el informe solo con tablas no reemplaza al informe con gráficas)
+        suffix = '' if self.include_figures else '_tablas'
+        if self.period is not None:
+            output_path = f"outputs/informe_hospital_san_vicente_{sede.lower()}_{self.period.slug}{suffix}.docx"
+        else:
+            output_path = f"outputs/informe_hospital_san_vicente_{sede.lower()}_{variables['año']}_{variables['mes_nombre'].lower()}{suffix}.docx"
+        with span('guardar_docx'):
+            doc.save(output_path)
         
         print(f"✅ Reporte completado: {output_path}")
+        print_render_stats()
         
         # Mostrar resumen
         print(f"\n📋 RESUMEN DEL REPORTE:")
-        print(f"   📅 Período: {variables['mes_nombre']} {variables['año']}")
+        print(f"   📅 Período: {variables['periodo_texto']}")
         print(f"   🏢 Sede: {variables['nombre_completo_sede']}")
         print(f"   📊 Órdenes procesadas: {variables['ordenes_solicitadas']}")
         print(f"   🎯 Cumplimiento: {variables['porcentaje_cumplimiento']}%")
@@ -589,7 +731,13 @@ class HospitalSanVicenteReportGenerator:
 def generate_hospital_san_vicente_report(df_preventivo: pd.DataFrame, 
                                        df_roedores: pd.DataFrame, 
                                        df_lamparas: pd.DataFrame, 
-                                       sede: str) -> str:
+                                       sede: str,
+                                       cubes: Dict[str, MonthlyAggregateCube] = None,
+                                       partitions: Dict[str, SedePartitions] = None,
+                                       include_figures: Optional[bool] = None,
+                                       render_profile: Optional[str] = None,
+                                       history: Optional[bool] = None,
+                                       period: Optional[ReportPeriod] = None) -> str:
     """
     Función de conveniencia para generar reportes del Hospital San Vicente.
     
@@ -598,9 +746,17 @@ def generate_hospital_san_vicente_report(df_preventivo: pd.DataFrame,
         df_roedores: DataFrame con datos de control de roedores
         df_lamparas: DataFrame con datos de control de lámparas  
         sede: Nombre de la sede ('Rionegro' o 'Medellín')
+        cubes: Cubos de agregados mensuales por dataset (opcional, se comparten entre sedes)
+        partitions: Datasets particionados por sede (opcional, se comparten entre sedes)
+        include_figures: Incluir las gráficas (por defecto DOCUMENT_CONFIG['include_figures'])
+        render_profile: 'draft', 'final' o 'vector' (por defecto DOCUMENT_CONFIG['render_profile'])
+        history: Calcular las métricas del mes desde el historial particionado
+            (por defecto HISTORY_CONFIG['enabled'])
+        period: Rango de meses del reporte (ver report_periods.resolve_period); None para el
+            reporte del mes en curso con los datos de toda la historia
         
     Returns:
         str: Ruta del archivo de reporte generado
     """
-    generator = HospitalSanVicenteReportGenerator()
-    return generator.generate_complete_report(df_preventivo, df_roedores, df_lamparas, sede)
+    generator = HospitalSanVicenteReportGenerator(include_figures, render_profile, history, period)
+    return generator.generate_complete_report(df_preventivo, df_roedores, df_lamparas, sede, cubes, partitions)
@@ -1,10 +1,8 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
-from io import BytesIO
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 
 from visualisations.Preventivos import (
     generate_order_area_plot,
@@ -21,8 +19,19 @@ from visualisations.Lamparas import (
     plot_capturas_especies_por_mes,
     plot_tendencia_total_capturas)
 
+from visualisations.render_cache import render_chart
+from visualisations.render_profiles import ChartImage, encode_figure, print_render_stats, reset_render_stats
+
+from reports.docx_images import add_chart_image
+from reports.docx_tables import add_dataframe_table
+
+from data_processing.monthly_aggregates import MonthlyAggregateCube, build_monthly_cubes
+from data_processing.sede_partitions import SedePartitions, build_sede_partitions
 from llm_integration.prompt_generator import LLMPromptGenerator, print_prompt_with_separator
+from llm_integration.async_client import run_prompt_analysis
+from llm_integration.table_serializer import estimate_tokens
 from config.settings import DOCUMENT_CONFIG
+from instrumentation import span
 
 class ReportDataManager:
     """Gestiona los datos y tablas para la generación de reportes."""
@@ -40,6 +49,10 @@ class ReportDataManager:
             'section_prompts': {},  # Prompts de resumen por sección
             'general_prompt': None  # Prompt de resumen general
         }
+        # Respuestas del LLM por id de prompt (ver analyze_prompts)
+        self.llm_analyses = {}
+        # Archivo de la última exportación de prompts (ver export_prompts_to_file)
+        self.prompts_file = None
     
     def store_table_data(self, section: str, table_name: str, table_data: pd.DataFrame):
         """Almacena los datos de una tabla para su uso posterior."""
@@ -62,6 +75,7 @@ class ReportDataManager:
             'table_name': table_name,
             'sede': sede,
             'prompt': prompt,
+            'estimated_tokens': estimate_tokens(prompt),
             'table_data': table_data.copy(),
             'title': f"{section.upper()} - {table_name.replace('_', ' ').title()}"
         }
@@ -82,6 +96,7 @@ class ReportDataManager:
                 'section': section,
                 'sede': sede,
                 'prompt': prompt,
+                'estimated_tokens': estimate_tokens(prompt),
                 'title': f"RESUMEN SECCIÓN - {section.upper()}",
                 'section_tables': self.section_data[section].copy()
             }
@@ -101,6 +116,7 @@ class ReportDataManager:
         prompt_data = {
             'sede': sede,
             'prompt': prompt,
+            'estimated_tokens': estimate_tokens(prompt),
             'title': "RESUMEN GENERAL DEL REPORTE",
             'all_data': self.section_data.copy()
         }
@@ -113,6 +129,15 @@ class ReportDataManager:
         """Retorna todos los prompts generados para manipulación."""
         return self.generated_prompts
     
+    def get_token_estimates(self) -> Dict[str, int]:
+        """Tokens estimados de cada prompt, por id (los mismos ids de update_prompt)."""
+        estimates = {p['id']: p['estimated_tokens'] for p in self.generated_prompts['table_prompts']}
+        for section, prompt_data in self.generated_prompts['section_prompts'].items():
+            estimates[f"section_{section}"] = prompt_data['estimated_tokens']
+        if self.generated_prompts['general_prompt']:
+            estimates['general'] = self.generated_prompts['general_prompt']['estimated_tokens']
+        return estimates
+    
     def get_table_prompts(self):
         """Retorna solo los prompts de tablas individuales."""
         return self.generated_prompts['table_prompts']
@@ -125,23 +150,39 @@ class ReportDataManager:
         """Retorna el prompt de resumen general."""
         return self.generated_prompts['general_prompt']
     
+    def analyze_prompts(self, client=None) -> Dict[str, str]:
+        """
+        Envía todos los prompts al LLM de forma concurrente (ver llm_integration.async_client).
+        
+        Los prompts de tablas van en paralelo; cada resumen de sección espera a las
+        tablas de su sección y el resumen general a los de sección.
+        
+        Returns:
+            Dict[str, str]: Análisis por id de prompt (los mismos ids de update_prompt)
+        """
+        self.llm_analyses = run_prompt_analysis(self.generated_prompts, client)
+        return self.llm_analyses
+    
     def update_prompt(self, prompt_id: str, new_prompt: str):
         """Permite modificar un prompt específico."""
         # Buscar en prompts de tabla
         for prompt_data in self.generated_prompts['table_prompts']:
             if prompt_data['id'] == prompt_id:
                 prompt_data['prompt'] = new_prompt
+                prompt_data['estimated_tokens'] = estimate_tokens(new_prompt)
                 return True
         
         # Buscar en prompts de sección
         for section, prompt_data in self.generated_prompts['section_prompts'].items():
             if f"section_{section}" == prompt_id:
                 prompt_data['prompt'] = new_prompt
+                prompt_data['estimated_tokens'] = estimate_tokens(new_prompt)
                 return True
         
         # Verificar prompt general
         if prompt_id == "general" and self.generated_prompts['general_prompt']:
             self.generated_prompts['general_prompt']['prompt'] = new_prompt
+            self.generated_prompts['general_prompt']['estimated_tokens'] = estimate_tokens(new_prompt)
             return True
         
         return False
@@ -158,7 +199,7 @@ class ReportDataManager:
             f.write("-" * 50 + "\n\n")
             
             for i, prompt_data in enumerate(self.generated_prompts['table_prompts'], 1):
-                f.write(f"📊 PROMPT {i}: {prompt_data['title']}\n")
+                f.write(f"📊 PROMPT {i}: {prompt_data['title']} (~{prompt_data['estimated_tokens']} tokens)\n")
                 f.write("=" * 60 + "\n")
                 f.write(prompt_data['prompt'])
                 f.write("\n\n" + "="*60 + "\n\n")
@@ -168,7 +209,7 @@ class ReportDataManager:
             f.write("-" * 50 + "\n\n")
             
             for section, prompt_data in self.generated_prompts['section_prompts'].items():
-                f.write(f"📂 {prompt_data['title']}\n")
+                f.write(f"📂 {prompt_data['title']} (~{prompt_data['estimated_tokens']} tokens)\n")
                 f.write("=" * 60 + "\n")
                 f.write(prompt_data['prompt'])
                 f.write("\n\n" + "="*60 + "\n\n")
@@ -177,12 +218,14 @@ class ReportDataManager:
             if self.generated_prompts['general_prompt']:
                 f.write("🌐 PROMPT DE RESUMEN GENERAL\n")
                 f.write("-" * 50 + "\n\n")
-                f.write(f"📑 {self.generated_prompts['general_prompt']['title']}\n")
+                general = self.generated_prompts['general_prompt']
+                f.write(f"📑 {general['title']} (~{general['estimated_tokens']} tokens)\n")
                 f.write("=" * 60 + "\n")
                 f.write(self.generated_prompts['general_prompt']['prompt'])
                 f.write("\n\n" + "="*60 + "\n\n")
         
         print(f"✅ Prompts exportados a: {filename}")
+        self.prompts_file = filename
         return filename
 
 
@@ -236,30 +279,31 @@ def _add_prompt_to_doc(doc: Document, prompt_text: str, title: str):
 
 
 # Utilidad para agregar un gráfico de matplotlib directamente al doc
-def add_plot_to_doc(doc, fig):
-    """Add a matplotlib figure to a Word document"""
+def add_plot_to_doc(doc, fig, render_profile: Optional[str] = None):
+    """Add a matplotlib figure (or an already encoded chart image) to a Word document.
+    Figures are encoded with `render_profile` (DOCUMENT_CONFIG['render_profile'] by default)."""
     if fig is None:
         print("Warning: Figure is None, skipping plot addition")
         return False
 
     try:
-        with BytesIO() as image_stream:
-            fig.savefig(image_stream, format='png', bbox_inches='tight', dpi=300)
-            image_stream.seek(0)
-            doc.add_picture(image_stream, width=Inches(5.5))
-        plt.close(fig)
+        if not isinstance(fig, (ChartImage, bytes)):
+            fig = encode_figure(fig, render_profile)
+        add_chart_image(doc, fig)
         return True
     except Exception as e:
         print(f"Error adding plot to document: {e}")
-        if fig is not None:
-            plt.close(fig)
         return False
 
 # Función que genera el reporte completo con integración LLM
 def generate_enhanced_report(df_preventivo: pd.DataFrame, 
                            df_roedores: pd.DataFrame, 
                            df_lamparas: pd.DataFrame, 
-                           sede: str) -> str:
+                           sede: str,
+                           cubes: Dict[str, MonthlyAggregateCube] = None,
+                           partitions: Dict[str, SedePartitions] = None,
+                           include_figures: bool = None,
+                           render_profile: Optional[str] = None) -> str:
     """
     Genera un reporte completo con análisis de datos usando LLM.
     
@@ -268,6 +312,14 @@ def generate_enhanced_report(df_preventivo: pd.DataFrame,
         df_roedores: DataFrame con datos de control de roedores  
         df_lamparas: DataFrame con datos de control de lámparas
         sede: Nombre de la sede para filtrar datos
+        cubes: Cubos de agregados mensuales por dataset (se construyen si no se reciben)
+        partitions: Datasets particionados por sede (se construyen si no se reciben)
+        include_figures: Dibujar e insertar las gráficas; con False el reporte lleva solo
+            tablas y prompts, no se importa matplotlib y se guarda como
+            reporte_serviplagas_{sede}_tablas.docx para no reemplazar el reporte con gráficas
+            (por defecto DOCUMENT_CONFIG['include_figures'])
+        render_profile: Perfil de codificación de las gráficas: 'draft', 'final' o 'vector'
+            (por defecto DOCUMENT_CONFIG['render_profile'])
         
     Returns:
         str: Ruta del archivo de reporte generado
@@ -275,10 +327,21 @@ def generate_enhanced_report(df_preventivo: pd.DataFrame,
     print(f"\n🚀 Iniciando generación de reporte para sede: {sede}")
     print("=" * 60)
     
-    # Filtrar datos por sede
-    df_preventivo_filtered = df_preventivo[df_preventivo['Sede'] == sede].copy()
-    df_roedores_filtered = df_roedores[df_roedores['Sede'] == sede].copy()
-    df_lamparas_filtered = df_lamparas[df_lamparas['Sede'] == sede].copy()
+    # Datos de la sede: vistas sin copia de los datasets particionados por sede
+    if partitions is None:
+        partitions = build_sede_partitions(df_preventivo, df_roedores, df_lamparas)
+    df_preventivo_filtered = partitions['preventivos'].get(sede)
+    df_roedores_filtered = partitions['roedores'].get(sede)
+    df_lamparas_filtered = partitions['lamparas'].get(sede)
+    
+    # Agregados mensuales compartidos por todas las gráficas (un groupby por dataset)
+    if cubes is None:
+        cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
+    if include_figures is None:
+        include_figures = DOCUMENT_CONFIG.get('include_figures', True)
+    if not include_figures:
+        print("📄 Reporte solo con tablas: las gráficas no se dibujan")
+    reset_render_stats()
     
     # Inicializar gestor de datos
     data_manager = ReportDataManager()
@@ -291,19 +354,25 @@ def generate_enhanced_report(df_preventivo: pd.DataFrame,
     
     # ===== SECCIÓN PREVENTIVOS =====
     print(f"\n📊 Procesando sección: SERVICIOS PREVENTIVOS")
-    _process_preventivos_section(doc, df_preventivo_filtered, data_manager, sede)
+    _process_preventivos_section(doc, df_preventivo_filtered, data_manager, sede, cubes['preventivos'],
+                                 include_figures, render_profile)
     
     # ===== SECCIÓN ROEDORES =====
     print(f"\n📊 Procesando sección: CONTROL DE ROEDORES")
-    _process_roedores_section(doc, df_roedores_filtered, data_manager, sede)
+    _process_roedores_section(doc, df_roedores_filtered, data_manager, sede, cubes['roedores'],
+                              include_figures, render_profile)
     
     # ===== SECCIÓN LÁMPARAS =====
     print(f"\n📊 Procesando sección: CONTROL DE INSECTOS VOLADORES")
-    _process_lamparas_section(doc, df_lamparas_filtered, data_manager, sede)
+    _process_lamparas_section(doc, df_lamparas_filtered, data_manager, sede, cubes['lamparas'],
+                              include_figures, render_profile)
     
     # ===== RESUMEN GENERAL =====
     print(f"\n📋 Generando resumen general del reporte")
     general_prompt_data = data_manager.generate_general_summary_prompt(sede)
+    token_estimates = data_manager.get_token_estimates()
+    print(f"🧮 Tokens estimados: {sum(token_estimates.values()):,} en {len(token_estimates)} prompts "
+          f"(máx. {max(token_estimates.values()):,}, resumen general {token_estimates.get('general', 0):,})")
     
     # Añadir sección de resumen general al documento
     doc.add_heading("RESUMEN EJECUTIVO GENERAL", level=1)
@@ -317,16 +386,24 @@ def generate_enhanced_report(df_preventivo: pd.DataFrame,
     prompts_file = f"outputs/prompts_generados_{sede}.txt"
     data_manager.export_prompts_to_file(prompts_file)
     
-    # Guardar documento
-    output_path = f"outputs/reporte_serviplagas_{sede}.docx"
-    doc.save(output_path)
+    # Guardar documento (el reporte solo con tablas no reemplaza al reporte con gráficas)
+    output_path = _report_path(sede, include_figures)
+    with span('guardar_docx'):
+        doc.save(output_path)
     print(f"\n✅ Reporte guardado en: {output_path}")
     print(f"📝 Prompts disponibles en: {prompts_file}")
+    print_render_stats()
     
     # Retornar tanto la ruta del reporte como el gestor de datos para manipulación
     return output_path, data_manager
 
 
+def _report_path(sede: str, include_figures: bool) -> str:
+    """Ruta del .docx de la sede; el reporte solo con tablas lleva el sufijo '_tablas'."""
+    suffix = '' if include_figures else '_tablas'
+    return f"outputs/reporte_serviplagas_{sede}{suffix}.docx"
+
+
 def _add_document_header(doc: Document, sede: str):
     """Añade el header del documento con logo y título."""
     # Agregar logo
@@ -366,7 +443,9 @@ def _add_document_header(doc: Document, sede: str):
 
 
 def _process_preventivos_section(doc: Document, df_preventivo: pd.DataFrame, 
-                               data_manager: ReportDataManager, sede: str):
+                               data_manager: ReportDataManager, sede: str,
+                               cube: MonthlyAggregateCube, include_figures: bool = True,
+                               render_profile: Optional[str] = None):
     """Procesa la sección de servicios preventivos."""
     
     # Preventivos 1: Órdenes vs Áreas
@@ -374,10 +453,12 @@ def _process_preventivos_section(doc: Document, df_preventivo: pd.DataFrame,
     doc.add_paragraph("La gráfica # 1 refleja la cantidad de órdenes de mantenimiento recibidas (con código), "
                      "la cantidad de áreas realizadas efectivamente y la cantidad de áreas con evidencia de plagas.")
     
-    table_data, figure = generate_order_area_plot(df_preventivo)
+    table_data, image = render_chart(generate_order_area_plot, df_preventivo, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('preventivos', 'order_area', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -387,10 +468,12 @@ def _process_preventivos_section(doc: Document, df_preventivo: pd.DataFrame,
     doc.add_heading("Preventivos 2", level=2)
     doc.add_paragraph("La gráfica # 2 refleja la relación por especie encontrada")
     
-    table_data, figure = generate_plagas_timeseries_facet(df_preventivo)
+    table_data, image = render_chart(generate_plagas_timeseries_facet, df_preventivo, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('preventivos', 'plagas_species', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -400,10 +483,12 @@ def _process_preventivos_section(doc: Document, df_preventivo: pd.DataFrame,
     doc.add_heading("Preventivos 3", level=2)
     doc.add_paragraph("La gráfica # 3 refleja la tendencia de eliminación mensual en preventivos")
     
-    table_data, figure = generate_total_plagas_trend_plot(df_preventivo)
+    table_data, image = render_chart(generate_total_plagas_trend_plot, df_preventivo, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('preventivos', 'total_trend', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -416,7 +501,9 @@ def _process_preventivos_section(doc: Document, df_preventivo: pd.DataFrame,
 
 
 def _process_roedores_section(doc: Document, df_roedores: pd.DataFrame, 
-                            data_manager: ReportDataManager, sede: str):
+                            data_manager: ReportDataManager, sede: str,
+                            cube: MonthlyAggregateCube, include_figures: bool = True,
+                            render_profile: Optional[str] = None):
     """Procesa la sección de control de roedores."""
     
     # Roedores 1: Estado de estaciones
@@ -426,10 +513,12 @@ def _process_roedores_section(doc: Document, df_roedores: pd.DataFrame,
                      "de control y los puntos donde más se consume cebo rodenticida y su relacionamiento con la "
                      "disminución o la proliferación de esta especie en el tiempo; así como las estaciones en otros estados.")
     
-    table_data, figure = generate_roedores_station_status_plot(df_roedores)
+    table_data, image = render_chart(generate_roedores_station_status_plot, df_roedores, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('roedores', 'station_status', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -440,10 +529,12 @@ def _process_roedores_section(doc: Document, df_roedores: pd.DataFrame,
     doc.add_paragraph("La gráfica # 3 refleja la tendencia de consumo por mes comenzando el análisis "
                      "en el mes de septiembre de 2024")
     
-    table_data, figure = plot_tendencia_eliminacion_mensual(df_roedores)
+    table_data, image = render_chart(plot_tendencia_eliminacion_mensual, df_roedores, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('roedores', 'elimination_trend', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -456,17 +547,21 @@ def _process_roedores_section(doc: Document, df_roedores: pd.DataFrame,
 
 
 def _process_lamparas_section(doc: Document, df_lamparas: pd.DataFrame, 
-                            data_manager: ReportDataManager, sede: str):
+                            data_manager: ReportDataManager, sede: str,
+                            cube: MonthlyAggregateCube, include_figures: bool = True,
+                            render_profile: Optional[str] = None):
     """Procesa la sección de control de lámparas."""
     
     # Lámparas 1: Estado por mes
     doc.add_heading("Lámparas 1", level=2)
     doc.add_paragraph("La gráfica # 1 refleja el consolidado del estado de las lámparas en el tiempo")
     
-    table_data, figure = plot_estado_lamparas_por_mes(df_lamparas)
+    table_data, image = render_chart(plot_estado_lamparas_por_mes, df_lamparas, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('lamparas', 'status_monthly', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -476,10 +571,11 @@ def _process_lamparas_section(doc: Document, df_lamparas: pd.DataFrame,
     doc.add_heading("Lámparas 2", level=2)
     doc.add_paragraph("La gráfica # 2 refleja el estado de las lámparas por condición de la estación")
     
-    table_data, figure = plot_estado_lamparas_con_leyenda(df_lamparas)
+    table_data, figure = plot_estado_lamparas_con_leyenda(df_lamparas, lazy=True)
     prompt_data = data_manager.generate_table_prompt('lamparas', 'status_legend', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, figure.to_image(render_profile))
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -489,10 +585,12 @@ def _process_lamparas_section(doc: Document, df_lamparas: pd.DataFrame,
     doc.add_heading("Lámparas 3", level=2)
     doc.add_paragraph("La gráfica # 3 refleja la cantidad de hallazgos por lámpara")
     
-    table_data, figure = plot_capturas_especies_por_mes(df_lamparas)
+    table_data, image = render_chart(plot_capturas_especies_por_mes, df_lamparas, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('lamparas', 'captures_species', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -502,10 +600,12 @@ def _process_lamparas_section(doc: Document, df_lamparas: pd.DataFrame,
     doc.add_heading("Lámparas 4", level=2)
     doc.add_paragraph("La gráfica # 4 refleja el nivel de captura por mes")
     
-    table_data, figure = plot_tendencia_total_capturas(df_lamparas)
+    table_data, image = render_chart(plot_tendencia_total_capturas, df_lamparas, cube=cube, sede=sede,
+                                     draw=include_figures, profile=render_profile)
     prompt_data = data_manager.generate_table_prompt('lamparas', 'captures_trend', table_data, sede)
     
-    add_plot_to_doc(doc, figure)
+    if include_figures:
+        add_plot_to_doc(doc, image)
     _add_table_to_doc(doc, table_data)
     
     # Añadir prompt para revisión
@@ -522,36 +622,28 @@ def _add_table_to_doc(doc: Document, table_data: pd.DataFrame):
     if table_data.empty:
         return
         
-    # Crear tabla en el documento
-    table = doc.add_table(rows=1, cols=len(table_data.columns))
-    table.style = 'Table Grid'
-    
-    # Añadir headers
-    header_cells = table.rows[0].cells
-    for i, column_name in enumerate(table_data.columns):
-        header_cells[i].text = str(column_name)
-    
-    # Añadir filas de datos
-    for _, row in table_data.iterrows():
-        row_cells = table.add_row().cells
-        for i, value in enumerate(row):
-            row_cells[i].text = str(value)
+    # Crear la tabla en el documento (encabezados y filas en un solo bloque XML)
+    add_dataframe_table(doc, table_data, style='Table Grid')
 
 
 # Mantener función original para compatibilidad hacia atrás
-def generate_report_in_memory(df_preventivo, df_roedores, df_lamparas, sede: str):
+def generate_report_in_memory(df_preventivo, df_roedores, df_lamparas, sede: str,
+                               include_figures: bool = True):
     """
     Función original mantenida para compatibilidad hacia atrás.
     DEPRECADA: Usar generate_enhanced_report() en su lugar.
+    Con include_figures=False el reporte lleva solo las tablas (reporte_serviplagas_{sede}_tablas.docx).
     """
     print("⚠️  ADVERTENCIA: Usando función legacy. Considera migrar a generate_enhanced_report()")
-    return _generate_legacy_report(df_preventivo, df_roedores, df_lamparas, sede)
+    return _generate_legacy_report(df_preventivo, df_roedores, df_lamparas, sede, include_figures)
 
 
-def _generate_legacy_report(df_preventivo, df_roedores, df_lamparas, sede: str):
-    df_preventivo = df_preventivo[df_preventivo['Sede'] == sede].copy()
-    df_roedores = df_roedores[df_roedores['Sede'] == sede].copy()
-    df_lamparas = df_lamparas[df_lamparas['Sede'] == sede].copy()   
+def _generate_legacy_report(df_preventivo, df_roedores, df_lamparas, sede: str, include_figures: bool = True):
+    partitions = build_sede_partitions(df_preventivo, df_roedores, df_lamparas)
+    df_preventivo = partitions['preventivos'].get(sede)
+    df_roedores = partitions['roedores'].get(sede)
+    df_lamparas = partitions['lamparas'].get(sede)
+    cubes = build_monthly_cubes(df_preventivo, df_roedores, df_lamparas)
 
     doc = Document()
 
@@ -574,159 +666,97 @@ def _generate_legacy_report(df_preventivo, df_roedores, df_lamparas, sede: str):
     # Sección Preventivos
     doc.add_heading("Preventivos 1", level=2)
     doc.add_paragraph("La gráfica # 1 refleja la cantidad de órdenes de mantenimiento recibidas (con código), la cantidad de áreas realizadas efectivamente y la cantidad de áreas con evidencia de plagas.")
-    table_1, fig1 = generate_order_area_plot(df_preventivo)
-    add_plot_to_doc(doc, fig1)
+    table_1, fig1 = generate_order_area_plot(df_preventivo, cube=cubes['preventivos'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig1)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_1.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_1.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_1.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_1, style='Table Grid')
 
 
     doc.add_heading("Preventivos 2", level=2)
     doc.add_paragraph("La gráfica # 2 refleja la relación por especie encontrada")
-    table_2, fig2= generate_plagas_timeseries_facet(df_preventivo)
-    add_plot_to_doc(doc, fig2)
+    table_2, fig2= generate_plagas_timeseries_facet(df_preventivo, cube=cubes['preventivos'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_2.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_2.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_2.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_2, style='Table Grid')
 
 
     doc.add_heading("Preventivos 3", level=2)
     doc.add_paragraph("La gráfica # 3 refleja la tendencia de eliminación mensual en preventivos")
-    table_3, fig3 = generate_total_plagas_trend_plot(df_preventivo)
-    add_plot_to_doc(doc, fig3)
+    table_3, fig3 = generate_total_plagas_trend_plot(df_preventivo, cube=cubes['preventivos'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig3)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_3.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_3.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_3.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_3, style='Table Grid')
 
 
     doc.add_heading("Roedores 1", level=2)
     doc.add_paragraph("La gráfica # 1 refleja la cantidad de HALLAZGOS Y NOVEDADES encontradas en las estaciones portacebos instaladas en el hospital Universitario, dando cuenta de las tendencias en los puntos de control y los puntos donde más se consume cebo rodenticida y su relacionamiento con la disminución o la proliferación de esta especie en el tiempo; así como las estaciones en otros estados.")
-    table_1, fig1 = generate_roedores_station_status_plot(df_roedores)
-    add_plot_to_doc(doc, fig1)
+    table_1, fig1 = generate_roedores_station_status_plot(df_roedores, cube=cubes['roedores'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig1)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_1.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_1.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_1.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_1, style='Table Grid')
 
 
     doc.add_heading("Roedores 2", level=2)
     doc.add_paragraph("LLa gráfica # 3 refleja la tendencia de consumo por mes comenzando el análisis en el mes de septiembre de 2024")
-    table_2, fig2= plot_tendencia_eliminacion_mensual(df_roedores)
-    add_plot_to_doc(doc, fig2)
-
-        # Add table
-    t = doc.add_table(rows=1, cols=len(table_2.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_2.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_2.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    table_2, fig2= plot_tendencia_eliminacion_mensual(df_roedores, cube=cubes['roedores'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
+
+    # Add table
+    add_dataframe_table(doc, table_2, style='Table Grid')
 
     doc.add_heading("Lámparas 1", level=2)
     doc.add_paragraph("La gráfica # 1 refleja el consolidado del estado de las lámparas en el tiempo")
-    table_1, fig2= plot_estado_lamparas_por_mes(df_lamparas)
-    add_plot_to_doc(doc, fig2)
+    table_1, fig2= plot_estado_lamparas_por_mes(df_lamparas, cube=cubes['lamparas'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_1.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_1.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_1.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_1, style='Table Grid')
 
 
     doc.add_heading("Lámparas 2", level=2)
     doc.add_paragraph("La gráfica # 2 refleja el estado de las lámparas por condición de la estación")
-    table_2, fig2= plot_estado_lamparas_con_leyenda(df_lamparas)
-    add_plot_to_doc(doc, fig2)
+    table_2, fig2= plot_estado_lamparas_con_leyenda(df_lamparas, lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
 
     # Add table
-    t = doc.add_table(rows=1, cols=len(table_2.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_2.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_2.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    add_dataframe_table(doc, table_2, style='Table Grid')
 
 
 
     doc.add_heading("Lámparas 3", level=2)
     doc.add_paragraph("La gráfica # 3 refleja la cantidad de hallazgos por lámpara")
-    table_3, fig2= plot_capturas_especies_por_mes(df_lamparas)
-    add_plot_to_doc(doc, fig2)
+    table_3, fig2= plot_capturas_especies_por_mes(df_lamparas, cube=cubes['lamparas'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
 
 
-        # Add table
-    t = doc.add_table(rows=1, cols=len(table_3.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_3.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_3.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    # Add table
+    add_dataframe_table(doc, table_3, style='Table Grid')
 
     doc.add_heading("Lámparas 4", level=2)
     doc.add_paragraph("La gráfica # 4 refleja el nivel de captura por mes")
-    table_4, fig2= plot_tendencia_total_capturas(df_lamparas)
-    add_plot_to_doc(doc, fig2)
+    table_4, fig2= plot_tendencia_total_capturas(df_lamparas, cube=cubes['lamparas'], lazy=not include_figures)
+    if include_figures:
+        add_plot_to_doc(doc, fig2)
 
-        # Add table
-    t = doc.add_table(rows=1, cols=len(table_4.columns))
-    t.style = 'Table Grid'
-    hdr_cells = t.rows[0].cells
-    for i, col in enumerate(table_4.columns):
-        hdr_cells[i].text = str(col)
-    for _, row in table_4.iterrows():
-        row_cells = t.add_row().cells
-        for i, val in enumerate(row):
-            row_cells[i].text = str(val)
+    # Add table
+    add_dataframe_table(doc, table_4, style='Table Grid')
 
 
 
     # Guardar el documento en disco
-    output_path = f"outputs/reporte_serviplagas_{sede}.docx"
-    doc.save(output_path)
+    output_path = _report_path(sede, include_figures)
+    with span('guardar_docx'):
+        doc.save(output_path)
     print(f" ✅  Reporte guardado en: {output_path}")
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Ejecución de los trabajos de reporte: un trabajo por (tipo de reporte, sede).
+
+Con un solo trabajador los trabajos corren en el proceso actual, como siempre.
+Con varios, cada trabajo se envía a un pool de procesos: los frames transformados
+se entregan una sola vez por proceso mediante archivos Feather (Arrow IPC) leídos
+con memory-map, sin serializarlos con pickle. Los cubos mensuales del proceso
+principal viajan junto a ellos en un archivo pickle (son pequeños: una fila por
+sede y mes), así los trabajadores no recorren de nuevo las filas para armarlos
+y usan exactamente los mismos cubos que el modo en serie. La salida de consola
+de cada trabajo se captura y los resultados (y errores) se devuelven en el orden
+de los trabajos, no en el orden en que terminan. Con la instrumentación activa, las etapas medidas en cada
+trabajador vuelven con su resultado y se registran en el proceso principal.
+"""
+
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from data_processing.columnar_cache import is_pyarrow_available, read_feather_frame, write_feather_frame
+from data_processing.monthly_aggregates import MonthlyAggregateCube, build_monthly_cubes
+from data_processing.report_periods import ReportPeriod
+from data_processing.sede_partitions import SedePartitions, build_sede_partitions
+from instrumentation import drain_spans, enable_instrumentation, instrumentation_settings, record_spans, span
+
+REPORT_KINDS = ('hospital', 'estandar')
+
+# Estado de cada proceso trabajador (frames, particiones y cubos cargados en el inicializador)
+_worker_state: Dict = {}
+
+
+def run_report_job(kind: str, sede: str, df_preventivo: pd.DataFrame, df_roedores: pd.DataFrame,
+                   df_lamparas: pd.DataFrame, cubes: Optional[Dict[str, MonthlyAggregateCube]] = None,
+                   partitions: Optional[Dict[str, SedePartitions]] = None,
+                   include_figures: Optional[bool] = None, render_profile: Optional[str] = None,
+                   history: Optional[bool] = None, period: Optional[ReportPeriod] = None) -> Dict:
+    """
+    Genera un reporte ('hospital' o 'estandar') para una sede.
+
+    Con include_figures=False el reporte lleva solo tablas y prompts (sin matplotlib);
+    render_profile elige cómo se codifican las gráficas ('draft', 'final' o 'vector').
+    Con history=True las métricas del mes del reporte hospitalario se leen de las
+    particiones del historial (ver data_processing.history_store). Con `period` el reporte
+    hospitalario cubre ese rango de meses (totales desde las sumas acumuladas de los cubos).
+
+    Returns:
+        Dict: {'kind', 'sede', 'path', 'files', 'render_stats', 'error', 'log'}; 'path' es None
+            si hubo error, 'files' son todos los archivos escritos (el .docx primero) y
+            'render_stats' las gráficas dibujadas y leídas de la caché (get_render_stats)
+    """
+    with span('reporte', kind=kind, sede=sede):
+        return _run_report(kind, sede, df_preventivo, df_roedores, df_lamparas, cubes, partitions,
+                           include_figures, render_profile, history, period)
+
+
+def _run_report(kind, sede, df_preventivo, df_roedores, df_lamparas, cubes, partitions,
+                include_figures, render_profile, history, period) -> Dict:
+    """Cuerpo de run_report_job (medido como la etapa 'reporte')."""
+    # Importación diferida: los trabajadores cargan matplotlib solo al dibujar las gráficas
+    from reports.report_builder import generate_enhanced_report
+    from reports.hospital_san_vicente_generator import generate_hospital_san_vicente_report
+    from visualisations.render_profiles import get_render_stats
+
+    result = {'kind': kind, 'sede': sede, 'path': None, 'files': [], 'render_stats': {}, 'error': None, 'log': ''}
+    if kind == 'hospital':
+        print(f"\n🏢 Procesando sede: {sede}")
+        try:
+            result['path'] = generate_hospital_san_vicente_report(
+                df_preventivo, df_roedores, df_lamparas, sede, cubes=cubes, partitions=partitions,
+                include_figures=include_figures, render_profile=render_profile, history=history,
+                period=period
+            )
+            result['files'] = [result['path']]
+        except Exception as e:
+            result['error'] = str(e)
+            print(f"❌ Error generando reporte para {sede}: {e}")
+    else:
+        print(f"\n🔧 Procesando sede estándar: {sede}")
+        try:
+            report_path, data_manager = generate_enhanced_report(
+                df_preventivo, df_roedores, df_lamparas, sede=sede, cubes=cubes, partitions=partitions,
+                include_figures=include_figures, render_profile=render_profile
+            )
+            result['path'] = report_path
+            result['files'] = [report_path] + ([data_manager.prompts_file] if data_manager.prompts_file else [])
+
+            # Mostrar resumen de prompts generados
+            all_prompts = data_manager.get_all_prompts()
+            table_count = len(all_prompts['table_prompts'])
+            section_count = len(all_prompts['section_prompts'])
+            general_count = 1 if all_prompts['general_prompt'] else 0
+
+            print(f"   📊 Prompts LLM: {table_count} tablas, {section_count} secciones, {general_count} general")
+        except Exception as e:
+            result['error'] = str(e)
+            print(f"❌ Error generando reporte estándar para {sede}: {e}")
+    result['render_stats'] = get_render_stats()
+    return result
+
+
+def _init_worker(handoff: Dict[str, Tuple[str, Dict]], cubes_path: Optional[str] = None,
+                 instrumentation: Optional[Dict] = None):
+    """Inicializador del pool: lee los frames y cubos entregados y construye las particiones una vez por proceso."""
+    if instrumentation is not None:
+        # Las etapas se acumulan en memoria y vuelven al proceso principal con cada resultado
+        enable_instrumentation(to_file=False, **instrumentation)
+    frames = {name: read_feather_frame(path, meta) for name, (path, meta) in handoff.items()}
+    _worker_state['frames'] = frames
+    _worker_state['partitions'] = build_sede_partitions(frames['preventivos'], frames['roedores'],
+                                                        frames['lamparas'])
+    if cubes_path is not None:
+        with open(cubes_path, 'rb') as file:
+            _worker_state['cubes'] = pickle.load(file)
+    else:
+        _worker_state['cubes'] = build_monthly_cubes(frames['preventivos'], frames['roedores'], frames['lamparas'])
+
+
+def _run_job_in_worker(kind: str, sede: str, include_figures: Optional[bool] = None,
+                       render_profile: Optional[str] = None, history: Optional[bool] = None,
+                       period: Optional[ReportPeriod] = None) -> Dict:
+    """Ejecuta un trabajo en el proceso trabajador capturando su salida de consola."""
+    frames = _worker_state['frames']
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            result = run_report_job(kind, sede, frames['preventivos'], frames['roedores'],
+                                    frames['lamparas'], cubes=_worker_state['cubes'],
+                                    partitions=_worker_state['partitions'],
+                                    include_figures=include_figures, render_profile=render_profile,
+                                    history=history, period=period)
+        except Exception as e:
+            traceback.print_exc(file=log)
+            result = {'kind': kind, 'sede': sede, 'path': None, 'error': str(e)}
+    result['log'] = log.getvalue()
+    result['spans'] = drain_spans()
+    return result
+
+
+def run_report_jobs(jobs: List[Tuple[str, str]], df_preventivo: pd.DataFrame, df_roedores: pd.DataFrame,
+                    df_lamparas: pd.DataFrame, workers: int,
+                    cubes: Optional[Dict[str, MonthlyAggregateCube]] = None,
+                    partitions: Optional[Dict[str, SedePartitions]] = None,
+                    include_figures: Optional[bool] = None,
+                    render_profile: Optional[str] = None,
+                    history: Optional[bool] = None,
+                    period: Optional[ReportPeriod] = None) -> List[Dict]:
+    """
+    Ejecuta los trabajos (tipo, sede) en un pool de `workers` procesos.
+
+    Si el pool no está disponible (pyarrow no instalado o un solo trabajador)
+    los trabajos corren en serie en el proceso actual.
+
+    Args:
+        jobs: Lista de (tipo de reporte, sede)
+        df_preventivo, df_roedores, df_lamparas: Frames transformados
+        workers: Cantidad máxima de procesos
+        cubes: Cubos mensuales ya construidos (en paralelo se entregan a cada proceso; si faltan
+            cada trabajador los construye)
+        partitions: Datasets particionados por sede (solo se usan en modo serie)
+        include_figures: Incluir las gráficas (por defecto DOCUMENT_CONFIG['include_figures'])
+        render_profile: Perfil de las gráficas (por defecto DOCUMENT_CONFIG['render_profile'])
+        history: Métricas del mes desde el historial particionado (por defecto HISTORY_CONFIG['enabled'])
+        period: Rango de meses del reporte hospitalario (None: mes en curso)
+
+    Returns:
+        List[Dict]: Un resultado por trabajo, en el mismo orden que `jobs`
+    """
+    workers = min(workers, len(jobs))
+    if workers > 1 and not is_pyarrow_available():
+        print("⚠️  Generación en paralelo no disponible (requiere pyarrow); se ejecuta en serie")
+        workers = 1
+    if workers <= 1:
+        return [run_report_job(kind, sede, df_preventivo, df_roedores, df_lamparas, cubes=cubes,
+                               partitions=partitions, include_figures=include_figures, render_profile=render_profile,
+                               history=history, period=period)
+                for kind, sede in jobs]
+
+    print(f"⚙️  Generando {len(jobs)} reportes con {workers} procesos en paralelo...")
+    # Los trabajadores solo guardan figuras en memoria: backend sin interfaz gráfica
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    frames = {'preventivos': df_preventivo, 'roedores': df_roedores, 'lamparas': df_lamparas}
+    with tempfile.TemporaryDirectory(prefix='serviplagas-handoff-') as handoff_dir:
+        handoff = {}
+        for name, df in frames.items():
+            path = os.path.join(handoff_dir, f"{name}.feather")
+            handoff[name] = (path, write_feather_frame(df, path))
+        cubes_path = None
+        if cubes is not None:
+            cubes_path = os.path.join(handoff_dir, 'cubos.pkl')
+            with open(cubes_path, 'wb') as file:
+                pickle.dump(cubes, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # 'spawn' evita heredar por fork el estado de matplotlib del proceso principal
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(handoff, cubes_path, instrumentation_settings())) as executor:
+            futures = [executor.submit(_run_job_in_worker, kind, sede, include_figures, render_profile, history,
+                                       period)
+                       for kind, sede in jobs]
+
+            results = []
+            for (kind, sede), future in zip(jobs, futures):
+                try:
+                    result = future.result()
+                    record_spans(result.pop('spans', []))
+                    results.append(result)
+                except Exception as e:
+                    # El proceso trabajador terminó de forma inesperada
+                    results.append({'kind': kind, 'sede': sede, 'path': None, 'error': str(e),
+                                    'log': f"\n❌ Error en el proceso trabajador ({kind}, {sede}): {e}\n"})
+    return results
@@ -8,8 +8,23 @@ import yaml
 import pandas as pd
 from datetime import datetime
 import traceback
+from functools import partial
 from typing import Dict, List, Tuple
 
+
+def _load_and_transform(data_type: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Carga un dataset (con fallback) y lo transforma; devuelve (crudo, transformado o None si no hay datos)."""
+    from data_processing.data_loader import load_data_with_fallback
+    from data_processing import data_cleaner
+    from config.settings import LOCAL_FILES, API_URLS
+    
+    raw_data = load_data_with_fallback(LOCAL_FILES[data_type], API_URLS[data_type])
+    if raw_data is None or raw_data.empty:
+        return raw_data, None
+    transform = getattr(data_cleaner, f"transform_{data_type}_df")
+    return raw_data, transform(raw_data)
+
+
 class HospitalSanVicenteValidator:
     """Valida la integridad y funcionalidad del sistema."""
     
@@ -118,22 +133,19 @@ class HospitalSanVicenteValidator:
         print("\n📊 Validando carga de datos...")
         
         try:
-            from data_processing.data_loader import load_data_with_fallback
-            from data_processing.data_cleaner import (
-                transform_preventivos_df, 
-                transform_roedores_df, 
-                transform_lamparas_df
-            )
-            from config.settings import LOCAL_FILES, API_URLS
+            from data_processing.concurrent_loader import load_concurrently
             
-            # Intentar cargar datos
-            for data_type in ['preventivos', 'roedores', 'lamparas']:
+            # Cargar los tres datasets en paralelo (cada uno se transforma apenas se carga)
+            data_types = ['preventivos', 'roedores', 'lamparas']
+            print(f"   🔄 Cargando {', '.join(data_types)}...")
+            loaded = load_concurrently({data_type: partial(_load_and_transform, data_type) for data_type in data_types},
+                                       return_exceptions=True)
+            
+            for data_type in data_types:
                 try:
-                    print(f"   🔄 Cargando {data_type}...")
-                    raw_data = load_data_with_fallback(
-                        LOCAL_FILES[data_type], 
-                        API_URLS[data_type]
-                    )
+                    if isinstance(loaded[data_type], Exception):
+                        raise loaded[data_type]
+                    raw_data, transformed = loaded[data_type]
                     
                     if raw_data is not None and not raw_data.empty:
                         print(f"   ✅ {data_type}: {len(raw_data)} registros cargados")
@@ -141,14 +153,6 @@ class HospitalSanVicenteValidator:
                             f"✅ {data_type}: {len(raw_data)} registros"
                         )
                         
-                        # Intentar transformación
-                        if data_type == 'preventivos':
-                            transformed = transform_preventivos_df(raw_data)
-                        elif data_type == 'roedores':
-                            transformed = transform_roedores_df(raw_data)
-                        else:
-                            transformed = transform_lamparas_df(raw_data)
-                        
                         if transformed is not None and not transformed.empty:
                             print(f"   ✅ {data_type} transformado: {len(transformed)} registros")
                         else:
@@ -1,14 +1,29 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import math
 import numpy as np
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Union
 
+from data_processing.monthly_aggregates import MonthlyAggregateCube
+from visualisations.chart_tables import (
+    lamp_status_table,
+    species_captures_table,
+    total_captures_trend_table
+)
+from visualisations.facet_renderer import bar_line_facets
+from visualisations.lazy_figure import LazyFigure, chart_result
 
+# matplotlib and seaborn are imported inside the drawing functions, so that
+# tables-only callers (lazy=True) never load them
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
-def plot_estado_lamparas_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+
+
+def plot_estado_lamparas_por_mes(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                 sede: Optional[str] = None,
+                                 lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a faceted bar/line/point chart showing monthly lamp condition trends.
 
@@ -16,41 +31,26 @@ def plot_estado_lamparas_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Fi
     -----------
     df : pd.DataFrame
         Transformed DataFrame with columns: 'Mes', lamp status columns.
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     --------
     None
     """
-    # Group by month and aggregate lamp states
-    grouped = df.groupby('Mes').agg({
-        'Buena potencia': 'sum',
-        'Deteriorada': 'sum',
-        'Apagada': 'sum',
-        'Bombillo averiado': 'sum',
-        'Desconectada': 'sum',
-        'Faltante': 'sum',
-        'Lámina saturada': 'sum',
-        'Obstruida': 'sum',
-        'Baja potencia': 'sum'
-    }).reset_index()
+    # Monthly lamp states from the aggregate cube
+    grouped = lamp_status_table(df, cube, sede)
+    return chart_result(grouped, _draw_estado_lamparas_por_mes, lazy)
 
-    # Melt to long format
-    long_df = grouped.melt(id_vars='Mes', var_name='Estado', value_name='Cantidad')
-
-    # Sort 'Mes' categorically if formatted as "Mon YYYY"
-    try:
-        long_df['Mes'] = pd.Categorical(
-            long_df['Mes'],
-            categories=sorted(grouped['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
 
-    # Plot
-    g = sns.FacetGrid(long_df, col='Estado', col_wrap=3, sharey=False, sharex=False, height=3.5)
-    g.map_dataframe(sns.barplot, x='Mes', y='Cantidad', alpha=0.1, color='steelblue', edgecolor='black')
-    g.map_dataframe(sns.lineplot, x='Mes', y='Cantidad', marker='o', color='black')
+def _draw_estado_lamparas_por_mes(grouped: pd.DataFrame) -> 'Figure':
+    """Draw the faceted chart of `plot_estado_lamparas_por_mes`."""
+    # One bar + line panel per lamp status, straight from the monthly table
+    g = bar_line_facets(grouped, 'Estado', edgecolor='black')
 
     for ax in g.axes.flatten():
         # Rotate and size x-axis labels
@@ -74,14 +74,14 @@ def plot_estado_lamparas_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Fi
     g.fig.suptitle("Estado de la estación en el tiempo", fontsize=14)
     g.fig.subplots_adjust(top=0.92)
 
-    plt.tight_layout()
-    return grouped, g.fig
+    g.fig.tight_layout()
+    return g.fig
 
 
 
 
 
-def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def plot_estado_lamparas_con_leyenda(df: pd.DataFrame, lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Alternative version with a legend showing status categories and their meanings.
 
@@ -91,6 +91,8 @@ def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
         Transformed DataFrame with 'Mes', 'Lámpara', and lamp status columns.
     save_path : str, optional
         Path to save the plot. If None, plot is displayed only.
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     --------
@@ -99,7 +101,7 @@ def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
 
 
     # Validate input DataFrame
-    required_cols = ['Mes', 'Lámpara']
+    required_cols = ['Mes', 'Mes_key', 'Lámpara']
     status_cols = ['Buena potencia', 'Deteriorada', 'Apagada', 'Bombillo averiado',
                    'Desconectada', 'Faltante', 'Lámina saturada', 'Obstruida', 'Baja potencia']
 
@@ -108,35 +110,28 @@ def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
         print(f"[Error] Missing required columns: {missing_cols}")
         return
 
-    # Find the most recent 'Mes'
-    try:
-        df = df.copy()  # Avoid modifying original DataFrame
-        df['Mes_dt'] = pd.to_datetime(df['Mes'], format='%b %Y', errors='coerce')
-
-        # Check if any dates were parsed successfully
-        if df['Mes_dt'].isna().all():
-            print("[Error] No valid dates found in 'Mes' column")
-            return
-
-        latest_month = df.loc[df['Mes_dt'].notna(), 'Mes_dt'].max()
-        ult_mes_str = latest_month.strftime('%b %Y')
-        caption = f"Periodo: {ult_mes_str}"
-
-    except Exception as e:
-        print(f"[Error] Failed to identify latest month: {e}")
+    # Find the most recent month from the integer yyyymm key
+    if df['Mes_key'].isna().all():
+        print("[Error] No valid dates found in 'Mes_key' column")
         return
 
+    latest_month = df['Mes_key'].max()
+    is_latest = (df['Mes_key'] == latest_month).fillna(False).to_numpy()
+    ult_mes_str = str(df['Mes'].to_numpy()[is_latest][0])
+    caption = f"Periodo: {ult_mes_str}"
+
     # Filter to most recent month
-    filtered = df[df['Mes_dt'] == latest_month].copy()
+    filtered = df[is_latest]
 
     if filtered.empty:
         print(f"[Warning] No data found for the latest month: {ult_mes_str}")
         return
 
     # Group and summarize lamp conditions
+    # Compact flag dtypes (UInt8) are summed into int64 so the visit totals cannot overflow
     grouped = filtered.groupby('Lámpara').agg({
         col: 'sum' for col in status_cols
-    }).reset_index()
+    }).astype('int64').reset_index()
 
     # Add total visits
     grouped['Total de visitas'] = grouped[status_cols].sum(axis=1)
@@ -148,6 +143,17 @@ def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
         print("[Warning] No lamp data found for visualization")
         return
 
+    return chart_result(grouped, _draw_estado_lamparas_con_leyenda, lazy, caption)
+
+
+def _draw_estado_lamparas_con_leyenda(grouped: pd.DataFrame, caption: str) -> Optional['Figure']:
+    """Draw the bubble chart and legend of `plot_estado_lamparas_con_leyenda`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    status_cols = ['Buena potencia', 'Deteriorada', 'Apagada', 'Bombillo averiado',
+                   'Desconectada', 'Faltante', 'Lámina saturada', 'Obstruida', 'Baja potencia']
+
     # Melt to long format
     all_cols = status_cols + ['Total de visitas']
     long_df = grouped.melt(id_vars='Lámpara',
@@ -291,13 +297,15 @@ def plot_estado_lamparas_con_leyenda(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
     plt.tight_layout()
     plt.subplots_adjust(top=0.92, bottom=0.08)
 
-    return grouped, fig
+    return fig
 
 
 
 
 
-def plot_capturas_especies_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def plot_capturas_especies_por_mes(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                   sede: Optional[str] = None,
+                                   lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a faceted bar/line/point chart showing monthly captures of various insect species.
 
@@ -305,45 +313,26 @@ def plot_capturas_especies_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.
     -----------
     df : pd.DataFrame
         Transformed lamparas DataFrame with 'Mes' and species capture columns.
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     --------
     None
     """
-    # Ensure 'Otras especies' is numeric
-    df['Otras especies'] = pd.to_numeric(df['Otras especies'], errors='coerce').fillna(0).astype(int)
-
-    # Group and summarize by month
-    grouped = df.groupby('Mes').agg({
-        'mariposas': 'sum',
-        'moscas': 'sum',
-        'mosquitos': 'sum',
-        'polillas': 'sum',
-        'zancudos': 'sum',
-        'avispas': 'sum',
-        'abejas': 'sum',
-        'grillos': 'sum',
-        'coleópteros': 'sum',
-        'Otras especies': 'sum'
-    }).reset_index()
+    # Monthly captures from the aggregate cube ('Otras especies' is made numeric when building it)
+    grouped = species_captures_table(df, cube, sede)
+    return chart_result(grouped, _draw_capturas_especies_por_mes, lazy)
 
-    # Melt to long format
-    long_df = grouped.melt(id_vars='Mes', var_name='Especie', value_name='Cantidad')
-
-    # Ensure Mes is ordered chronologically
-    try:
-        long_df['Mes'] = pd.Categorical(
-            long_df['Mes'],
-            categories=sorted(grouped['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
 
-    # Faceted plot
-    g = sns.FacetGrid(long_df, col='Especie', col_wrap=3, sharey=False, sharex=False, height=3.5)
-    g.map_dataframe(sns.barplot, x='Mes', y='Cantidad', alpha=0.1, color='steelblue', edgecolor='black')
-    g.map_dataframe(sns.lineplot, x='Mes', y='Cantidad', marker='o', color='black')
+def _draw_capturas_especies_por_mes(grouped: pd.DataFrame) -> 'Figure':
+    """Draw the faceted chart of `plot_capturas_especies_por_mes`."""
+    # One bar + line panel per species, straight from the monthly table
+    g = bar_line_facets(grouped, 'Especie', edgecolor='black')
 
     # Style each axis
     for ax in g.axes.flatten():
@@ -365,13 +354,15 @@ def plot_capturas_especies_por_mes(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.
     g.fig.suptitle("Cantidad de capturas de especies por mes", fontsize=14)
     g.fig.subplots_adjust(top=0.92)
 
-    plt.tight_layout()
-    return grouped, g.fig
+    g.fig.tight_layout()
+    return g.fig
 
 
 
 
-def plot_tendencia_total_capturas(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def plot_tendencia_total_capturas(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                  sede: Optional[str] = None,
+                                  lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a bar + line + point chart showing the monthly trend of total species captures.
 
@@ -379,38 +370,27 @@ def plot_tendencia_total_capturas(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.F
     -----------
     df : pd.DataFrame
         Transformed lamparas DataFrame with 'Mes' and species columns.
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     --------
     None
     """
 
-    # Define species columns more efficiently
-    species_cols = [
-        'mariposas', 'moscas', 'mosquitos', 'polillas', 'zancudos',
-        'avispas', 'abejas', 'grillos', 'coleópteros', 'Otras especies'
-    ]
-
-    # Ensure numeric conversion for aggregation
-    df_clean = df.copy()
-    for col in species_cols:
-        if col in df_clean.columns:
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce').fillna(0).astype(int)
-
-    # Group and sum total captures
-    trend_df = df_clean.groupby('Mes')[species_cols].sum().sum(axis=1).reset_index()
-    trend_df.columns = ['Mes', 'total']
-
-    # Sort 'Mes' categorically if formatted as 'Mon YYYY'
-    try:
-        trend_df['Mes'] = pd.Categorical(
-            trend_df['Mes'],
-            categories=sorted(trend_df['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-        trend_df = trend_df.sort_values('Mes')
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
+    # Monthly total of captures, in chronological order
+    trend_df = total_captures_trend_table(df, cube, sede)
+    return chart_result(trend_df, _draw_tendencia_total_capturas, lazy)
+
+
+def _draw_tendencia_total_capturas(trend_df: pd.DataFrame) -> 'Figure':
+    """Draw the bar + line trend chart of `plot_tendencia_total_capturas`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # Crear figura y eje
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -452,4 +432,4 @@ def plot_tendencia_total_capturas(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.F
         ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{int(x):,}'))
 
     fig.tight_layout()
-    return trend_df, fig
\ No newline at end of file
+    return fig
\ No newline at end of file
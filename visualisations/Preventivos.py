@@ -1,14 +1,29 @@
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 import math
 
 from io import BytesIO
+from typing import TYPE_CHECKING, Optional, Union
 
+from data_processing.monthly_aggregates import MonthlyAggregateCube
+from visualisations.facet_renderer import bar_line_facets
+from visualisations.lazy_figure import LazyFigure, chart_result
+from visualisations.chart_tables import (
+    order_area_table,
+    plagas_species_table,
+    total_plagas_trend_table
+)
 
+# matplotlib and seaborn are imported inside the drawing functions, so that
+# tables-only callers (lazy=True) never load them
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
-def generate_order_area_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+
+
+def generate_order_area_plot(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                             sede: Optional[str] = None,
+                             lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a grouped bar plot showing:
         - Cantidad de órdenes
@@ -21,19 +36,26 @@ def generate_order_area_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure
     df : pd.DataFrame
         The transformed 'preventivos' DataFrame containing columns:
         'Mes', 'Código', 'Área', 'Plagas evidenciadas'
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     -------
     None
     """
-    # Group and summarize
-    summary_df = df.groupby('Mes').agg({
-        'Código': pd.Series.nunique,
-        'Área': pd.Series.nunique,
-        'Plagas evidenciadas': lambda x: (x != 'Sin evidencia').sum()
-    }).reset_index()
+    # Monthly summary from the aggregate cube
+    summary_df = order_area_table(df, cube, sede)
+    return chart_result(summary_df, _draw_order_area_plot, lazy)
 
-    summary_df.columns = ['Mes', 'Cantidad de órdenes', 'Cantidad de áreas', 'Áreas con plaga']
+
+def _draw_order_area_plot(summary_df: pd.DataFrame) -> 'Figure':
+    """Draw the grouped bar chart of `generate_order_area_plot`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # Convert to long format
     summary_long = summary_df.melt(
@@ -42,16 +64,6 @@ def generate_order_area_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure
         value_name='Valor'
     )
 
-    # Sort 'Mes' if in 'Mon YYYY' format
-    try:
-        summary_long['Mes'] = pd.Categorical(
-            summary_long['Mes'],
-            categories=sorted(summary_df['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
-
     # Crear figura y eje
     fig, ax = plt.subplots(figsize=(12, 6))
     sns.set_style("whitegrid")
@@ -88,10 +100,12 @@ def generate_order_area_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure
     )
 
     fig.tight_layout()
-    return summary_df, fig
+    return fig
 
 
-def generate_plagas_timeseries_facet(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def generate_plagas_timeseries_facet(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                     sede: Optional[str] = None,
+                                     lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a faceted line/bar/point chart showing quantity of each pest species by month.
 
@@ -99,57 +113,27 @@ def generate_plagas_timeseries_facet(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
     ----------
     df : pd.DataFrame
         The 'preventivos' DataFrame with pest quantity columns and a 'Mes' column.
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     -------
     None
     """
 
-    # Group and summarize by month
-    grouped = df.groupby('Mes').agg({
-        'Cantidad de Cucaracha Americana': 'sum',
-        'Cantidad de Cucaracha Alemana ': 'sum',
-        'Cantidad de Hormigas': 'sum',
-        'Cantidad de Moscas': 'sum',
-        'Cantidad de Mosquitos': 'sum',
-        'Cantidad de Zancudos': 'sum',
-        'Cantidad de Ratón casero': 'sum',
-        'Cantidad de Rata Noruega': 'sum',
-        'Cantidad de Ratón de tejado': 'sum',
-        'Cantidad de Otras plagas': 'sum'
-    }).reset_index()
-
-    # Rename for display (optional)
-    grouped.rename(columns={
-        'Cantidad de Cucaracha Americana': 'Cucaracha Americana',
-        'Cantidad de Cucaracha Alemana ': 'Cucaracha Alemana',
-        'Cantidad de Hormigas': 'Hormigas',
-        'Cantidad de Moscas': 'Moscas',
-        'Cantidad de Mosquitos': 'Mosquitos',
-        'Cantidad de Zancudos': 'Zancudos',
-        'Cantidad de Ratón casero': 'Ratón casero',
-        'Cantidad de Rata Noruega': 'Rata Noruega',
-        'Cantidad de Ratón de tejado': 'Ratón de tejado',
-        'Cantidad de Otras plagas': 'Otras plagas'
-    }, inplace=True)
-
-    # Melt into long format
-    long_df = grouped.melt(id_vars='Mes', var_name='Plaga', value_name='Cantidad')
-
-    # Ensure chronological order of months
-    try:
-        long_df['Mes'] = pd.Categorical(
-            long_df['Mes'],
-            categories=sorted(grouped['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
-
-    # Faceted plot with seaborn
-    g = sns.FacetGrid(long_df, col='Plaga', col_wrap=3, sharey=False, sharex=False, height=3.5)
-    g.map_dataframe(sns.barplot, x='Mes', y='Cantidad', alpha=0.1, color='steelblue')
-    g.map_dataframe(sns.lineplot, x='Mes', y='Cantidad', marker="o", color='black')
+    # Monthly pest totals from the aggregate cube, with display names
+    grouped = plagas_species_table(df, cube, sede)
+    return chart_result(grouped, _draw_plagas_timeseries_facet, lazy)
+
+
+def _draw_plagas_timeseries_facet(grouped: pd.DataFrame) -> 'Figure':
+    """Draw the faceted chart of `generate_plagas_timeseries_facet`."""
+    # One bar + line panel per species, straight from the monthly table
+    g = bar_line_facets(grouped, 'Plaga')
 
     # Format each subplot
     for ax in g.axes.flatten():
@@ -177,11 +161,13 @@ def generate_plagas_timeseries_facet(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
     g.fig.suptitle("Cantidad de plagas por especie en el tiempo", fontsize=14)
     g.fig.subplots_adjust(top=0.92)  # Leave space for the title
 
-    plt.tight_layout()
-    return grouped, g.fig
+    g.fig.tight_layout()
+    return g.fig
 
 
-def generate_total_plagas_trend_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def generate_total_plagas_trend_plot(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                     sede: Optional[str] = None,
+                                     lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a single plot showing the monthly trend of total pests eliminated.
 
@@ -189,39 +175,26 @@ def generate_total_plagas_trend_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
     ----------
     df : pd.DataFrame
         The DataFrame with pest count columns
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     -------
     None
     """
-    # Define pest columns more efficiently
-    pest_columns = [
-        'Cantidad de Cucaracha Americana',
-        'Cantidad de Cucaracha Alemana ',  # Note the trailing space
-        'Cantidad de Hormigas',
-        'Cantidad de Moscas',
-        'Cantidad de Mosquitos',
-        'Cantidad de Zancudos',
-        'Cantidad de Ratón casero',
-        'Cantidad de Rata Noruega',
-        'Cantidad de Ratón de tejado',
-        'Cantidad de Otras plagas'
-    ]
-
-    # Group and sum all pest columns
-    trend_df = df.groupby('Mes')[pest_columns].sum().sum(axis=1).reset_index()
-    trend_df.columns = ['Mes', 'total']
-
-    # Sort 'Mes' categorically if formatted as 'Mon YYYY'
-    try:
-        trend_df['Mes'] = pd.Categorical(
-            trend_df['Mes'],
-            categories=sorted(trend_df['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-        trend_df = trend_df.sort_values('Mes')
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
+    # Monthly total of pests, in chronological order
+    trend_df = total_plagas_trend_table(df, cube, sede)
+    return chart_result(trend_df, _draw_total_plagas_trend_plot, lazy)
+
+
+def _draw_total_plagas_trend_plot(trend_df: pd.DataFrame) -> 'Figure':
+    """Draw the bar + line trend chart of `generate_total_plagas_trend_plot`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # Crear figura y eje
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -263,7 +236,7 @@ def generate_total_plagas_trend_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, pl
         ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{int(x):,}'))
 
     fig.tight_layout()
-    return trend_df, fig
+    return fig
 
 
 
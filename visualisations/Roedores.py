@@ -1,15 +1,21 @@
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 import math
+from typing import TYPE_CHECKING, Optional, Union
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import math
+from data_processing.monthly_aggregates import MonthlyAggregateCube
+from visualisations.chart_tables import station_status_table
+from visualisations.facet_renderer import bar_line_facets
+from visualisations.lazy_figure import LazyFigure, chart_result
+
+# matplotlib and seaborn are imported inside the drawing functions, so that
+# tables-only callers (lazy=True) never load them
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
-def generate_roedores_station_status_plot(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def generate_roedores_station_status_plot(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                          sede: Optional[str] = None,
+                                          lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a faceted bar/line/point chart showing the evolution of rodent station statuses over time.
 
@@ -17,6 +23,12 @@ def generate_roedores_station_status_plot(df: pd.DataFrame) -> tuple[pd.DataFram
     ----------
     df : pd.DataFrame
         The 'roedores' DataFrame containing monthly station status counts and a 'Mes' column.
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     -------
@@ -24,39 +36,17 @@ def generate_roedores_station_status_plot(df: pd.DataFrame) -> tuple[pd.DataFram
         The matplotlib figure object ready for insertion into Word document
     """
 
-    # Group and summarize status metrics by month
-    grouped = df.groupby('Mes').agg({
-        'Consumido': 'sum',
-        'Instalación': 'sum',
-        'Sin novedad': 'sum',
-        'Presencia de roedores': 'sum',
-        'Presencia de bioindicador': 'sum',
-        'Cambio de cebo por deterioro': 'sum',
-        'Desaparecida': 'sum',
-        'Estación dañada': 'sum',
-        'Estación bloqueada': 'sum'
-    }).reset_index()
+    # Monthly status totals from the aggregate cube
+    grouped = station_status_table(df, cube, sede)
+    return chart_result(grouped, _draw_roedores_station_status_plot, lazy)
 
-    # Melt into long format
-    long_df = grouped.melt(id_vars='Mes', var_name='Estado', value_name='Cantidad')
 
-    # Sort 'Mes' categorically if formatted as 'Mon YYYY'
-    try:
-        long_df['Mes'] = pd.Categorical(
-            long_df['Mes'],
-            categories=sorted(grouped['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-        long_df = long_df.sort_values('Mes')
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
+def _draw_roedores_station_status_plot(grouped: pd.DataFrame) -> 'Figure':
+    """Draw the faceted chart of `generate_roedores_station_status_plot`."""
+    import matplotlib.pyplot as plt
 
-    # Create FacetGrid
-    g = sns.FacetGrid(long_df, col='Estado', col_wrap=3, sharey=False, sharex=False, height=3.5)
-
-    # Map plotting functions
-    g.map_dataframe(sns.barplot, x='Mes', y='Cantidad', alpha=0.1, color='steelblue')
-    g.map_dataframe(sns.lineplot, x='Mes', y='Cantidad', marker='o', color='black')
+    # One bar + line panel per station status, straight from the monthly table
+    g = bar_line_facets(grouped, 'Estado')
 
     # Customize each subplot
     for ax in g.axes.flatten():
@@ -86,10 +76,12 @@ def generate_roedores_station_status_plot(df: pd.DataFrame) -> tuple[pd.DataFram
     g.fig.tight_layout()
 
     # Return the figure object
-    return grouped, g.fig
+    return g.fig
 
 
-def plot_tendencia_eliminacion_mensual(df: pd.DataFrame) -> tuple[pd.DataFrame, plt.Figure]:
+def plot_tendencia_eliminacion_mensual(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                                       sede: Optional[str] = None,
+                                       lazy: bool = False) -> tuple[pd.DataFrame, Union['Figure', LazyFigure]]:
     """
     Generate a bar + line + point chart showing monthly rodent elimination trend ("Consumido").
 
@@ -97,6 +89,12 @@ def plot_tendencia_eliminacion_mensual(df: pd.DataFrame) -> tuple[pd.DataFrame,
     -----------
     df : pd.DataFrame
         DataFrame with rodent control data including 'Mes' and status columns
+    cube : MonthlyAggregateCube, optional
+        Precomputed monthly aggregates; built from `df` when not given.
+    sede : str, optional
+        Sede to take from the cube (None for all sedes).
+    lazy : bool, optional
+        Return a LazyFigure instead of drawing the figure.
 
     Returns:
     --------
@@ -104,18 +102,15 @@ def plot_tendencia_eliminacion_mensual(df: pd.DataFrame) -> tuple[pd.DataFrame,
         The matplotlib figure object ready for insertion into Word document
     """
 
-    # Group and summarize status metrics by month
-    grouped = df.groupby('Mes').agg({
-        'Consumido': 'sum',
-        'Instalación': 'sum',
-        'Sin novedad': 'sum',
-        'Presencia de roedores': 'sum',
-        'Presencia de bioindicador': 'sum',
-        'Cambio de cebo por deterioro': 'sum',
-        'Desaparecida': 'sum',
-        'Estación dañada': 'sum',
-        'Estación bloqueada': 'sum'
-    }).reset_index()
+    # Monthly status totals from the aggregate cube
+    grouped = station_status_table(df, cube, sede)
+    return chart_result(grouped, _draw_tendencia_eliminacion_mensual, lazy)
+
+
+def _draw_tendencia_eliminacion_mensual(grouped: pd.DataFrame) -> 'Figure':
+    """Draw the 'Consumido' trend chart of `plot_tendencia_eliminacion_mensual`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # Melt into long format
     long_df = grouped.melt(id_vars='Mes', var_name='Estado', value_name='Cantidad')
@@ -124,21 +119,10 @@ def plot_tendencia_eliminacion_mensual(df: pd.DataFrame) -> tuple[pd.DataFrame,
     filtered_df = long_df[long_df['Estado'] == 'Consumido'].copy()
 
     # Group by month and summarize
-    summary = filtered_df.groupby('Mes').agg(
+    summary = filtered_df.groupby('Mes', observed=True).agg(
         **{'Total de eliminación por mes': ('Cantidad', 'sum')}
     ).reset_index()
 
-    # Sort 'Mes' categorically if formatted as 'Mon YYYY'
-    try:
-        summary['Mes'] = pd.Categorical(
-            summary['Mes'],
-            categories=sorted(summary['Mes'], key=lambda x: pd.to_datetime(x, format='%b %Y')),
-            ordered=True
-        )
-        summary = summary.sort_values('Mes')
-    except Exception as e:
-        print(f"[Warning] Could not parse and sort 'Mes': {e}")
-
     # Create figure and axis explicitly
     fig, ax = plt.subplots(figsize=(10, 5))
     sns.set_style("whitegrid")
@@ -196,7 +180,7 @@ def plot_tendencia_eliminacion_mensual(df: pd.DataFrame) -> tuple[pd.DataFrame,
     fig.tight_layout()
 
     # Return the figure object
-    return grouped, fig
+    return fig
 
 
 
@@ -0,0 +1,100 @@
+"""
+Input tables of the monthly charts.
+
+Each function returns exactly the table its chart returns (and draws from),
+taken from the monthly aggregate cube. Months come out in chronological order,
+with 'Mes' as an ordered categorical. This module does not import matplotlib,
+so tables can be obtained without drawing, e.g. to compute the render cache key.
+"""
+
+from typing import Optional
+
+import pandas as pd
+
+from data_processing.monthly_aggregates import (
+    MonthlyAggregateCube,
+    PREVENTIVOS_PLAGA_COLUMNS,
+    ROEDORES_ESTADO_COLUMNS,
+    LAMPARAS_ESTADO_COLUMNS,
+    LAMPARAS_ESPECIE_COLUMNS,
+    build_preventivos_cube,
+    build_roedores_cube,
+    build_lamparas_cube
+)
+
+
+def order_area_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                     sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly orders, distinct areas and areas with pests (Preventivos)."""
+    if cube is None:
+        cube = build_preventivos_cube(df)
+    return cube.table(['Cantidad de órdenes', 'Cantidad de áreas', 'Áreas con plaga'], sede)
+
+
+def plagas_species_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                         sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly quantity of each pest species, with display names (Preventivos)."""
+    if cube is None:
+        cube = build_preventivos_cube(df)
+    grouped = cube.table(PREVENTIVOS_PLAGA_COLUMNS, sede)
+
+    # Rename for display
+    grouped.rename(columns={
+        'Cantidad de Cucaracha Americana': 'Cucaracha Americana',
+        'Cantidad de Cucaracha Alemana ': 'Cucaracha Alemana',
+        'Cantidad de Hormigas': 'Hormigas',
+        'Cantidad de Moscas': 'Moscas',
+        'Cantidad de Mosquitos': 'Mosquitos',
+        'Cantidad de Zancudos': 'Zancudos',
+        'Cantidad de Ratón casero': 'Ratón casero',
+        'Cantidad de Rata Noruega': 'Rata Noruega',
+        'Cantidad de Ratón de tejado': 'Ratón de tejado',
+        'Cantidad de Otras plagas': 'Otras plagas'
+    }, inplace=True)
+    return grouped
+
+
+def total_plagas_trend_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                             sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly total of pests (Preventivos)."""
+    if cube is None:
+        cube = build_preventivos_cube(df)
+    trend_df = cube.table(PREVENTIVOS_PLAGA_COLUMNS, sede).set_index('Mes').sum(axis=1).reset_index()
+    trend_df.columns = ['Mes', 'total']
+    return trend_df
+
+
+def station_status_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                         sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly count of rodent stations in each status (Roedores)."""
+    if cube is None:
+        cube = build_roedores_cube(df)
+    return cube.table(ROEDORES_ESTADO_COLUMNS, sede)
+
+
+def lamp_status_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                      sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly count of lamps in each status (Lámparas)."""
+    if cube is None:
+        cube = build_lamparas_cube(df)
+    return cube.table(LAMPARAS_ESTADO_COLUMNS, sede)
+
+
+def species_captures_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                           sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly captures of each species (Lámparas)."""
+    if cube is None:
+        cube = build_lamparas_cube(df)
+    return cube.table(LAMPARAS_ESPECIE_COLUMNS, sede)
+
+
+def total_captures_trend_table(df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                               sede: Optional[str] = None) -> pd.DataFrame:
+    """Monthly total of captures (Lámparas)."""
+    if cube is None:
+        cube = build_lamparas_cube(df)
+    # Captures are whole counts
+    trend_df = cube.table(LAMPARAS_ESPECIE_COLUMNS, sede).set_index('Mes').sum(axis=1).astype(int).reset_index()
+    trend_df.columns = ['Mes', 'total']
+    return trend_df
+
@@ -0,0 +1,45 @@
+"""
+Deferred construction of chart figures.
+
+Every chart function computes its table first and then draws it. Called with
+``lazy=True`` it returns the table and a LazyFigure instead of the figure: the
+drawing code, and the matplotlib/seaborn import it needs, only runs when the
+handle is rendered. Callers that only need the tables (prompts, data exports,
+tables-only reports) never import matplotlib.
+"""
+
+from typing import Any, Callable, Optional, Tuple
+
+import pandas as pd
+
+from instrumentation import span
+
+
+class LazyFigure:
+    """Handle to a chart that has not been drawn yet."""
+
+    def __init__(self, draw: Callable[..., Any], table: pd.DataFrame, *args):
+        self.draw = draw
+        self.table = table
+        self.args = args
+
+    def render(self):
+        """Draw the chart and return its matplotlib figure."""
+        return self.draw(self.table, *self.args)
+
+    def to_image(self, profile: Optional[str] = None):
+        """Draw the chart and encode it with a render profile (None if it produced no figure)."""
+        from visualisations.render_profiles import encode_figure
+
+        with span('grafica', chart=getattr(self.draw, '__name__', 'chart')):
+            fig = self.render()
+            if fig is None:
+                return None
+            return encode_figure(fig, profile)
+
+
+def chart_result(table: pd.DataFrame, draw: Callable[..., Any], lazy: bool, *args) -> Tuple[pd.DataFrame, Any]:
+    """Return ``(table, figure)`` or, with ``lazy``, ``(table, LazyFigure)`` without drawing."""
+    if lazy:
+        return table, LazyFigure(draw, table, *args)
+    return table, draw(table, *args)
@@ -0,0 +1,176 @@
+"""
+Content-addressed on-disk cache of encoded chart images.
+
+The key of a monthly chart is the hash of its aggregated input table plus the
+plot function name, the hash of the plotting code (the chart module and the
+project modules it imports, such as facet_renderer and chart_tables), the hash
+of the encoding code (render_profiles), the style version and the render profile
+(format, resolution, tight pass). An unchanged chart therefore
+costs one table hash and one file read: the figure is not drawn nor encoded
+again, across report kinds, sedes and runs. SVG images keep their PNG fallback
+next to them ('<key>.fallback.png').
+Charts are requested lazily, so matplotlib is only imported when an image has
+to be drawn.
+The least recently used images are evicted when the cache exceeds its size limit.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+from importlib.metadata import version
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import CHART_CONFIG, RENDER_CACHE_CONFIG
+from data_processing.columnar_cache import transform_cache_key
+from data_processing.monthly_aggregates import MonthlyAggregateCube
+from visualisations.render_profiles import (
+    ChartImage, encode_figure, get_render_profile, record_render
+)
+
+IMAGE_EXTENSIONS = ('.png', '.svg')
+
+# The plotting and encoding code does not change during a run: hash each module's source once
+_code_key = lru_cache(maxsize=None)(transform_cache_key)
+
+
+@lru_cache(maxsize=None)
+def _matplotlib_version() -> str:
+    # Read from the package metadata so that computing a key does not import matplotlib
+    return version('matplotlib')
+
+
+def table_hash(table: pd.DataFrame) -> str:
+    """Hash of a table's content, column names and dtypes."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(table.columns)).encode('utf-8'))
+    digest.update(repr(list(table.dtypes.astype(str))).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def chart_cache_key(plot_func: Callable, table: pd.DataFrame, profile: Dict) -> str:
+    """Cache key of a chart: input table + plot function and code (with the project modules it imports)
+    + encoding code + style version + facet backend + render profile settings + matplotlib version."""
+    parts = [
+        table_hash(table),
+        _code_key(plot_func),
+        _code_key(encode_figure),
+        str(RENDER_CACHE_CONFIG['style_version']),
+        CHART_CONFIG.get('facet_backend', 'matplotlib'),
+        repr(sorted(profile.items())),
+        _matplotlib_version(),
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _image_path(key: str, extension: str = 'png') -> str:
+    return os.path.join(RENDER_CACHE_CONFIG['directory'], f"{key}.{extension}")
+
+
+def read_cached_image(key: str, extension: str = 'png') -> Optional[bytes]:
+    """Return the cached image for `key` (marking it as recently used) or None."""
+    path = _image_path(key, extension)
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def write_cached_image(key: str, data: bytes, extension: str = 'png'):
+    """Store an image atomically and evict the least recently used images if over the size limit."""
+    path = _image_path(key, extension)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        _evict_lru(RENDER_CACHE_CONFIG['directory'], RENDER_CACHE_CONFIG['max_size_mb'] * 1024 * 1024)
+    except OSError as e:
+        print(f"⚠️  No se pudo escribir la caché de gráficas para {key[:12]}: {e}")
+
+
+def _evict_lru(directory: str, max_bytes: int):
+    """Delete the least recently used images until the directory fits in `max_bytes`."""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(IMAGE_EXTENSIONS):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            # Another process may have evicted it already
+            pass
+
+
+def _read_cached_chart(key: str, image_format: str) -> Optional[ChartImage]:
+    """Cached image of a chart, or None if the image (or the fallback of an SVG) is missing."""
+    data = read_cached_image(key, image_format)
+    if data is None:
+        return None
+    if image_format == 'png':
+        return ChartImage(data)
+    fallback = read_cached_image(f"{key}.fallback")
+    if fallback is None:
+        return None
+    return ChartImage(data, image_format, fallback)
+
+
+def _write_cached_chart(key: str, image: ChartImage):
+    write_cached_image(key, image.data, image.format)
+    if image.fallback is not None:
+        write_cached_image(f"{key}.fallback", image.fallback)
+
+
+def render_chart(plot_func: Callable, df: pd.DataFrame, cube: Optional[MonthlyAggregateCube] = None,
+                 sede: Optional[str] = None, profile: Optional[str] = None,
+                 draw: bool = True) -> Tuple[pd.DataFrame, Optional[ChartImage]]:
+    """
+    Return a monthly chart's table and its encoded image, drawing it only on a cache miss.
+
+    Parameters:
+    ----------
+    plot_func : Callable
+        Monthly chart function, e.g. generate_order_area_plot
+    df, cube, sede :
+        Arguments of the chart function
+    profile : str, optional
+        Render profile ('draft', 'final', 'vector'); DOCUMENT_CONFIG['render_profile'] by default
+    draw : bool
+        When False only the table is computed and the image is None
+
+    Returns:
+    -------
+    tuple[pd.DataFrame, ChartImage]
+        The chart table and the encoded image (None if the chart produced no figure)
+    """
+    table, handle = plot_func(df, cube=cube, sede=sede, lazy=True)
+    if not draw:
+        return table, None
+    name, settings = get_render_profile(profile)
+    if not RENDER_CACHE_CONFIG.get('enabled', False):
+        return table, handle.to_image(name)
+
+    key = chart_cache_key(plot_func, table, settings)
+    cached = _read_cached_chart(key, settings['format'])
+    if cached is not None:
+        record_render(name, 0.0, cached.size, cached=True)
+        return table, cached
+
+    image = handle.to_image(name)
+    if image is not None:
+        _write_cached_chart(key, image)
+    return table, image
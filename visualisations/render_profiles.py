@@ -0,0 +1,98 @@
+"""
+Render profiles: how chart figures are encoded for the Word reports.
+
+A profile (RENDER_PROFILES in config/settings.py) sets the image format, the
+resolution and whether savefig runs the bbox 'tight' pass:
+    - 'draft': 96 dpi PNG without the tight pass, for quick review runs
+    - 'final': 300 dpi PNG, the production quality
+    - 'vector': SVG, embedded in the docx together with a PNG fallback for
+      viewers that cannot display SVG
+The encoded image is a ChartImage. The encoding time and the output size of
+every chart are accumulated per profile, so that a report can print what its
+charts cost.
+"""
+
+import time
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from config.settings import DOCUMENT_CONFIG, RENDER_PROFILES
+
+DEFAULT_RENDER_PROFILE = 'final'
+
+# Per-profile totals since the last reset: charts encoded, seconds, bytes and cache hits
+_render_stats: Dict[str, Dict[str, float]] = {}
+
+
+class ChartImage:
+    """An encoded chart: the image in its profile format, plus a PNG fallback for SVG."""
+
+    def __init__(self, data: bytes, format: str = 'png', fallback: Optional[bytes] = None):
+        self.data = data
+        self.format = format
+        self.fallback = fallback
+
+    @property
+    def size(self) -> int:
+        """Total encoded size in bytes (image + fallback)."""
+        return len(self.data) + len(self.fallback or b'')
+
+
+def get_render_profile(name: Optional[str] = None) -> Tuple[str, Dict]:
+    """Return `(name, settings)` of a profile; DOCUMENT_CONFIG['render_profile'] by default."""
+    name = name or DOCUMENT_CONFIG.get('render_profile', DEFAULT_RENDER_PROFILE)
+    if name not in RENDER_PROFILES:
+        print(f"⚠️  Perfil de gráficas desconocido '{name}', se usa '{DEFAULT_RENDER_PROFILE}'")
+        name = DEFAULT_RENDER_PROFILE
+    return name, RENDER_PROFILES[name]
+
+
+def _savefig(fig, format: str, dpi: int, bbox_tight: bool) -> bytes:
+    with BytesIO() as image_stream:
+        fig.savefig(image_stream, format=format, dpi=dpi, bbox_inches='tight' if bbox_tight else None)
+        return image_stream.getvalue()
+
+
+def encode_figure(fig, profile: Optional[str] = None) -> ChartImage:
+    """Encode a matplotlib figure with a render profile and close it."""
+    import matplotlib.pyplot as plt
+
+    name, settings = get_render_profile(profile)
+    bbox_tight = settings.get('bbox_tight', True)
+    start = time.perf_counter()
+    try:
+        data = _savefig(fig, settings['format'], settings['dpi'], bbox_tight)
+        fallback = None
+        if settings['format'] != 'png':
+            fallback = _savefig(fig, 'png', settings.get('fallback_dpi', settings['dpi']), bbox_tight)
+    finally:
+        plt.close(fig)
+
+    image = ChartImage(data, settings['format'], fallback)
+    record_render(name, time.perf_counter() - start, image.size)
+    return image
+
+
+def record_render(profile: str, seconds: float, size: int, cached: bool = False):
+    """Add one chart to the totals of `profile` (cached charts count their size but no time)."""
+    stats = _render_stats.setdefault(profile, {'charts': 0, 'cached': 0, 'seconds': 0.0, 'bytes': 0})
+    stats['cached' if cached else 'charts'] += 1
+    stats['seconds'] += seconds
+    stats['bytes'] += size
+
+
+def get_render_stats() -> Dict[str, Dict[str, float]]:
+    """Copy of the per-profile totals since the last reset."""
+    return {name: dict(stats) for name, stats in _render_stats.items()}
+
+
+def reset_render_stats():
+    """Clear the per-profile totals (called at the start of each report)."""
+    _render_stats.clear()
+
+
+def print_render_stats():
+    """Print the encoding time and output size of each profile used since the last reset."""
+    for name, stats in _render_stats.items():
+        print(f"   🖼️  Gráficas '{name}': {stats['charts']} codificadas en {stats['seconds']:.2f}s, "
+              f"{stats['cached']} desde la caché, {stats['bytes'] / 1024:.0f} KB")